@@ -0,0 +1,124 @@
+"""
+增量审计缓存
+缓存键 = 文档内容哈希 + 文档所引用的文件/符号的存在性指纹，
+只有文档内容变化、或引用的路径/符号出现或消失时才重新审计
+"""
+import os
+import json
+import hashlib
+import argparse
+from pathlib import Path
+
+
+CACHE_VERSION = 7
+CACHE_DIR = Path('.doc-auditor') / 'cache'
+
+
+def add_cache_arguments(parser):
+    """
+    --cache / --stats 参数（各审计脚本共用）
+    默认不缓存，也不向被审计的项目写入任何文件
+    """
+    parser.add_argument('--cache', help='启用增量审计缓存，缓存和符号索引保存在 <项目根目录>/.doc-auditor/（默认关闭）',
+                        action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument('--stats', help='在输出中附加缓存命中统计（cache 字段）', action='store_true')
+
+
+def content_hash(content):
+    """文档内容哈希"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def reference_fingerprint(checks):
+    """存在性指纹：checks 为 (类型, 引用, 是否存在) 的可迭代对象"""
+    h = hashlib.sha256()
+    for kind, reference, exists in sorted(set(checks)):
+        h.update(f'{kind}\0{reference}\0{int(bool(exists))}\n'.encode('utf-8'))
+    return h.hexdigest()
+
+
+class AuditCache:
+    def __init__(self, project_root, namespace, cache_path=None):
+        if cache_path is None:
+            cache_path = Path(project_root) / CACHE_DIR / f'{namespace}.json'
+        self.cache_path = Path(cache_path)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        # 本进程新写入的条目，供并行审计时汇总回主进程
+        self._updates = {}
+
+    @staticmethod
+    def make_key(doc_path):
+        return os.path.abspath(doc_path)
+
+    def load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if data.get('version') != CACHE_VERSION:
+            return False
+
+        self.entries = data.get('entries', {})
+        return True
+
+    def save(self):
+        """原子写入缓存文件，失败时静默跳过"""
+        data = {
+            'version': CACHE_VERSION,
+            'entries': self.entries
+        }
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+            return True
+        except OSError:
+            return False
+
+    def get(self, key, doc_hash, fingerprint_fn):
+        """
+        查询缓存
+        fingerprint_fn(references) 根据当前代码库计算引用的存在性指纹
+        """
+        entry = self.entries.get(key)
+        if (
+            entry is not None
+            and entry['content_hash'] == doc_hash
+            and fingerprint_fn(entry['references']) == entry['fingerprint']
+        ):
+            self.hits += 1
+            return entry['result']
+
+        self.misses += 1
+        return None
+
+    def put(self, key, doc_hash, references, fingerprint, result):
+        entry = {
+            'content_hash': doc_hash,
+            'references': references,
+            'fingerprint': fingerprint,
+            'result': result
+        }
+        self.entries[key] = entry
+        self._updates[key] = entry
+
+    def drain_updates(self):
+        """取出本进程新写入的条目"""
+        updates = self._updates
+        self._updates = {}
+        return updates
+
+    def merge(self, updates):
+        self.entries.update(updates)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -3,93 +3,132 @@
 审计单个 Markdown 文档，判断是否过时
 """
 import os
-import re
+import sys
 import argparse
 from pathlib import Path
 import json
+from symbol_index import SymbolIndex
+from audit_cache import AuditCache, add_cache_arguments, content_hash, reference_fingerprint
+from reference_extractor import extract_references, reference_values
+from parsed_document import ParsedDocument, as_document
+from path_snapshot import PathSnapshot
+from code_scan import CodeScanner, DEFAULT_MAX_FILE_SIZE, compile_bytes_pattern
+from result_store import ResultStore
+from streaming import add_format_argument, iter_paths, wants_stdin, write_record
+from profiler import PROFILER, phase, add_profile_argument, start_profile, finish_profile
+
+
+# 参与缓存指纹计算的引用类型
+CHECKED_REFERENCE_KEYS = ('file_paths', 'function_names', 'class_names', 'api_routes')
 
 
 class DocumentAuditor:
-    def __init__(self, project_root):
+    def __init__(self, project_root, symbol_index=None, cache=None, path_snapshot=None, scanner=None):
         self.project_root = Path(project_root)
+        self._symbol_index = symbol_index
+        self._path_snapshot = path_snapshot
+        self.cache = cache
+        # 代码搜索的大小上限和被跳过的文件记录
+        self.scanner = scanner or CodeScanner()
+
+    @property
+    def path_snapshot(self):
+        """项目路径快照（首次使用时遍历项目目录）"""
+        if self._path_snapshot is None:
+            self._path_snapshot = PathSnapshot.build(self.project_root)
+        return self._path_snapshot
+
+    @property
+    def symbol_index(self):
+        """代码符号索引（首次使用时在内存中建立，不写入磁盘）"""
+        if self._symbol_index is None:
+            self._symbol_index = SymbolIndex.build(
+                self.project_root, persist=False, snapshot=self.path_snapshot,
+                max_file_size=self.scanner.max_file_size
+            )
+        return self._symbol_index
 
     def extract_code_references(self, doc_content):
         """从文档中提取代码引用"""
-        references = {
-            'file_paths': [],
-            'function_names': [],
-            'class_names': [],
-            'variables': [],
-            'api_endpoints': [],
-            'code_blocks': []
-        }
-
-        # 提取文件路径（如: src/utils/helper.py, ./scripts/test.sh）
-        file_pattern = r'(?:[`:]?)([a-zA-Z0-9_\-./]+\.(?:py|js|ts|tsx|java|go|rs|sh|yaml|yml|json|sql))(?:`|\)|\s|$|,)'
-        references['file_paths'].extend(re.findall(file_pattern, doc_content))
+        with phase('extract_references'):
+            return self._extract_code_references(doc_content)
 
-        # 提取代码块内容
-        code_block_pattern = r'```(?:python|javascript|typescript|java|go|rust|bash|sh)?\n(.*?)```'
-        references['code_blocks'].extend(re.findall(code_block_pattern, doc_content, re.DOTALL))
+    def _extract_code_references(self, doc_content):
+        document = as_document(doc_content)
+        tokens = extract_references(document.content, document.code_blocks)
 
-        # 从代码块中提取函数名、类名、变量
-        for code in references['code_blocks']:
-            # 函数定义
-            references['function_names'].extend(re.findall(r'def\s+(\w+)\s*\(', code))
-            references['function_names'].extend(re.findall(r'function\s+(\w+)\s*\(', code))
-
-            # 类定义
-            references['class_names'].extend(re.findall(r'class\s+(\w+)\s*[:\(]', code))
-
-            # 变量赋值
-            references['variables'].extend(re.findall(r'(\w+)\s*=\s*', code))
-
-        # API 端点
-        api_pattern = r'(?:GET|POST|PUT|DELETE|PATCH)\s+([\/\w\-{}]+)'
-        references['api_endpoints'].extend(re.findall(api_pattern, doc_content))
-
-        # 去重
-        for key in references:
-            references[key] = list(set(references[key]))
+        references = {
+            'file_paths': reference_values(tokens['file_paths']),
+            'function_names': reference_values(tokens['function_names']),
+            'class_names': reference_values(tokens['class_names']),
+            'variables': reference_values(tokens['variables']),
+            'api_endpoints': reference_values(tokens['api_endpoints']),
+            # 带 HTTP 方法的端点，如 'GET /users/{id}'
+            'api_routes': list(dict.fromkeys(f'{method} {path}' for path, _, method in tokens['api_endpoints'])),
+            'code_blocks': list(dict.fromkeys(block['content'] for block in tokens['code_blocks']))
+        }
 
         return references
 
     def check_file_exists(self, file_path):
-        """检查文件是否存在"""
-        # 尝试相对路径和绝对路径
-        path = Path(file_path)
-        if path.exists():
+        """检查文件是否存在（查路径快照，带目录的引用也按后缀匹配）"""
+        return self.path_snapshot.resolve(file_path) is not None
+
+    def check_route_exists(self, route):
+        """
+        检查 'METHOD /path' 形式的端点是否有对应的路由
+        代码库中没有识别到任何路由，或路径不是以 / 开头时不做判断
+        """
+        method, _, path = route.partition(' ')
+        if not path.startswith('/') or not len(self.symbol_index.routes):
             return True
-
-        # 尝试从项目根目录
-        full_path = self.project_root / file_path
-        return full_path.exists()
+        return self.symbol_index.has_route(method, path)
 
     def search_in_codebase(self, pattern, file_types=None):
-        """在代码库中搜索模式"""
+        """
+        在代码库中搜索模式
+        文件通过 mmap 读取，找到第一个匹配即停止；二进制和超过大小上限的文件被跳过，
+        记录在 self.scanner.skipped 中
+        """
         if file_types is None:
             file_types = ['.py', '.js', '.ts', '.tsx', '.java', '.go', '.rs']
 
+        regex = compile_bytes_pattern(pattern)
         matches = []
-        for ext in file_types:
-            for file_path in self.project_root.rglob(f'*{ext}'):
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        if re.search(pattern, content):
-                            matches.append(str(file_path))
-                except Exception:
-                    continue
+        with phase('search_codebase'):
+            for ext in file_types:
+                for file_path in self.project_root.rglob(f'*{ext}'):
+                    if self.scanner.search_file(file_path, regex):
+                        matches.append(str(file_path))
 
         return matches
 
+    def skipped_files(self):
+        """返回因二进制或超过大小上限而未扫描的代码文件: [{'path', 'reason'}]"""
+        skipped = {item['path']: item['reason'] for item in self.symbol_index.skipped_files()}
+        for item in self.scanner.skipped_files():
+            path = os.path.relpath(item['path'], self.project_root).replace(os.sep, '/')
+            skipped.setdefault(path, item['reason'])
+        return [{'path': path, 'reason': reason} for path, reason in sorted(skipped.items())]
+
+    def reference_fingerprint(self, references):
+        """引用的存在性指纹，用于判断缓存是否仍然有效"""
+        checks = [('file', p, self.check_file_exists(p)) for p in references['file_paths']]
+        checks += [('function', n, self.symbol_index.has_function(n)) for n in references['function_names']]
+        checks += [('class', n, self.symbol_index.has_class(n)) for n in references['class_names']]
+        checks += [('route', r, self.check_route_exists(r)) for r in references.get('api_routes', ())]
+        return reference_fingerprint(checks)
+
     def audit_document(self, doc_path):
         """审计文档，返回过时状态"""
-        doc_path = Path(doc_path)
+        with PROFILER.document(doc_path):
+            return self._audit_document(Path(doc_path))
 
+    def _audit_document(self, doc_path):
         try:
-            with open(doc_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            with phase('read_doc'), open(doc_path, 'r', encoding='utf-8') as f:
+                document = ParsedDocument(f.read())
+                PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
         except Exception as e:
             return {
                 'status': 'error',
@@ -97,44 +136,70 @@ class DocumentAuditor:
                 'action': 'manual_review'
             }
 
-        # 提取代码引用
-        references = self.extract_code_references(content)
+        if self.cache is None:
+            return self.evaluate_references(self.extract_code_references(document))
+
+        # 内容和引用的存在性都没有变化时直接返回缓存结果
+        cache_key = self.cache.make_key(doc_path)
+        doc_hash = content_hash(document.content)
+        with phase('cache_lookup'):
+            cached = self.cache.get(cache_key, doc_hash, self.reference_fingerprint)
+        if cached is not None:
+            return cached
+
+        references = self.extract_code_references(document)
+        result = self.evaluate_references(references)
 
+        checked = {key: references[key] for key in CHECKED_REFERENCE_KEYS}
+        self.cache.put(cache_key, doc_hash, checked, self.reference_fingerprint(checked), result)
+        return result
+
+    def evaluate_references(self, references):
+        """根据提取出的引用判断文档状态"""
         issues = []
 
         # 检查文件路径是否存在
-        for file_path in references['file_paths']:
-            if not self.check_file_exists(file_path):
-                issues.append({
-                    'type': 'missing_file',
-                    'severity': 'high',
-                    'reference': file_path,
-                    'message': f'引用的文件不存在: {file_path}'
-                })
-
-        # 检查函数名是否存在于代码库中
-        for func_name in references['function_names']:
-            pattern = rf'\bdef\s+{func_name}\s*\(|\bfunction\s+{func_name}\s*\('
-            matches = self.search_in_codebase(pattern)
-            if not matches:
-                issues.append({
-                    'type': 'missing_function',
-                    'severity': 'medium',
-                    'reference': func_name,
-                    'message': f'函数可能在代码库中不存在: {func_name}()'
-                })
-
-        # 检查类名是否存在于代码库中
-        for class_name in references['class_names']:
-            pattern = rf'\bclass\s+{class_name}\s*[:\(]'
-            matches = self.search_in_codebase(pattern)
-            if not matches:
-                issues.append({
-                    'type': 'missing_class',
-                    'severity': 'medium',
-                    'reference': class_name,
-                    'message': f'类可能在代码库中不存在: {class_name}'
-                })
+        with phase('check_files'):
+            for file_path in references['file_paths']:
+                if not self.check_file_exists(file_path):
+                    issues.append({
+                        'type': 'missing_file',
+                        'severity': 'high',
+                        'reference': file_path,
+                        'message': f'引用的文件不存在: {file_path}'
+                    })
+
+        with phase('check_symbols'):
+            # 检查函数名是否存在于代码库中（查符号索引）
+            for func_name in references['function_names']:
+                if not self.symbol_index.has_function(func_name):
+                    issues.append({
+                        'type': 'missing_function',
+                        'severity': 'medium',
+                        'reference': func_name,
+                        'message': f'函数可能在代码库中不存在: {func_name}()'
+                    })
+
+            # 检查类名是否存在于代码库中
+            for class_name in references['class_names']:
+                if not self.symbol_index.has_class(class_name):
+                    issues.append({
+                        'type': 'missing_class',
+                        'severity': 'medium',
+                        'reference': class_name,
+                        'message': f'类可能在代码库中不存在: {class_name}'
+                    })
+
+        # 检查 API 端点是否存在于路由中（查路由前缀树）
+        with phase('check_routes'):
+            for route in references.get('api_routes', ()):
+                if not self.check_route_exists(route):
+                    issues.append({
+                        'type': 'missing_endpoint',
+                        'severity': 'medium',
+                        'reference': route,
+                        'message': f'API 端点可能在代码库中不存在: {route}'
+                    })
 
         # 判断文档状态
         if not issues:
@@ -163,16 +228,93 @@ class DocumentAuditor:
         }
 
 
+def _emit(records, stream):
+    """逐条写出 NDJSON 记录，同时原样传给下游"""
+    for record in records:
+        write_record(record, stream)
+        yield record
+
+
 def main():
     parser = argparse.ArgumentParser(description='审计 Markdown 文档是否过时')
-    parser.add_argument('document', help='要审计的文档路径')
+    parser.add_argument('document', help='要审计的文档路径（省略或为 - 时从标准输入逐行读取）', nargs='?')
     parser.add_argument('--project-root', '-p', help='项目根目录', default='.')
-    parser.add_argument('--output', '-o', help='输出文件路径（JSON 格式）')
+    parser.add_argument('--output', '-o', help='输出文件路径')
+    parser.add_argument('--index-path', help='保存符号索引的路径（使用 --cache 时默认: <项目根目录>/.doc-auditor/symbol_index.json）')
+    parser.add_argument('--max-file-size', help='单个代码文件的大小上限（MB），超过的文件不扫描',
+                        type=float, default=DEFAULT_MAX_FILE_SIZE / 1024 / 1024)
+    parser.add_argument('--store', help='同时写入 SQLite 结果存储（默认: <项目根目录>/.doc-auditor/results.db）',
+                        nargs='?', const='', metavar='DB')
+    add_cache_arguments(parser)
+    add_format_argument(parser)
+    add_profile_argument(parser)
 
     args = parser.parse_args()
-
-    auditor = DocumentAuditor(args.project_root)
-    result = auditor.audit_document(args.document)
+    start_profile(args)
+
+    max_file_size = int(args.max_file_size * 1024 * 1024)
+    path_snapshot = PathSnapshot.build(args.project_root)
+    symbol_index = SymbolIndex.build(
+        args.project_root, args.index_path, persist=args.cache or args.index_path is not None,
+        snapshot=path_snapshot, max_file_size=max_file_size
+    )
+    cache = None
+    if args.cache:
+        cache = AuditCache(args.project_root, 'audit_document')
+        cache.load()
+
+    auditor = DocumentAuditor(
+        args.project_root, symbol_index=symbol_index, cache=cache, path_snapshot=path_snapshot,
+        scanner=CodeScanner(max_file_size)
+    )
+
+    single = not wants_stdin([args.document] if args.document else [])
+    doc_paths = [args.document] if single else iter_paths()
+    records = ({'path': doc_path, **auditor.audit_document(doc_path)} for doc_path in doc_paths)
+
+    out = None
+    if args.format == 'ndjson':
+        # 每审计完一个文档就输出一行
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        records = _emit(records, out)
+
+    store = None
+    run_id = None
+    try:
+        if args.store is not None:
+            store = ResultStore.for_project(args.project_root, args.store or None)
+            run_id = store.begin_run('audit_document', args.project_root)
+            records = store.write_through(run_id, records)
+        documents = None if args.format == 'ndjson' else []
+        for record in records:
+            if documents is not None:
+                documents.append(record)
+        if store is not None:
+            store.finish_run(run_id)
+    finally:
+        if store is not None:
+            store.close()
+        if out is not None and out is not sys.stdout:
+            out.close()
+
+    if cache is not None:
+        cache.save()
+    finish_profile(args, args.project_root)
+    if args.format == 'ndjson':
+        return
+
+    if single:
+        result = {k: v for k, v in documents[0].items() if k != 'path'}
+    else:
+        result = {'documents': documents}
+
+    if args.stats and cache is not None:
+        result = {**result, 'cache': cache.stats()}
+    skipped_files = auditor.skipped_files()
+    if skipped_files:
+        result = {**result, 'skipped_files': skipped_files}
+    if run_id is not None:
+        result = {**result, 'run_id': run_id}
 
     if args.output:
         with open(args.output, 'w', encoding='utf-8') as f:
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+并行审计整个项目的 Markdown 文档
+扫描结果分发到进程池，所有 worker 共享同一份只读的代码库快照（路径快照和符号索引），
+输出 process_docs.py 可直接使用的清单
+"""
+import os
+import json
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from audit_document import DocumentAuditor
+from audit_cache import AuditCache, add_cache_arguments
+from scan_docs import find_markdown_files, DEFAULT_EXCLUDE_DIRS, add_shard_argument, in_shard
+from symbol_index import SymbolIndex
+from path_snapshot import PathSnapshot
+from code_scan import DEFAULT_MAX_FILE_SIZE
+from changed_since import find_impacted_docs
+from result_store import ResultStore
+from profiler import PROFILER, add_profile_argument, start_profile, finish_profile
+
+
+# 每个 worker 进程内的审计器，由 _init_worker 创建
+_worker_auditor = None
+
+
+def _init_worker(project_root, symbol_index, cache, path_snapshot, profile=False):
+    global _worker_auditor
+    if profile:
+        PROFILER.enable()
+    _worker_auditor = DocumentAuditor(
+        project_root, symbol_index=symbol_index, cache=cache, path_snapshot=path_snapshot
+    )
+
+
+def _init_pool_worker(project_root, symbol_index, cache, path_snapshot, profile):
+    # fork 出的进程会继承主进程已记录的剖析数据，先丢弃，避免汇总时重复计算
+    PROFILER.drain()
+    _init_worker(project_root, symbol_index, cache, path_snapshot, profile)
+
+
+def _audit_one(doc_path):
+    """
+    审计单个文档，同时返回缓存是否命中、新写入的缓存条目和剖析数据（由主进程汇总）
+    """
+    cache = _worker_auditor.cache
+    hits_before = cache.hits if cache is not None else 0
+    result = _worker_auditor.audit_document(doc_path)
+    profile = PROFILER.drain() if PROFILER.enabled else None
+    if cache is None:
+        return {'path': doc_path, **result}, None, {}, profile
+    return {'path': doc_path, **result}, cache.hits > hits_before, cache.drain_updates(), profile
+
+
+def load_file_list(path):
+    """读取 scan_docs.py 的输出"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('files', [])
+
+
+def build_manifest(documents):
+    """按操作类型汇总，生成审计清单"""
+    summary = {}
+    for doc in documents:
+        action = doc.get('action', 'keep')
+        summary[action] = summary.get(action, 0) + 1
+
+    return {
+        'total_count': len(documents),
+        'summary': summary,
+        'documents': documents
+    }
+
+
+def audit_project(project_root, doc_paths, workers=None, symbol_index=None, cache=None, path_snapshot=None):
+    """并行审计文档列表，返回清单"""
+    if path_snapshot is None:
+        path_snapshot = PathSnapshot.build(project_root)
+    if symbol_index is None:
+        symbol_index = SymbolIndex.build(project_root, persist=False, snapshot=path_snapshot)
+    # 二进制或超过大小上限的代码文件在建索引时被跳过
+    skipped_files = symbol_index.skipped_files()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(doc_paths)))
+
+    if workers == 1:
+        _init_worker(project_root, symbol_index, cache, path_snapshot)
+        outcomes = [_audit_one(doc_path) for doc_path in doc_paths]
+    else:
+        # 按块分发，减少进程间通信开销
+        chunksize = max(1, len(doc_paths) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_pool_worker,
+            initargs=(project_root, symbol_index, cache, path_snapshot, PROFILER.enabled)
+        ) as executor:
+            outcomes = list(executor.map(_audit_one, doc_paths, chunksize=chunksize))
+
+    documents = []
+    for document, cache_hit, cache_updates, profile in outcomes:
+        documents.append(document)
+        if profile is not None:
+            PROFILER.merge(profile)
+        if cache is not None and workers > 1:
+            # worker 中的缓存是副本，命中统计和新条目在主进程汇总
+            if cache_hit:
+                cache.hits += 1
+            elif cache_hit is not None:
+                cache.misses += 1
+            cache.merge(cache_updates)
+
+    manifest = build_manifest(documents)
+    if skipped_files:
+        manifest['skipped_files'] = skipped_files
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并行审计项目中的所有 Markdown 文档')
+    parser.add_argument('directory', help='项目根目录', default='.', nargs='?')
+    parser.add_argument('--files', '-f', help='scan_docs.py 的输出文件（不指定则自动扫描）')
+    parser.add_argument('--output', '-o', help='输出清单路径（JSON 格式）')
+    parser.add_argument('--exclude', '-e', help='要排除的目录（逗号分隔）', default='')
+    parser.add_argument('--workers', '-j', help='并行进程数（默认: CPU 核数）', type=int)
+    parser.add_argument('--index-path', help='保存符号索引的路径（使用 --cache 时默认: <项目根目录>/.doc-auditor/symbol_index.json）')
+    parser.add_argument('--max-file-size', help='单个代码文件的大小上限（MB），超过的文件不扫描',
+                        type=float, default=DEFAULT_MAX_FILE_SIZE / 1024 / 1024)
+    parser.add_argument('--changed-since', help='只审计可能受相对该 Git 版本的变更影响的文档', metavar='REV')
+    parser.add_argument('--store', help='同时写入 SQLite 结果存储（默认: <项目根目录>/.doc-auditor/results.db）',
+                        nargs='?', const='', metavar='DB')
+    add_cache_arguments(parser)
+    add_shard_argument(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    start_profile(args)
+
+    if args.files:
+        doc_paths = [p for p in load_file_list(args.files) if in_shard(p, args.directory, args.shard)]
+    else:
+        exclude_dirs = list(DEFAULT_EXCLUDE_DIRS)
+        if args.exclude:
+            exclude_dirs.extend([d.strip() for d in args.exclude.split(',')])
+        doc_paths = find_markdown_files(args.directory, exclude_dirs, shard=args.shard)
+
+    changes = None
+    if args.changed_since:
+        total_docs = len(doc_paths)
+        doc_paths, changes = find_impacted_docs(args.directory, args.changed_since, doc_paths, persist=args.cache)
+        if changes is None:
+            print(f"❌ 无法获取相对 {args.changed_since} 的变更（不是 Git 仓库或版本不存在）")
+            sys.exit(1)
+
+    path_snapshot = PathSnapshot.build(args.directory)
+    symbol_index = SymbolIndex.build(
+        args.directory, args.index_path, persist=args.cache or args.index_path is not None, snapshot=path_snapshot,
+        max_file_size=int(args.max_file_size * 1024 * 1024)
+    )
+    cache = None
+    if args.cache:
+        # 与 audit_document.py 共用同一份缓存
+        cache = AuditCache(args.directory, 'audit_document')
+        cache.load()
+
+    manifest = audit_project(args.directory, doc_paths, args.workers, symbol_index, cache, path_snapshot)
+    if cache is not None:
+        cache.save()
+        if args.stats:
+            manifest['cache'] = cache.stats()
+    if args.store is not None:
+        store = ResultStore.for_project(args.directory, args.store or None)
+        try:
+            manifest['run_id'] = store.record_run('audit_project', args.directory, manifest['documents'])
+        finally:
+            store.close()
+    if args.shard:
+        # 各节点的部分清单用 merge_manifests.py 合并
+        manifest['shard'] = {'index': args.shard[0], 'count': args.shard[1]}
+    if changes is not None:
+        manifest['changed_since'] = {
+            'rev': args.changed_since,
+            'changed_files': sum(len(paths) for paths in changes.values()),
+            'total_docs': total_docs,
+            'impacted_docs': len(doc_paths)
+        }
+
+    finish_profile(args, args.directory)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        print(f"✅ 已审计 {manifest['total_count']} 个文档，清单已保存到 {args.output}")
+        if args.shard:
+            print(f"  分片: {args.shard[0]}/{args.shard[1]}（用 merge_manifests.py 合并各分片的清单）")
+        if changes is not None:
+            info = manifest['changed_since']
+            print(f"  相对 {info['rev']} 变更 {info['changed_files']} 个文件，"
+                  f"{info['total_docs']} 个文档中有 {info['impacted_docs']} 个受影响")
+        for action, count in sorted(manifest['summary'].items()):
+            print(f"  {action}: {count}")
+        if cache is not None:
+            print(f"  缓存: 命中 {cache.hits}，未命中 {cache.misses}")
+        if manifest.get('skipped_files'):
+            print(f"  跳过的代码文件: {len(manifest['skipped_files'])}")
+    else:
+        print(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
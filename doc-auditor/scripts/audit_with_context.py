@@ -4,16 +4,29 @@
 增强版：展示发现问题的文档片段、元数据（修改时间、文件大小）
 """
 import os
-import re
+import sys
 import argparse
 from pathlib import Path
 import json
 from datetime import datetime
+from audit_cache import AuditCache, add_cache_arguments, content_hash, reference_fingerprint
+from reference_extractor import find_file_paths
+from parsed_document import ParsedDocument, as_document
+from path_snapshot import PathSnapshot
+from reference_locator import ReferenceLocator, build_sections
+from changed_since import find_impacted_docs
+from scan_docs import find_markdown_files
+from streaming import add_format_argument, iter_paths, wants_stdin, write_record
+from git_blame import GitBlame, section_blame
+from profiler import PROFILER, phase, add_profile_argument, start_profile, finish_profile
 
 
 class DocumentAuditorWithContext:
-    def __init__(self, project_root):
+    def __init__(self, project_root, cache=None, path_snapshot=None, blame=None):
         self.project_root = Path(project_root)
+        self.cache = cache
+        self._path_snapshot = path_snapshot
+        self.blame = blame
 
     def get_file_metadata(self, file_path):
         """获取文件元数据"""
@@ -45,58 +58,82 @@ class DocumentAuditorWithContext:
             }
 
     def extract_problematic_lines(self, doc_content, issues):
-        """提取包含问题的文档行（标准模式：前后各2行）"""
-        lines = doc_content.split('\n')
-        problematic_sections = []
+        """
+        提取包含问题的文档行（标准模式：前后各2行）
+        一次扫描找出每个引用的所有出现位置，重叠的上下文合并为一个片段
+        """
+        with phase('locate_sections'):
+            return self._extract_problematic_lines(doc_content, issues)
+
+    def _extract_problematic_lines(self, doc_content, issues):
+        document = as_document(doc_content)
 
+        issues_by_reference = {}
         for issue in issues:
-            reference = issue.get('reference', '')
-
-            # 查找包含引用的行
-            for i, line in enumerate(lines):
-                if reference in line:
-                    # 提取上下文（前后各2行，标准模式）
-                    start = max(0, i - 2)
-                    end = min(len(lines), i + 3)
-
-                    section = {
-                        'line_number': i + 1,
-                        'context': lines[start:end],
-                        'highlight_index': i - start,  # 高亮行的索引
-                        'issue': issue
-                    }
-
-                    # 避免重复
-                    if not any(
-                        s['line_number'] == section['line_number']
-                        for s in problematic_sections
-                    ):
-                        problematic_sections.append(section)
-                    break
+            same_reference = issues_by_reference.setdefault(issue.get('reference', ''), [])
+            # 同一引用出现多次时问题会重复，片段中只保留一条
+            if issue not in same_reference:
+                same_reference.append(issue)
+
+        locator = ReferenceLocator(issues_by_reference)
+        hits = [
+            (line_index, issue)
+            for reference, line_indexes in locator.locate(document.content).items()
+            for line_index in line_indexes
+            for issue in issues_by_reference[reference]
+        ]
+
+        problematic_sections = []
+        for section in build_sections(len(document), hits):
+            start = section['start']
+            first_line, first_issue = section['hits'][0]
+            section_issues = []
+            for _, issue in section['hits']:
+                if not any(issue is other for other in section_issues):
+                    section_issues.append(issue)
+            problematic_sections.append({
+                'line_number': first_line + 1,
+                'context': document.slice_lines(start, section['end']),
+                'highlight_index': first_line - start,  # 高亮行的索引
+                'highlight_indexes': sorted({line_index - start for line_index, _ in section['hits']}),
+                'issue': first_issue,
+                'issues': section_issues
+            })
 
         return problematic_sections
 
-    def check_file_exists(self, file_path):
-        """检查文件是否存在"""
-        path = Path(file_path)
-        if path.exists():
-            return True
+    @property
+    def path_snapshot(self):
+        """项目路径快照（首次使用时遍历项目目录）"""
+        if self._path_snapshot is None:
+            self._path_snapshot = PathSnapshot.build(self.project_root)
+        return self._path_snapshot
 
-        full_path = self.project_root / file_path
-        return full_path.exists()
+    def check_file_exists(self, file_path):
+        """检查文件是否存在（查路径快照，带目录的引用也按后缀匹配）"""
+        return self.path_snapshot.resolve(file_path) is not None
 
     def extract_file_references(self, doc_content):
         """提取文档中的文件引用"""
-        file_pattern = r'(?:[`:]?)([a-zA-Z0-9_\-./]+\.(?:py|js|ts|tsx|java|go|rs|sh|yaml|yml|json|sql))(?:`|\)|\s|$|,)'
-        return re.findall(file_pattern, doc_content)
+        with phase('extract_references'):
+            return [value for value, _ in find_file_paths(as_document(doc_content).content)]
+
+    def reference_fingerprint(self, references):
+        """引用的存在性指纹，用于判断缓存是否仍然有效"""
+        return reference_fingerprint(
+            ('file', p, self.check_file_exists(p)) for p in references['file_paths']
+        )
 
     def audit_document(self, doc_path):
         """审计文档并返回详细结果"""
-        doc_path = Path(doc_path)
+        with PROFILER.document(doc_path):
+            return self._audit_document(Path(doc_path))
 
+    def _audit_document(self, doc_path):
         try:
-            with open(doc_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            with phase('read_doc'), open(doc_path, 'r', encoding='utf-8') as f:
+                document = ParsedDocument(f.read())
+                PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
         except Exception as e:
             return {
                 'status': 'error',
@@ -104,23 +141,56 @@ class DocumentAuditorWithContext:
                 'action': 'manual_review'
             }
 
-        # 获取文件元数据
+        # 获取文件元数据（不缓存，每次重新读取）
         metadata = self.get_file_metadata(doc_path)
 
-        # 提取文件引用
-        file_refs = self.extract_file_references(content)
-
+        if self.cache is None:
+            result = self.evaluate_content(document, self.extract_file_references(document))
+            return self.annotate_blame({**result, 'metadata': metadata}, doc_path)
+
+        cache_key = self.cache.make_key(doc_path)
+        doc_hash = content_hash(document.content)
+        with phase('cache_lookup'):
+            result = self.cache.get(cache_key, doc_hash, self.reference_fingerprint)
+        if result is None:
+            file_refs = self.extract_file_references(document)
+            result = self.evaluate_content(document, file_refs)
+            references = {'file_paths': sorted(set(file_refs))}
+            self.cache.put(cache_key, doc_hash, references, self.reference_fingerprint(references), result)
+
+        return self.annotate_blame({**result, 'metadata': metadata}, doc_path)
+
+    def annotate_blame(self, result, doc_path):
+        """为每个问题片段加上各行的最后修改时间（随时间变化，不进入审计缓存）"""
+        sections = result.get('problematic_sections')
+        if self.blame is None or not sections:
+            return result
+
+        blame = self.blame.blame(doc_path)
+        if blame is None:
+            return result
+
+        annotated = []
+        for section in sections:
+            start = section['line_number'] - 1 - section['highlight_index']
+            section_age = section_blame(blame, start, start + len(section['context']))
+            annotated.append({**section, 'blame': section_age} if section_age else section)
+        return {**result, 'problematic_sections': annotated}
+
+    def evaluate_content(self, content, file_refs):
+        """检查文档中的文件引用，返回不含元数据的审计结果"""
         issues = []
 
         # 检查文件是否存在
-        for file_ref in file_refs:
-            if not self.check_file_exists(file_ref):
-                issues.append({
-                    'type': 'missing_file',
-                    'severity': 'high',
-                    'reference': file_ref,
-                    'message': f'引用的文件不存在: {file_ref}'
-                })
+        with phase('check_files'):
+            for file_ref in file_refs:
+                if not self.check_file_exists(file_ref):
+                    issues.append({
+                        'type': 'missing_file',
+                        'severity': 'high',
+                        'reference': file_ref,
+                        'message': f'引用的文件不存在: {file_ref}'
+                    })
 
         # 提取问题行上下文
         if issues:
@@ -134,8 +204,7 @@ class DocumentAuditorWithContext:
                 'status': 'current',
                 'action': 'keep',
                 'issues': [],
-                'problematic_sections': [],
-                'metadata': metadata
+                'problematic_sections': []
             }
 
         # 根据问题数量决定操作
@@ -153,8 +222,7 @@ class DocumentAuditorWithContext:
             'action': action,
             'issues': issues,
             'problematic_sections': problematic_sections,
-            'file_references': file_refs,
-            'metadata': metadata
+            'file_references': file_refs
         }
 
     def format_report(self, audit_result, doc_path):
@@ -219,18 +287,33 @@ class DocumentAuditorWithContext:
             lines.append('')
 
             for section in sections[:5]:  # 最多显示5个问题片段
-                lines.append(f"📍 第 {section['line_number']} 行:")
+                blame = section.get('blame')
+                if blame:
+                    last_commit = blame['last_commit']
+                    lines.append(
+                        f"📍 第 {section['line_number']} 行（{blame['last_modified_days']} 天前最后修改，"
+                        f"{last_commit['hash'][:8]} {last_commit['summary']}）:"
+                    )
+                else:
+                    lines.append(f"📍 第 {section['line_number']} 行:")
                 lines.append('')
 
+                highlights = section.get('highlight_indexes', [section['highlight_index']])
                 for i, ctx_line in enumerate(section['context']):
+                    # 有 blame 时在每行前显示距今天数
+                    age = ''
+                    if blame:
+                        days = blame['line_ages'][i]
+                        age = f"{'?' if days is None else days:>5}天 │ "
                     # 高亮问题行
-                    if i == section['highlight_index']:
-                        lines.append(f'  >>> {ctx_line}')
+                    if i in highlights:
+                        lines.append(f'  >>> {age}{ctx_line}')
                     else:
-                        lines.append(f'      {ctx_line}')
+                        lines.append(f'      {age}{ctx_line}')
 
                 lines.append('')
-                lines.append(f"  问题: {section['issue']['message']}")
+                for issue in section.get('issues', [section['issue']]):
+                    lines.append(f"  问题: {issue['message']}")
                 lines.append('')
 
             if len(sections) > 5:
@@ -244,15 +327,77 @@ class DocumentAuditorWithContext:
 
 def main():
     parser = argparse.ArgumentParser(description='审计文档并展示上下文')
-    parser.add_argument('document', help='要审计的文档路径')
+    parser.add_argument('document', help='要审计的文档路径（省略或为 - 时从标准输入逐行读取；使用 --changed-since 时省略）',
+                        nargs='?')
     parser.add_argument('--project-root', '-p', help='项目根目录', default='.')
-    parser.add_argument('--output', '-o', help='输出文件路径（JSON 格式）')
+    parser.add_argument('--output', '-o', help='输出文件路径')
     parser.add_argument('--show-report', '-s', help='显示可读报告', action='store_true')
+    parser.add_argument('--changed-since', help='审计项目中可能受相对该 Git 版本的变更影响的文档', metavar='REV')
+    parser.add_argument('--no-blame', help='不为问题片段获取各行的最后修改时间（git blame）', action='store_true')
+    add_cache_arguments(parser)
+    add_format_argument(parser)
+    add_profile_argument(parser)
 
     args = parser.parse_args()
-
-    auditor = DocumentAuditorWithContext(args.project_root)
-    result = auditor.audit_document(args.document)
+    start_profile(args)
+
+    from_stdin = not args.changed_since and wants_stdin([args.document] if args.document else [])
+    doc_paths = [args.document] if args.document else []
+    if from_stdin:
+        doc_paths = iter_paths()
+    elif args.changed_since:
+        doc_paths, changes = find_impacted_docs(
+            args.project_root, args.changed_since, find_markdown_files(args.project_root), persist=args.cache
+        )
+        if changes is None:
+            print(f"❌ 无法获取相对 {args.changed_since} 的变更（不是 Git 仓库或版本不存在）")
+            sys.exit(1)
+
+    cache = None
+    if args.cache:
+        cache = AuditCache(args.project_root, 'audit_with_context')
+        cache.load()
+
+    blame = None
+    if not args.no_blame:
+        blame = GitBlame(args.project_root, persist=args.cache)
+        blame.load()
+
+    auditor = DocumentAuditorWithContext(args.project_root, cache=cache, blame=blame)
+
+    if args.format == 'ndjson':
+        # 每审计完一个文档就输出一行
+        out = open(args.output, 'w', encoding='utf-8') if args.output else None
+        try:
+            for doc_path in doc_paths:
+                write_record({'path': doc_path, **auditor.audit_document(doc_path)}, out)
+        finally:
+            if out is not None:
+                out.close()
+        if cache is not None:
+            cache.save()
+        if blame is not None:
+            blame.save()
+        finish_profile(args, args.project_root)
+        return
+
+    doc_paths = list(doc_paths)
+    results = [auditor.audit_document(doc_path) for doc_path in doc_paths]
+
+    if args.changed_since or from_stdin:
+        result = {'documents': [{'path': doc_path, **r} for doc_path, r in zip(doc_paths, results)]}
+        if args.changed_since:
+            result = {'changed_since': args.changed_since, **result}
+    else:
+        result = results[0]
+
+    if cache is not None:
+        cache.save()
+        if args.stats:
+            result = {**result, 'cache': cache.stats()}
+    if blame is not None:
+        blame.save()
+    finish_profile(args, args.project_root)
 
     # 保存 JSON 结果
     if args.output:
@@ -262,8 +407,11 @@ def main():
 
     # 显示报告
     if args.show_report or not args.output:
-        report = auditor.format_report(result, args.document)
-        print(report)
+        if args.changed_since:
+            print(f"相对 {args.changed_since} 的变更影响 {len(doc_paths)} 个文档")
+        for doc_path, doc_result in zip(doc_paths, results):
+            report = auditor.format_report(doc_result, doc_path)
+            print(report)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+doc-auditor 性能测试
+生成合成项目，分别计时扫描、审计、上下文收集和批量处理各阶段，
+报告吞吐量和峰值内存；给定基线时，超出容差的退化会让脚本以非零状态退出
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from synthetic_repo import generate_repo
+
+
+PHASES = ('scan', 'audit_document', 'audit_with_context', 'collect_context', 'process_docs')
+DEFAULT_TOLERANCE = 0.25
+# 耗时低于此值（秒）的差异视为噪声，不判定为退化
+MIN_TIME_DELTA = 0.05
+
+
+def _peak_rss_kb():
+    """当前进程的峰值常驻内存（KB），平台不支持时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024  # macOS 上单位是字节
+    return peak
+
+
+def _doc_paths(root):
+    from scan_docs import find_markdown_files
+    return find_markdown_files(root)
+
+
+def _phase_scan(root):
+    from scan_docs import find_markdown_files
+    return len(find_markdown_files(root))
+
+
+def _phase_audit_document(root):
+    from audit_document import DocumentAuditor
+    from path_snapshot import PathSnapshot
+    from symbol_index import SymbolIndex
+
+    doc_paths = _doc_paths(root)
+    path_snapshot = PathSnapshot.build(root)
+    symbol_index = SymbolIndex.build(root, persist=False, snapshot=path_snapshot)
+    auditor = DocumentAuditor(root, symbol_index=symbol_index, path_snapshot=path_snapshot)
+    for doc_path in doc_paths:
+        auditor.audit_document(doc_path)
+    return len(doc_paths)
+
+
+def _phase_audit_with_context(root):
+    from audit_with_context import DocumentAuditorWithContext
+
+    doc_paths = _doc_paths(root)
+    auditor = DocumentAuditorWithContext(root)
+    for doc_path in doc_paths:
+        auditor.audit_document(doc_path)
+    return len(doc_paths)
+
+
+def _phase_collect_context(root):
+    from collect_context import ContextCollector, GitHistoryIndex
+
+    doc_paths = _doc_paths(root)
+    git_index = GitHistoryIndex(root)
+    if not git_index.load():
+        git_index = None
+    collector = ContextCollector(root, git_index=git_index)
+    for doc_path in doc_paths:
+        collector.collect_context(doc_path)
+    return len(doc_paths)
+
+
+def _phase_process_docs(root):
+    """端到端：扫描、审计，再按清单更新文档（会修改合成项目，因此放在最后）"""
+    from audit_project import audit_project
+    from process_docs import process_manifest, JOURNAL_PATH
+    from symbol_index import SymbolIndex
+    from path_snapshot import PathSnapshot
+
+    doc_paths = _doc_paths(root)
+    path_snapshot = PathSnapshot.build(root)
+    symbol_index = SymbolIndex.build(root, persist=False, snapshot=path_snapshot)
+    manifest = audit_project(root, doc_paths, workers=1, symbol_index=symbol_index, path_snapshot=path_snapshot)
+    process_manifest(manifest, dry_run=False, journal_path=os.path.join(root, JOURNAL_PATH))
+    return len(doc_paths)
+
+
+PHASE_FUNCTIONS = {
+    'scan': _phase_scan,
+    'audit_document': _phase_audit_document,
+    'audit_with_context': _phase_audit_with_context,
+    'collect_context': _phase_collect_context,
+    'process_docs': _phase_process_docs,
+}
+
+
+def _run_phase(name, root):
+    """在独立进程中运行，保证峰值内存只反映这一个阶段"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        items = PHASE_FUNCTIONS[name](root)
+        seconds = time.perf_counter() - start
+    return {
+        'items': items,
+        'seconds': round(seconds, 4),
+        'items_per_second': round(items / seconds, 1) if seconds > 0 else None,
+        'peak_rss_kb': _peak_rss_kb()
+    }
+
+
+def run_benchmark(root, phases=PHASES, repeat=1):
+    """依次运行各阶段，重复多次时取最快的一次"""
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name in phases:
+        best = None
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(_run_phase, name, str(root)).result()
+            if best is None or result['seconds'] < best['seconds']:
+                best = result
+        results[name] = best
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """返回超出容差的退化项: [{'phase', 'metric', 'baseline', 'current'}]"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('phases', {}).get(name)
+        if not previous:
+            continue
+
+        if (current['seconds'] > previous['seconds'] * (1 + tolerance)
+                and current['seconds'] - previous['seconds'] > MIN_TIME_DELTA):
+            regressions.append({
+                'phase': name, 'metric': 'seconds',
+                'baseline': previous['seconds'], 'current': current['seconds']
+            })
+
+        if (current.get('peak_rss_kb') and previous.get('peak_rss_kb')
+                and current['peak_rss_kb'] > previous['peak_rss_kb'] * (1 + tolerance)):
+            regressions.append({
+                'phase': name, 'metric': 'peak_rss_kb',
+                'baseline': previous['peak_rss_kb'], 'current': current['peak_rss_kb']
+            })
+    return regressions
+
+
+def format_results(results):
+    lines = [f"{'阶段':<20}{'数量':>8}{'耗时(s)':>12}{'吞吐(个/s)':>14}{'峰值内存(MB)':>16}"]
+    for name, result in results.items():
+        rss = result['peak_rss_kb']
+        rss_text = f'{rss / 1024:.1f}' if rss else '-'
+        throughput = result['items_per_second'] if result['items_per_second'] is not None else '-'
+        lines.append(f"{name:<20}{result['items']:>8}{result['seconds']:>12.3f}{throughput:>14}{rss_text:>16}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='doc-auditor 性能测试')
+    parser.add_argument('--docs', help='文档数量', type=int, default=200)
+    parser.add_argument('--code-files', help='代码文件数量', type=int, default=500)
+    parser.add_argument('--refs-per-doc', help='每篇文档的引用数量', type=int, default=10)
+    parser.add_argument('--broken-ratio', help='失效引用的比例', type=float, default=0.1)
+    parser.add_argument('--seed', help='随机种子', type=int, default=0)
+    parser.add_argument('--phases', help=f"要运行的阶段（逗号分隔，默认全部: {','.join(PHASES)}）", default='')
+    parser.add_argument('--repeat', help='每个阶段重复次数，取最快的一次', type=int, default=1)
+    parser.add_argument('--work-dir', help='合成项目的生成目录（默认使用临时目录，结束后删除）')
+    parser.add_argument('--baseline', help='基线文件（JSON 格式），存在时与之比较')
+    parser.add_argument('--update-baseline', help='把本次结果写入基线文件', action='store_true')
+    parser.add_argument('--tolerance', help=f'允许的退化比例（默认: {DEFAULT_TOLERANCE}）',
+                        type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--output', '-o', help='输出结果路径（JSON 格式）')
+
+    args = parser.parse_args()
+
+    phases = [p.strip() for p in args.phases.split(',') if p.strip()] or list(PHASES)
+    unknown = [p for p in phases if p not in PHASE_FUNCTIONS]
+    if unknown:
+        parser.error(f"未知的阶段: {', '.join(unknown)}")
+
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix='doc-auditor-bench-'))
+    try:
+        # 每次都重新生成，process_docs 阶段会修改文档
+        repo_root = work_dir / 'repo'
+        if repo_root.exists():
+            shutil.rmtree(repo_root)
+        config = generate_repo(
+            repo_root, args.docs, args.code_files, args.refs_per_doc, args.broken_ratio, args.seed
+        )
+        config.pop('root')
+        results = run_benchmark(repo_root.resolve(), phases, max(1, args.repeat))
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {'config': config, 'phases': results}
+
+    print(format_results(results))
+
+    regressions = []
+    if args.baseline:
+        baseline_path = Path(args.baseline)
+        if args.update_baseline:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(baseline_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"\n✅ 基线已保存到 {baseline_path}")
+        elif baseline_path.exists():
+            with open(baseline_path, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            if baseline.get('config') != config:
+                print('\n⚠️  基线使用的合成项目参数与本次不同，比较结果可能没有意义')
+            regressions = compare_with_baseline(results, baseline, args.tolerance)
+            report['regressions'] = regressions
+        else:
+            print(f"\n⚠️  基线文件不存在: {baseline_path}（使用 --update-baseline 创建）")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if regressions:
+        print(f"\n❌ 发现 {len(regressions)} 项性能退化（容差 {args.tolerance:.0%}）:")
+        for item in regressions:
+            print(f"  {item['phase']} {item['metric']}: {item['baseline']} -> {item['current']}")
+        sys.exit(1)
+    elif args.baseline and not args.update_baseline and 'regressions' in report:
+        print(f"\n✅ 未发现超出容差的退化（容差 {args.tolerance:.0%}）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+根据 Git 变更找出受影响的文档
+一次 git diff --name-status 取得相对某个版本新增、删除、重命名和修改的文件，
+再与文档引用图求交集，只审计可能受影响的文档
+"""
+import os
+import subprocess
+from code_scan import DEFAULT_MAX_FILE_SIZE, BINARY_SNIFF_BYTES
+from reference_graph import ReferenceGraph
+from symbol_index import CODE_EXTENSIONS, SymbolIndex, parse_symbols
+from route_trie import parse_routes
+from profiler import phase
+
+
+def git_changed_files(project_root, rev):
+    """
+    返回相对 rev（到工作区）的变更，路径相对 project_root:
+    {'added': [...], 'deleted': [...], 'modified': [...], 'renamed': [(旧路径, 新路径)]}
+    不在 Git 仓库中或版本不存在时返回 None
+    """
+    try:
+        with phase('git_diff'):
+            result = subprocess.run(
+                ['git', '-c', 'core.quotepath=off', 'diff', '--name-status', '-z', '-M', '--relative', rev, '--'],
+                capture_output=True, cwd=project_root
+            )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+
+    changes = {'added': [], 'deleted': [], 'modified': [], 'renamed': []}
+    fields = result.stdout.decode('utf-8', errors='surrogateescape').split('\0')
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i][0]
+        if status in ('R', 'C'):
+            old_path, new_path = fields[i + 1], fields[i + 2]
+            if status == 'R':
+                changes['renamed'].append((old_path, new_path))
+            else:
+                changes['added'].append(new_path)
+            i += 3
+            continue
+
+        path = fields[i + 1]
+        if status == 'A':
+            changes['added'].append(path)
+        elif status == 'D':
+            changes['deleted'].append(path)
+        else:  # M、T 等
+            changes['modified'].append(path)
+        i += 2
+
+    return changes
+
+
+def _definitions(content):
+    """代码内容中定义的 (符号集合, 路由集合 {(方法, 路径)})"""
+    functions, classes = parse_symbols(content)
+    return set(functions) | set(classes), set(parse_routes(content))
+
+
+def git_old_definitions(project_root, rev, rel_paths):
+    """
+    用一个 git cat-file --batch 进程读取文件在 rev 中的版本，
+    返回 {路径: (定义的符号集合, 路由集合)}
+    """
+    rel_paths = [p for p in rel_paths if p.endswith(CODE_EXTENSIONS)]
+    if not rel_paths:
+        return {}
+
+    request = ''.join(f'{rev}:./{p}\n' for p in rel_paths).encode('utf-8')
+    try:
+        with phase('git_cat_file'):
+            result = subprocess.run(
+                ['git', 'cat-file', '--batch'], input=request, capture_output=True, cwd=project_root
+            )
+    except OSError:
+        return {}
+    if result.returncode != 0:
+        return {}
+
+    definitions = {}
+    output = result.stdout
+    pos = 0
+    for rel_path in rel_paths:
+        header_end = output.find(b'\n', pos)
+        if header_end == -1:
+            break
+        header = output[pos:header_end].split()
+        pos = header_end + 1
+        if len(header) != 3:
+            continue  # <object> missing
+
+        size = int(header[2])
+        content = output[pos:pos + size]
+        pos += size + 1
+        if size > DEFAULT_MAX_FILE_SIZE or b'\0' in content[:BINARY_SNIFF_BYTES]:
+            continue
+        definitions[rel_path] = _definitions(content)
+    return definitions
+
+
+def _current_definitions(project_root, rel_path):
+    if not rel_path.endswith(CODE_EXTENSIONS):
+        return set(), set()
+    try:
+        with open(os.path.join(project_root, rel_path), 'rb') as f:
+            content = f.read(DEFAULT_MAX_FILE_SIZE + 1)
+    except OSError:
+        return set(), set()
+    if len(content) > DEFAULT_MAX_FILE_SIZE or b'\0' in content[:BINARY_SNIFF_BYTES]:
+        return set(), set()
+    return _definitions(content)
+
+
+def find_impacted_docs(project_root, rev, doc_paths, graph=None, persist=True):
+    """
+    返回 (受影响的文档列表, 变更)，文档按 doc_paths 中的形式返回；
+    persist 为 True 时引用图保存在 <项目根目录>/.doc-auditor/ 中跨运行复用
+    - 新增、删除、重命名的文件: 引用其路径的文档
+    - 删除、重命名、修改的代码文件: 引用了其中新增或消失的函数/类或 API 端点的文档；
+      代码库中的路由从无到有或全部消失时（端点检查随之开启或关闭）: 所有引用了端点的文档
+    - 本身发生变化的文档
+    版本无效时返回 (None, None)
+    """
+    changes = git_changed_files(project_root, rev)
+    if changes is None:
+        return None, None
+
+    if graph is None:
+        graph = ReferenceGraph.build(project_root, doc_paths, persist=persist)
+
+    impacted = set()
+    touched_paths = list(changes['added']) + list(changes['deleted'])
+    for old_path, new_path in changes['renamed']:
+        touched_paths += [old_path, new_path]
+    for rel_path in touched_paths:
+        impacted |= graph.docs_for_path(rel_path)
+
+    # 每个代码文件前后两个版本定义的符号和路由，只关心出现或消失的
+    old_paths = list(changes['deleted']) + list(changes['modified']) + [old for old, _ in changes['renamed']]
+    old_definitions = git_old_definitions(project_root, rev, old_paths)
+    pairs = [(p, None) for p in changes['deleted']]
+    pairs += [(p, p) for p in changes['modified']]
+    pairs += [(None, p) for p in changes['added']]
+    pairs += list(changes['renamed'])
+    changed_routes = set()
+    had_routes = has_routes = False
+    nothing = (set(), set())
+    for old_path, new_path in pairs:
+        before_symbols, before_routes = old_definitions.get(old_path, nothing) if old_path else nothing
+        after_symbols, after_routes = _current_definitions(project_root, new_path) if new_path else nothing
+        for name in before_symbols ^ after_symbols:
+            impacted |= graph.docs_for_symbol(name)
+        changed_routes |= before_routes ^ after_routes
+        had_routes = had_routes or bool(before_routes)
+        has_routes = has_routes or bool(after_routes)
+
+    if changed_routes and had_routes != has_routes:
+        # 变更的文件只在一个版本中有路由时，看其余代码文件中是否有路由
+        changed_files = {p for pair in pairs for p in pair if p}
+        symbol_index = SymbolIndex.build(project_root, persist=persist)
+        if not any(entry.get('routes') for rel_path, entry in symbol_index.files.items()
+                   if rel_path not in changed_files):
+            # 代码库中没有路由时不检查端点，路由从无到有或全部消失会影响所有引用端点的文档
+            impacted |= graph.docs_with_routes()
+    impacted |= graph.docs_for_routes(changed_routes)
+
+    changed_docs = [p for p in changes['added'] + changes['modified'] if p.endswith('.md')]
+    changed_docs += [new for _, new in changes['renamed'] if new.endswith('.md')]
+    impacted |= {p for p in changed_docs if p in graph.docs}
+
+    selected = [doc_path for doc_path in doc_paths if graph.relative(doc_path) in impacted]
+    return selected, changes
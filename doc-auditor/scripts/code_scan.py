@@ -0,0 +1,79 @@
+"""
+受内存限制的代码文件扫描
+用 mmap 按需读取文件内容，跳过二进制文件和超过大小上限的文件（如打包产物、压缩后的 JS），
+搜索时找到第一个匹配就停止；被跳过的文件及原因会被记录下来
+"""
+import mmap
+import re
+from profiler import add_bytes
+
+
+DEFAULT_MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 MB
+BINARY_SNIFF_BYTES = 8192  # 检查文件开头这么多字节中是否有 NUL
+
+SKIP_TOO_LARGE = 'too_large'
+SKIP_BINARY = 'binary'
+SKIP_UNREADABLE = 'unreadable'
+
+
+class _EmptyBuffer(bytes):
+    """空文件无法 mmap，用空的 bytes 代替"""
+
+    def close(self):
+        pass
+
+
+def open_code_file(file_path, max_file_size=DEFAULT_MAX_FILE_SIZE):
+    """
+    打开代码文件用于只读扫描
+    返回 (buffer, 跳过原因)；buffer 为 mmap（或空文件时的空 bytes），用完需要 close()，
+    文件被跳过时 buffer 为 None
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            size = f.seek(0, 2)
+            if max_file_size is not None and size > max_file_size:
+                return None, SKIP_TOO_LARGE
+            if size == 0:
+                return _EmptyBuffer(), None
+
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None, SKIP_UNREADABLE
+
+    if buffer.find(b'\0', 0, BINARY_SNIFF_BYTES) != -1:
+        buffer.close()
+        return None, SKIP_BINARY
+    return buffer, None
+
+
+def compile_bytes_pattern(pattern):
+    """把字符串正则编译为 bytes 正则，以便直接在 mmap 上匹配"""
+    if isinstance(pattern, re.Pattern):
+        pattern = pattern.pattern
+    if isinstance(pattern, str):
+        pattern = pattern.encode('utf-8')
+    return re.compile(pattern)
+
+
+class CodeScanner:
+    def __init__(self, max_file_size=DEFAULT_MAX_FILE_SIZE):
+        self.max_file_size = max_file_size
+        # 路径 -> 跳过原因
+        self.skipped = {}
+
+    def search_file(self, file_path, pattern):
+        """文件中是否存在匹配（pattern 为 bytes 正则），被跳过的文件返回 False"""
+        buffer, reason = open_code_file(file_path, self.max_file_size)
+        if buffer is None:
+            self.skipped[str(file_path)] = reason
+            return False
+        try:
+            add_bytes(len(buffer))
+            return pattern.search(buffer) is not None
+        finally:
+            buffer.close()
+
+    def skipped_files(self):
+        """返回 [{'path', 'reason'}]"""
+        return [{'path': path, 'reason': reason} for path, reason in sorted(self.skipped.items())]
@@ -4,17 +4,102 @@
 只收集事实信息，不做任何判断
 """
 import os
-import re
 import json
 import argparse
 import subprocess
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from audit_cache import AuditCache, add_cache_arguments, content_hash, reference_fingerprint
+from reference_extractor import find_file_paths
+from parsed_document import ParsedDocument, as_document
+from path_snapshot import PathSnapshot
+from reference_locator import ReferenceLocator, build_sections
+from streaming import add_format_argument, iter_paths, wants_stdin, write_record
+from git_blame import GitBlame, section_blame
+from profiler import PROFILER, phase, add_profile_argument, start_profile, finish_profile
+
+
+class GitHistoryIndex:
+    """
+    仓库级 Git 历史索引
+    整个仓库只运行一次 git log --name-only，建立 路径 -> 提交列表 的映射，
+    批量收集上下文时不必为每个文档单独启动 git 进程
+
+    不限定路径的 git log 不做历史简化，合并提交也不列出文件，
+    因此索引给出的是 git log --full-history --no-merges -- <路径> 的结果：
+    与 git log -- <路径> 相比，包含被默认历史简化剪掉的旁支提交（如在分支上修改后又改回），不包含合并提交
+    """
+
+    def __init__(self, project_root):
+        self.project_root = Path(project_root)
+        self.toplevel = None
+        self.commits = []          # [(hash, date, message)]，按 git log 顺序
+        self.commits_by_path = {}  # 相对仓库根目录的路径 -> commits 下标列表
+        self.available = False
+
+    def load(self):
+        """运行 git log 建立索引，不在 Git 仓库中时返回 False"""
+        try:
+            with phase('git_log_index'):
+                toplevel = subprocess.run(
+                    ['git', 'rev-parse', '--show-toplevel'],
+                    capture_output=True, text=True, cwd=self.project_root
+                )
+                if toplevel.returncode != 0:
+                    return False
+
+                result = subprocess.run([
+                    'git', '-c', 'core.quotepath=off', 'log',
+                    '--name-only', '--no-renames', '--no-merges',
+                    '--pretty=format:%x1e%H%x1f%ai%x1f%s'
+                ], capture_output=True, text=True, cwd=self.project_root)
+                if result.returncode != 0:
+                    return False
+        except OSError:
+            return False
+
+        self.toplevel = Path(toplevel.stdout.strip()).resolve()
+
+        for record in result.stdout.split('\x1e'):
+            if not record:
+                continue
+            header, _, files = record.partition('\n')
+            parts = header.split('\x1f', 2)
+            if len(parts) != 3:
+                continue
+
+            commit_index = len(self.commits)
+            self.commits.append(tuple(parts))
+            for file_path in files.split('\n'):
+                if file_path:
+                    self.commits_by_path.setdefault(file_path, []).append(commit_index)
+
+        self.available = True
+        return True
+
+    def lookup(self, doc_path, max_commits=5):
+        """
+        返回文档最近的提交 [(hash, date, message)]
+        与 git log --full-history --no-merges -- <doc_path> 一致（见类说明，不是 git log -- <doc_path>）
+        """
+        # git log 在 project_root 下运行，相对路径也相对 project_root 解析
+        full_path = (self.project_root / doc_path).resolve()
+        try:
+            rel_path = full_path.relative_to(self.toplevel).as_posix()
+        except ValueError:
+            return []
+
+        indexes = self.commits_by_path.get(rel_path, [])
+        return [self.commits[i] for i in indexes[:max_commits]]
 
 
 class ContextCollector:
-    def __init__(self, project_root):
+    def __init__(self, project_root, cache=None, git_index=None, path_snapshot=None, blame=None):
         self.project_root = Path(project_root)
+        self.cache = cache
+        self.git_index = git_index
+        self._path_snapshot = path_snapshot
+        self.blame = blame
 
     def get_file_metadata(self, file_path):
         """获取文件元数据"""
@@ -51,31 +136,42 @@ class ContextCollector:
             }
 
     def get_git_history(self, doc_path, max_commits=5):
-        """获取 Git 历史"""
+        """
+        获取 Git 历史（有仓库级索引时直接查索引，否则单独运行 git log）
+        两种方式都按 --full-history --no-merges 的语义，结果一致
+        """
         try:
-            result = subprocess.run([
-                'git', 'log',
-                '--pretty=format:%H|%ai|%s',
-                '--max-count', str(max_commits),
-                str(doc_path)
-            ], capture_output=True, text=True, cwd=self.project_root)
-
-            if result.returncode != 0:
-                return {'commits': [], 'total_commits': 0, 'days_since_last_commit': None}
+            if self.git_index is not None and self.git_index.available:
+                entries = self.git_index.lookup(doc_path, max_commits)
+            else:
+                with phase('git_log'):
+                    result = subprocess.run([
+                        'git', 'log', '--full-history', '--no-merges',
+                        '--pretty=format:%H|%ai|%s',
+                        '--max-count', str(max_commits),
+                        '--', str(doc_path)
+                    ], capture_output=True, text=True, cwd=self.project_root)
+
+                if result.returncode != 0:
+                    return {'commits': [], 'total_commits': 0, 'days_since_last_commit': None}
+
+                entries = []
+                for line in result.stdout.strip().split('\n'):
+                    if line:
+                        parts = line.split('|', 2)
+                        if len(parts) == 3:
+                            entries.append(parts)
 
             history = []
-            now = datetime.now()
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    parts = line.split('|', 2)
-                    if len(parts) == 3:
-                        commit_date = datetime.fromisoformat(parts[1].replace('+00:00', ''))
-                        history.append({
-                            'hash': parts[0],
-                            'date': parts[1],
-                            'message': parts[2],
-                            'days_ago': (now - commit_date).days
-                        })
+            now = datetime.now(timezone.utc)
+            for commit_hash, date, message in entries:
+                commit_date = datetime.strptime(date, '%Y-%m-%d %H:%M:%S %z')
+                history.append({
+                    'hash': commit_hash,
+                    'date': date,
+                    'message': message,
+                    'days_ago': (now - commit_date).days
+                })
 
             # 计算生命周期特征
             lifecycle_pattern = self._infer_lifecycle_pattern(history)
@@ -118,24 +214,19 @@ class ContextCollector:
 
     def extract_document_structure(self, content):
         """提取文档结构"""
-        lines = content.split('\n')
+        document = as_document(content)
 
         # 提取标题
-        headings = []
-        for line in lines:
-            if line.startswith('#'):
-                headings.append(line.strip())
+        headings = [text for _, _, text in document.headings]
 
-        # 提取标题
-        title = ''
-        for line in lines[:20]:
-            if line.startswith('#'):
-                title = line.strip()
-                break
+        # 提取标题（前 20 行中的第一个）
+        outline = document.headings
+        title = outline[0][2] if outline and outline[0][0] < 20 else ''
 
         # 提取第一段
         first_paragraph = []
-        for line in lines:
+        for index in range(len(document)):
+            line = document.line(index)
             if line.strip() == '':
                 if first_paragraph:
                     break
@@ -149,68 +240,129 @@ class ContextCollector:
             'first_paragraph': ' '.join(first_paragraph[:3])  # 前 3 句
         }
 
+    def extract_file_references(self, content):
+        """提取文档中的文件引用"""
+        return [value for value, _ in find_file_paths(as_document(content).content)]
+
     def extract_issues_with_context(self, content, project_root):
-        """提取问题及上下文"""
+        """
+        提取问题及上下文
+        一次扫描定位所有缺失引用的全部出现位置；每个问题保留首次出现的上下文，
+        所有出现位置合并成互不重叠的 sections
+        """
         issues = []
-        lines = content.split('\n')
+        document = as_document(content)
 
         # 提取文件引用
-        file_pattern = r'(?:[`:]?)([a-zA-Z0-9_\-./]+\.(?:py|js|ts|tsx|java|go|rs|sh|yaml|yml|json|sql))(?:`|\)|\s|$|,)'
-        file_refs = re.findall(file_pattern, content)
+        file_refs = self.extract_file_references(document)
 
         # 检查每个引用
-        for ref in file_refs:
-            exists = self._check_file_exists(ref)
-
-            if not exists:
-                # 找到问题所在的行
-                for i, line in enumerate(lines):
-                    if ref in line:
-                        # 提取上下文（前后各 2 行）
-                        start = max(0, i - 2)
-                        end = min(len(lines), i + 3)
-
-                        issues.append({
-                            'type': 'missing_file',
-                            'reference': ref,
-                            'line_number': i + 1,
-                            'context': lines[start:end],
-                            'exists': False
-                        })
-                        break
+        missing_refs = [ref for ref in dict.fromkeys(file_refs) if not self._check_file_exists(ref)]
+        occurrences = ReferenceLocator(missing_refs).locate(document.content)
+
+        hits = []
+        for ref in missing_refs:
+            line_indexes = occurrences.get(ref)
+            if not line_indexes:
+                continue
+
+            # 提取上下文（前后各 2 行）
+            first = line_indexes[0]
+            start = max(0, first - 2)
+            end = min(len(document), first + 3)
+
+            issues.append({
+                'type': 'missing_file',
+                'reference': ref,
+                'line_number': first + 1,
+                'context': document.slice_lines(start, end),
+                'occurrences': [i + 1 for i in line_indexes],
+                'exists': False
+            })
+            hits.extend((i, ref) for i in line_indexes)
+
+        sections = [
+            {
+                'start_line': section['start'] + 1,
+                'end_line': section['end'],
+                'context': document.slice_lines(section['start'], section['end']),
+                'references': list(dict.fromkeys(ref for _, ref in section['hits'])),
+                'line_numbers': sorted({i + 1 for i, _ in section['hits']})
+            }
+            for section in build_sections(len(document), hits)
+        ]
 
         return {
             'total_issues': len(issues),
-            'issues': issues
+            'issues': issues,
+            'sections': sections
         }
 
+    @property
+    def path_snapshot(self):
+        """项目路径快照（首次使用时遍历项目目录）"""
+        if self._path_snapshot is None:
+            self._path_snapshot = PathSnapshot.build(self.project_root)
+        return self._path_snapshot
+
     def _check_file_exists(self, file_path):
-        """检查文件是否存在"""
-        path = Path(file_path)
-        if path.exists():
-            return True
+        """检查文件是否存在（查路径快照，带目录的引用也按后缀匹配）"""
+        return self.path_snapshot.resolve(file_path) is not None
+
+    def reference_fingerprint(self, references):
+        """引用的存在性指纹，用于判断缓存是否仍然有效"""
+        return reference_fingerprint(
+            ('file', p, self._check_file_exists(p)) for p in references['file_paths']
+        )
+
+    def analyze_content(self, doc_path, content):
+        """提取文档结构和问题（只依赖文档内容和引用的存在性，可缓存）"""
+        with phase('analyze'):
+            return self._analyze_content(doc_path, content)
+
+    def _analyze_content(self, doc_path, content):
+        document = as_document(content)
+        if self.cache is None:
+            return {
+                'document_structure': self.extract_document_structure(document),
+                'issues': self.extract_issues_with_context(document, self.project_root)
+            }
 
-        full_path = self.project_root / file_path
-        return full_path.exists()
+        cache_key = self.cache.make_key(doc_path)
+        doc_hash = content_hash(document.content)
+        cached = self.cache.get(cache_key, doc_hash, self.reference_fingerprint)
+        if cached is not None:
+            return cached
+
+        analysis = {
+            'document_structure': self.extract_document_structure(document),
+            'issues': self.extract_issues_with_context(document, self.project_root)
+        }
+        references = {'file_paths': sorted(set(self.extract_file_references(document)))}
+        self.cache.put(cache_key, doc_hash, references, self.reference_fingerprint(references), analysis)
+        return analysis
 
     def collect_context(self, doc_path):
         """收集文档的所有上下文信息"""
-        doc_path = Path(doc_path)
+        with PROFILER.document(doc_path):
+            return self._collect_context(Path(doc_path))
 
+    def _collect_context(self, doc_path):
         try:
-            with open(doc_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            with phase('read_doc'), open(doc_path, 'r', encoding='utf-8') as f:
+                document = ParsedDocument(f.read())
+                PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
         except Exception as e:
             return {
                 'error': f'无法读取文件: {e}',
                 'doc_path': str(doc_path)
             }
 
-        # 收集所有信息
+        # 收集所有信息（元数据和 Git 历史随时间变化，不缓存）
         metadata = self.get_file_metadata(doc_path)
         git_history = self.get_git_history(doc_path)
-        doc_structure = self.extract_document_structure(content)
-        issues_data = self.extract_issues_with_context(content, self.project_root)
+        analysis = self.analyze_content(doc_path, document)
+        issues = self.annotate_blame(analysis['issues'], doc_path)
 
         # 返回结构化上下文
         return {
@@ -218,21 +370,88 @@ class ContextCollector:
             'doc_name': doc_path.name,
             'metadata': metadata,
             'git_history': git_history,
-            'document_structure': doc_structure,
-            'issues': issues_data
+            'document_structure': analysis['document_structure'],
+            'issues': issues
         }
 
+    def annotate_blame(self, issues, doc_path):
+        """为每个问题片段加上各行的最后修改时间（同一文档只运行一次 git blame）"""
+        if self.blame is None or not issues['sections']:
+            return issues
+
+        blame = self.blame.blame(doc_path)
+        if blame is None:
+            return issues
+
+        sections = []
+        for section in issues['sections']:
+            section_age = section_blame(blame, section['start_line'] - 1, section['end_line'])
+            sections.append({**section, 'blame': section_age} if section_age else section)
+        return {**issues, 'sections': sections}
+
 
 def main():
     parser = argparse.ArgumentParser(description='收集文档上下文信息')
-    parser.add_argument('document', help='文档路径')
+    parser.add_argument('documents', help='文档路径（可指定多个；省略或为 - 时从标准输入逐行读取）', nargs='*')
     parser.add_argument('--project-root', '-p', help='项目根目录', default='.')
-    parser.add_argument('--output', '-o', help='输出文件路径（JSON 格式）')
+    parser.add_argument('--output', '-o', help='输出文件路径')
+    parser.add_argument('--no-blame', help='不为问题片段获取各行的最后修改时间（git blame）', action='store_true')
+    add_cache_arguments(parser)
+    add_format_argument(parser)
+    add_profile_argument(parser)
 
     args = parser.parse_args()
+    start_profile(args)
+
+    from_stdin = wants_stdin(args.documents)
+    documents = iter_paths() if from_stdin else args.documents
+
+    cache = None
+    if args.cache:
+        cache = AuditCache(args.project_root, 'collect_context')
+        cache.load()
+
+    # 多个文档时只运行一次 git log，所有文档共用仓库级索引
+    git_index = None
+    if from_stdin or len(args.documents) > 1:
+        git_index = GitHistoryIndex(args.project_root)
+        git_index.load()
 
-    collector = ContextCollector(args.project_root)
-    context = collector.collect_context(args.document)
+    blame = None
+    if not args.no_blame:
+        blame = GitBlame(args.project_root, persist=args.cache)
+        blame.load()
+
+    collector = ContextCollector(args.project_root, cache=cache, git_index=git_index, blame=blame)
+
+    if args.format == 'ndjson':
+        # 每收集完一个文档就输出一行
+        out = open(args.output, 'w', encoding='utf-8') if args.output else None
+        try:
+            for doc in documents:
+                write_record(collector.collect_context(doc), out)
+        finally:
+            if out is not None:
+                out.close()
+        if cache is not None:
+            cache.save()
+        if blame is not None:
+            blame.save()
+        finish_profile(args, args.project_root)
+        return
+
+    if not from_stdin and len(args.documents) == 1:
+        context = collector.collect_context(args.documents[0])
+    else:
+        context = {'documents': [collector.collect_context(doc) for doc in documents]}
+
+    if cache is not None:
+        cache.save()
+        if args.stats:
+            context = {**context, 'cache': cache.stats()}
+    if blame is not None:
+        blame.save()
+    finish_profile(args, args.project_root)
 
     # 输出 JSON
     if args.output:
@@ -0,0 +1,41 @@
+"""
+测试共用的辅助函数和夹具
+"""
+import os
+import re
+import pytest
+
+
+def write(root, rel_path, content='# Doc\n', mtime_ns=None):
+    """在 root 下写入文件（字节内容按原样写入），需要时设置修改时间，返回文件路径"""
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(content, bytes):
+        path.write_bytes(content)
+    else:
+        path.write_text(content, encoding='utf-8')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+def baseline_search(root, pattern):
+    """改动之前 DocumentAuditor.search_in_codebase 的实现"""
+    matches = []
+    for ext in ['.py', '.js', '.ts', '.tsx', '.java', '.go', '.rs']:
+        for file_path in root.rglob(f'*{ext}'):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    if re.search(pattern, f.read()):
+                        matches.append(str(file_path))
+            except Exception:
+                continue
+    return matches
+
+
+@pytest.fixture
+def project(tmp_path, request):
+    """按测试模块的 CODE（相对路径到内容）生成的项目"""
+    for rel_path, content in request.module.CODE.items():
+        write(tmp_path, rel_path, content)
+    return tmp_path
@@ -0,0 +1,199 @@
+"""
+按行获取文档的最后修改时间（git blame）
+每个文档只运行一次 git blame --incremental，结果按 文档路径 + 内容的 Git blob 哈希 缓存，
+同一文档的所有问题片段共用一次 blame；路径和内容都不变时后续运行直接读缓存
+（内容相同的不同文件、移动到新路径的文件历史不同，不共用缓存）
+"""
+import os
+import json
+import hashlib
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+from profiler import phase
+
+
+BLAME_CACHE_VERSION = 2
+BLAME_CACHE_PATH = Path('.doc-auditor') / 'blame_cache.json'
+# 缓存条目超过此数量时，保存时只保留本次用到的条目
+MAX_CACHE_ENTRIES = 5000
+# 未提交的行在 blame 中的提交哈希
+UNCOMMITTED = '0' * 40
+
+
+def blob_hash(data):
+    """与 git hash-object 相同的 blob 哈希"""
+    h = hashlib.sha1()
+    h.update(b'blob %d\0' % len(data))
+    h.update(data)
+    return h.hexdigest()
+
+
+def cache_key(rel_path, data):
+    """缓存键: 相对项目根目录的路径 + blob 哈希"""
+    return f'{rel_path}\0{blob_hash(data)}'
+
+
+def parse_incremental(output):
+    """
+    解析 git blame --incremental 的输出
+    返回 {'commits': [[哈希, 作者时间戳, 摘要]], 'lines': [每行对应的 commits 下标]}
+    """
+    commits = []
+    commit_indexes = {}
+    line_commits = {}
+
+    lines = iter(output.split('\n'))
+    for header in lines:
+        parts = header.split()
+        if len(parts) != 4:
+            continue
+        commit_hash, final_line, num_lines = parts[0], int(parts[2]), int(parts[3])
+
+        info = {}
+        # 提交信息只在第一次出现时给出，每组以 filename 行结束
+        for line in lines:
+            if line.startswith('filename '):
+                break
+            key, _, value = line.partition(' ')
+            info[key] = value
+
+        index = commit_indexes.get(commit_hash)
+        if index is None:
+            index = commit_indexes[commit_hash] = len(commits)
+            summary = '未提交的修改' if commit_hash == UNCOMMITTED else info.get('summary', '')
+            commits.append([commit_hash, int(info.get('author-time', 0)), summary])
+
+        for line_number in range(final_line, final_line + num_lines):
+            line_commits[line_number] = index
+
+    total = max(line_commits) if line_commits else 0
+    return {
+        'commits': commits,
+        'lines': [line_commits.get(n) for n in range(1, total + 1)]
+    }
+
+
+class GitBlame:
+    def __init__(self, project_root, cache_path=None, persist=True):
+        self.project_root = Path(project_root)
+        self.persist = persist  # 为 False 时只在本进程内复用结果，不读写缓存文件
+        self.cache_path = Path(cache_path) if cache_path else self.project_root / BLAME_CACHE_PATH
+        self.entries = {}
+        self.available = False
+        self.runs = 0
+        self._used = set()
+        # 含未提交行的结果只在本进程内复用
+        self._uncommitted = {}
+
+    def load(self):
+        """检查是否在 Git 仓库中并读取缓存，不在仓库中时返回 False"""
+        try:
+            result = subprocess.run(
+                ['git', 'rev-parse', '--is-inside-work-tree'],
+                capture_output=True, text=True, cwd=self.project_root
+            )
+        except OSError:
+            return False
+        self.available = result.returncode == 0 and result.stdout.strip() == 'true'
+        if not self.persist:
+            return self.available
+
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == BLAME_CACHE_VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+        return self.available
+
+    def save(self):
+        """原子写入缓存文件，失败时静默跳过"""
+        if not self.available or not self.persist:
+            return False
+        entries = self.entries
+        if len(entries) > MAX_CACHE_ENTRIES:
+            entries = {key: entries[key] for key in self._used if key in entries}
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': BLAME_CACHE_VERSION, 'entries': entries}, f,
+                          ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+            return True
+        except OSError:
+            return False
+
+    def blame(self, doc_path):
+        """返回文档的按行 blame（见 parse_incremental），不可用时返回 None"""
+        if not self.available:
+            return None
+        doc_path = Path(doc_path).resolve()
+        try:
+            data = doc_path.read_bytes()
+        except OSError:
+            return None
+
+        try:
+            rel_path = doc_path.relative_to(self.project_root.resolve()).as_posix()
+        except ValueError:
+            rel_path = doc_path.as_posix()
+        key = cache_key(rel_path, data)
+        self._used.add(key)
+        cached = self.entries.get(key) or self._uncommitted.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            with phase('git_blame'):
+                result = subprocess.run(
+                    ['git', 'blame', '--incremental', '--', doc_path.name],
+                    capture_output=True, cwd=doc_path.parent
+                )
+        except OSError:
+            return None
+        self.runs += 1
+        if result.returncode != 0:  # 未被跟踪的文件等
+            return None
+
+        blame = parse_incremental(result.stdout.decode('utf-8', errors='replace'))
+        # 含未提交行的结果会在提交后变化（路径和内容不变，缓存键也不变），不缓存
+        if any(commit[0] == UNCOMMITTED for commit in blame['commits']):
+            self._uncommitted[key] = blame
+        else:
+            self.entries[key] = blame
+        return blame
+
+
+def section_blame(blame, start, end, now=None):
+    """
+    文档第 start 到 end-1 行（从 0 开始）的修改时间
+    返回 {'line_ages': [每行距今天数，未知为 None], 'last_modified_days', 'last_commit'}
+    """
+    now = now or datetime.now(timezone.utc)
+    line_ages = []
+    newest = None
+    for line_index in range(start, end):
+        commit_index = blame['lines'][line_index] if line_index < len(blame['lines']) else None
+        if commit_index is None:
+            line_ages.append(None)
+            continue
+        commit = blame['commits'][commit_index]
+        line_ages.append((now - datetime.fromtimestamp(commit[1], timezone.utc)).days)
+        if newest is None or commit[1] > newest[1]:
+            newest = commit
+
+    if newest is None:
+        return None
+
+    return {
+        'line_ages': line_ages,
+        'last_modified_days': min(age for age in line_ages if age is not None),
+        'last_commit': {
+            'hash': newest[0],
+            'date': datetime.fromtimestamp(newest[1], timezone.utc).strftime('%Y-%m-%d'),
+            'summary': newest[2]
+        }
+    }
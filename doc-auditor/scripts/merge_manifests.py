@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+合并分片审计的部分清单
+各 CI 节点用 audit_project.py --shard i/N 生成部分清单，合并成 process_docs.py 可直接使用的清单：
+文档按路径排序（与分片顺序无关），检查重复的文档和缺失的分片
+"""
+import os
+import sys
+import json
+import argparse
+from audit_project import build_manifest
+from streaming import iter_records
+
+
+def load_partial(path):
+    """读取部分清单（audit_project.py 的 JSON 清单，或 audit_document.py --format ndjson 的输出）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            f.seek(0)
+            return {'documents': list(iter_records(f))}
+
+
+def path_key(path):
+    return os.path.normpath(path).replace(os.sep, '/')
+
+
+def merge_manifests(partials):
+    """
+    合并部分清单 [(来源, 清单)]，返回 (清单, 冲突列表)
+    同一文档出现在多个部分清单中时：结果相同只保留一份并记入 duplicates，
+    结果不同记入冲突 [{'path', 'sources'}]
+    """
+    documents = {}
+    sources = {}
+    duplicates = []
+    conflicts = []
+    shards = {}
+    skipped_files = {}
+    cache_stats = {}
+    changed_since = None
+
+    for source, manifest in partials:
+        shard = manifest.get('shard')
+        if shard:
+            shards.setdefault(shard['count'], []).append(shard['index'])
+
+        for document in manifest.get('documents', []):
+            key = path_key(document['path'])
+            previous = documents.get(key)
+            if previous is None:
+                documents[key] = document
+                sources[key] = [source]
+                continue
+            sources[key].append(source)
+            # 路径写法可能不同（如 ./docs/a.md），只比较审计结果
+            if {**previous, 'path': key} == {**document, 'path': key}:
+                duplicates.append({'path': key, 'sources': list(sources[key])})
+            else:
+                conflicts.append({'path': key, 'sources': list(sources[key])})
+
+        for item in manifest.get('skipped_files', []):
+            skipped_files.setdefault(item['path'], item['reason'])
+        for name, value in manifest.get('cache', {}).items():
+            cache_stats[name] = cache_stats.get(name, 0) + value
+
+        info = manifest.get('changed_since')
+        if info:
+            if changed_since is None:
+                changed_since = dict(info)
+            else:
+                changed_since['total_docs'] += info['total_docs']
+                changed_since['impacted_docs'] += info['impacted_docs']
+
+    merged = build_manifest([documents[key] for key in sorted(documents)])
+    if shards:
+        count = max(shards, key=lambda c: len(shards[c]))
+        indexes = shards[count]
+        merged['shards'] = {
+            'count': count,
+            'merged': sorted(set(indexes)),
+            'missing': [i for i in range(1, count + 1) if i not in indexes],
+            'repeated': sorted({i for i in indexes if indexes.count(i) > 1})
+        }
+        if len(shards) > 1:
+            merged['shards']['mismatched_counts'] = sorted(c for c in shards if c != count)
+    if cache_stats:
+        merged['cache'] = cache_stats
+    if skipped_files:
+        merged['skipped_files'] = [{'path': p, 'reason': r} for p, r in sorted(skipped_files.items())]
+    if changed_since:
+        merged['changed_since'] = changed_since
+    if duplicates:
+        merged['duplicates'] = duplicates
+    return merged, conflicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合并分片审计的部分清单')
+    parser.add_argument('manifests', help='部分清单（audit_project.py --shard 的输出）', nargs='+')
+    parser.add_argument('--output', '-o', help='输出清单路径（JSON 格式）')
+    parser.add_argument('--allow-missing', help='允许缺少分片', action='store_true')
+
+    args = parser.parse_args()
+
+    partials = [(path, load_partial(path)) for path in args.manifests]
+    manifest, conflicts = merge_manifests(partials)
+
+    errors = []
+    for conflict in conflicts:
+        errors.append(f"文档在多个部分清单中的结果不同: {conflict['path']}（{', '.join(conflict['sources'])}）")
+    shards = manifest.get('shards', {})
+    if shards.get('mismatched_counts'):
+        errors.append(f"部分清单的分片总数不一致: {[shards['count']] + shards['mismatched_counts']}")
+    if shards.get('repeated'):
+        errors.append(f"分片被重复合并: {shards['repeated']}")
+    if shards.get('missing') and not args.allow_missing:
+        errors.append(f"缺少分片: {shards['missing']}（共 {shards['count']} 个；使用 --allow-missing 忽略）")
+
+    if errors:
+        for error in errors:
+            print(f"❌ {error}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        print(f"✅ 已合并 {len(partials)} 个部分清单，共 {manifest['total_count']} 个文档，清单已保存到 {args.output}")
+        for action, count in sorted(manifest['summary'].items()):
+            print(f"  {action}: {count}")
+        if manifest.get('duplicates'):
+            print(f"  ⚠️  重复的文档（结果相同，已去重）: {len(manifest['duplicates'])}")
+    else:
+        print(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+解析后的文档（各审计阶段共用）
+每个文档只读取、解析一次：记录每行的起始偏移、标题大纲、代码块范围和 front matter，
+各阶段按行号切片取所需的行，不必各自 split 整篇文档
+"""
+import re
+from array import array
+from bisect import bisect_right
+from reference_extractor import find_code_blocks
+
+
+NEWLINE_PATTERN = re.compile('\n')
+HEADING_PATTERN = re.compile(r'^#[^\n]*', re.MULTILINE)
+# front matter 以文档第一行的 --- 开始，到下一个 --- 或 ... 行结束
+FRONT_MATTER_PATTERN = re.compile(r'\A---[ \t]*\n(.*?\n)?(?:---|\.\.\.)[ \t]*(?:\n|\Z)', re.DOTALL)
+
+
+class ParsedDocument:
+    __slots__ = ('content', 'line_offsets', '_lines', '_code_blocks', '_headings', '_front_matter')
+
+    def __init__(self, content):
+        self.content = content
+        # 第 i 行（从 0 开始）的起始偏移
+        self.line_offsets = array('I' if len(content) < 2 ** 32 else 'Q', [0])
+        self.line_offsets.extend(match.end() for match in NEWLINE_PATTERN.finditer(content))
+        self._lines = None
+        self._code_blocks = None
+        self._headings = None
+        self._front_matter = None
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    def __len__(self):
+        """行数（与 content.split('\\n') 的长度相同）"""
+        return len(self.line_offsets)
+
+    def line(self, index):
+        start = self.line_offsets[index]
+        if index + 1 < len(self.line_offsets):
+            return self.content[start:self.line_offsets[index + 1] - 1]
+        return self.content[start:]
+
+    def slice_lines(self, start, end):
+        """第 start 到 end-1 行，与 content.split('\\n')[start:end] 相同"""
+        return [self.line(i) for i in range(max(0, start), min(end, len(self.line_offsets)))]
+
+    @property
+    def lines(self):
+        """所有行（首次使用时切分一次）"""
+        if self._lines is None:
+            self._lines = self.content.split('\n')
+        return self._lines
+
+    def line_of(self, offset):
+        """字符偏移所在的行号（从 1 开始）"""
+        return bisect_right(self.line_offsets, offset)
+
+    @property
+    def code_blocks(self):
+        """围栏代码块（见 reference_extractor.find_code_blocks）"""
+        if self._code_blocks is None:
+            self._code_blocks = find_code_blocks(self.content)
+        return self._code_blocks
+
+    @property
+    def front_matter(self):
+        """front matter 的原文和结束行: (文本, 正文起始行下标)；没有时为 (None, 0)"""
+        if self._front_matter is None:
+            match = FRONT_MATTER_PATTERN.match(self.content)
+            if match:
+                self._front_matter = (match.group(1) or '', self.line_of(match.end() - 1))
+            else:
+                self._front_matter = (None, 0)
+        return self._front_matter
+
+    @property
+    def body_start(self):
+        """正文（front matter 之后）的起始行下标"""
+        return self.front_matter[1]
+
+    @property
+    def headings(self):
+        """标题大纲 [(行下标, 级别, 标题行)]：与原有各脚本一致，所有以 # 开头的行都算"""
+        if self._headings is None:
+            headings = []
+            for match in HEADING_PATTERN.finditer(self.content):
+                text = match.group()
+                headings.append((self.line_of(match.start()) - 1, len(text) - len(text.lstrip('#')), text.strip()))
+            self._headings = headings
+        return self._headings
+
+
+def as_document(content):
+    """接受文档内容或 ParsedDocument，统一返回 ParsedDocument"""
+    if isinstance(content, ParsedDocument):
+        return content
+    return ParsedDocument(content)
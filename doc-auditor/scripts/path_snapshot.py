@@ -0,0 +1,143 @@
+"""
+项目路径快照
+遍历一次项目根目录（或直接使用给定的文件列表），在内存中回答文件是否存在，
+避免对每个引用都访问文件系统；同时支持按路径后缀查找被移动到子目录中的文件
+"""
+import os
+from pathlib import Path
+from profiler import phase
+
+
+SKIP_DIRS = {'.git'}
+
+
+class PathSnapshot:
+    def __init__(self, project_root, base_dir=None):
+        self.project_root = Path(project_root)
+        self.root = os.path.abspath(project_root)
+        # 相对路径按此目录解析（与 Path(file_path).exists() 的行为一致）
+        self.base_dir = os.path.abspath(base_dir or os.getcwd())
+
+        self.files = set()         # 相对项目根目录的文件路径（'/' 分隔）
+        self.dirs = {''}           # 相对项目根目录的目录路径
+        self.symlink_dirs = set()  # 未展开的目录符号链接，其下的路径回退到文件系统检查
+        self._by_name = {}         # 文件名 -> 相对路径列表，用于后缀匹配
+
+    @classmethod
+    def build(cls, project_root, file_list=None):
+        """从文件列表（相对项目根目录）或目录遍历构建快照"""
+        snapshot = cls(project_root)
+        if file_list is None:
+            snapshot.walk()
+        else:
+            for rel_path in file_list:
+                snapshot.add_file(rel_path)
+        return snapshot
+
+    def walk(self):
+        with phase('walk_project'):
+            self._walk()
+
+    def _walk(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            rel_dir = os.path.relpath(dirpath, self.root).replace(os.sep, '/')
+            prefix = '' if rel_dir == '.' else rel_dir + '/'
+
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in dirnames:
+                self.dirs.add(prefix + name)
+                if os.path.islink(os.path.join(dirpath, name)):
+                    self.symlink_dirs.add(prefix + name)
+
+            for name in filenames:
+                rel_path = prefix + name
+                self.files.add(rel_path)
+                self._by_name.setdefault(name, []).append(rel_path)
+
+    def add_file(self, rel_path):
+        rel_path = rel_path.replace(os.sep, '/')
+        self.files.add(rel_path)
+        self._by_name.setdefault(rel_path.rsplit('/', 1)[-1], []).append(rel_path)
+
+        parent = rel_path.rpartition('/')[0]
+        while parent and parent not in self.dirs:
+            self.dirs.add(parent)
+            parent = parent.rpartition('/')[0]
+
+    def remove_file(self, rel_path):
+        rel_path = rel_path.replace(os.sep, '/')
+        self.files.discard(rel_path)
+        name = rel_path.rsplit('/', 1)[-1]
+        same_name = self._by_name.get(name)
+        if same_name and rel_path in same_name:
+            same_name.remove(rel_path)
+            if not same_name:
+                del self._by_name[name]
+
+    def _relative(self, abs_path):
+        """返回相对项目根目录的路径，不在项目内时返回 None"""
+        if abs_path == self.root:
+            return ''
+        if abs_path.startswith(self.root + os.sep):
+            return abs_path[len(self.root) + 1:].replace(os.sep, '/')
+        return None
+
+    def _path_exists(self, abs_path):
+        rel_path = self._relative(abs_path)
+        if rel_path is None:
+            # 项目外的路径不在快照中
+            return os.path.exists(abs_path)
+
+        if rel_path in self.files or rel_path in self.dirs:
+            return True
+
+        # 经过未展开的目录符号链接时，快照中没有记录
+        if self.symlink_dirs:
+            parent = rel_path.rpartition('/')[0]
+            while parent:
+                if parent in self.symlink_dirs:
+                    return os.path.exists(abs_path)
+                parent = parent.rpartition('/')[0]
+
+        return False
+
+    def exists(self, file_path):
+        """与 Path(file_path).exists() or (project_root / file_path).exists() 等价"""
+        file_path = os.fspath(file_path)
+        for base in (self.base_dir, self.root):
+            if self._path_exists(os.path.normpath(os.path.join(base, file_path))):
+                return True
+        return False
+
+    @staticmethod
+    def _suffix_parts(file_path):
+        return [p for p in Path(file_path).as_posix().split('/') if p not in ('', '.', '..')]
+
+    def find_by_suffix(self, file_path):
+        """
+        按路径后缀查找文件，如 utils/helper.py -> src/utils/helper.py
+        开头的 ./ 和 ../ 会被忽略
+        """
+        parts = self._suffix_parts(file_path)
+        if not parts:
+            return []
+
+        suffix = '/'.join(parts)
+        return sorted(
+            rel_path for rel_path in self._by_name.get(parts[-1], ())
+            if rel_path == suffix or rel_path.endswith('/' + suffix)
+        )
+
+    def resolve(self, file_path):
+        """
+        查找引用对应的文件：先精确匹配，带目录的引用再按后缀匹配
+        （只有文件名的引用不做后缀匹配，避免匹配到任意同名文件）
+        找到时返回路径，否则返回 None
+        """
+        if self.exists(file_path):
+            return os.fspath(file_path)
+        if len(self._suffix_parts(file_path)) > 1:
+            candidates = self.find_by_suffix(file_path)
+            if candidates:
+                return candidates[0]
+        return None
@@ -1,42 +1,30 @@
 #!/usr/bin/env python3
 """
 批量处理文档：删除或更新过时文档
+所有操作先写入回滚日志，再并行执行；文件通过临时文件 + 重命名原子替换，
+中途崩溃后可以用 --resume 从日志继续，或用 --rollback 恢复到处理前的状态
 """
 import os
+import sys
 import json
+import shutil
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from audit_document import DocumentAuditor
+from streaming import iter_records
+from parsed_document import ParsedDocument, as_document
+from profiler import PROFILER, phase, add_profile_argument, start_profile, finish_profile
 
 
-def delete_document(doc_path, backup=True):
-    """删除文档"""
-    doc_path = Path(doc_path)
-
-    if backup:
-        # 创建备份
-        backup_path = doc_path.with_suffix('.md.backup')
-        import shutil
-        shutil.copy2(doc_path, backup_path)
-        print(f"📦 备份已创建: {backup_path}")
+JOURNAL_PATH = Path('.doc-auditor') / 'journal.jsonl'
+WARNING_HEADER = '> **⚠️ 文档已过时**'
+# 流式处理时每批并行处理的文档数
+DEFAULT_CHUNK_SIZE = 500
 
-    # 删除文件
-    doc_path.unlink()
-    print(f"🗑️  已删除: {doc_path}")
 
-    return True
-
-
-def update_document(doc_path, issues):
-    """更新文档，添加过时标记"""
-    doc_path = Path(doc_path)
-
-    try:
-        with open(doc_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        print(f"❌ 无法读取文件: {e}")
-        return False
+def render_update(content, issues):
+    """返回添加（或替换）过时警告后的文档内容（content 可以是字符串或 ParsedDocument）"""
+    document = as_document(content)
 
     # 在文档开头添加过时警告
     warning = "> **⚠️ 文档已过时**\n"
@@ -46,6 +34,7 @@ def update_document(doc_path, issues):
     missing_files = [i for i in issues if i['type'] == 'missing_file']
     missing_funcs = [i for i in issues if i['type'] == 'missing_function']
     missing_classes = [i for i in issues if i['type'] == 'missing_class']
+    missing_endpoints = [i for i in issues if i['type'] == 'missing_endpoint']
 
     if missing_files:
         warning += f"> - 以下文件不存在: {', '.join([i['reference'] for i in missing_files])}\n"
@@ -53,38 +42,116 @@ def update_document(doc_path, issues):
         warning += f"> - 以下函数可能已删除: {', '.join([i['reference'] for i in missing_funcs])}\n"
     if missing_classes:
         warning += f"> - 以下类可能已删除: {', '.join([i['reference'] for i in missing_classes])}\n"
+    if missing_endpoints:
+        warning += f"> - 以下 API 端点可能已删除: {', '.join([i['reference'] for i in missing_endpoints])}\n"
 
     warning += "> \n"
     warning += "> 请更新文档以反映当前代码状态。\n"
     warning += "\n---\n\n"
 
     # 检查是否已经有警告
-    if not content.startswith('> **⚠️ 文档已过时**'):
-        updated_content = warning + content
-    else:
-        # 更新现有警告
-        lines = content.split('\n')
-        new_content = []
-        skip_until_separator = False
+    if not document.content.startswith(WARNING_HEADER):
+        return warning + document.content
 
-        for line in lines:
-            if line.strip() == '---' and skip_until_separator:
-                skip_until_separator = False
-                continue
-            if skip_until_separator:
-                continue
-            if line.startswith('> **⚠️'):
-                skip_until_separator = True
-                new_content.append(warning.strip())
-                continue
-            new_content.append(line)
+    # 更新现有警告
+    lines = document.lines
+    new_content = []
+    skip_until_separator = False
+
+    for line in lines:
+        if line.strip() == '---' and skip_until_separator:
+            skip_until_separator = False
+            continue
+        if skip_until_separator:
+            continue
+        if line.startswith('> **⚠️'):
+            skip_until_separator = True
+            new_content.append(warning.strip())
+            continue
+        new_content.append(line)
 
-        updated_content = '\n'.join(new_content)
+    return '\n'.join(new_content)
 
-    # 写入更新后的内容
+
+def atomic_write(path, content, newline=None):
+    """
+    写入同目录下的临时文件后重命名，保证文件要么是旧内容要么是新内容
+    newline 同 open()：恢复原内容时传入 '' 以原样写回换行符
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
     try:
-        with open(doc_path, 'w', encoding='utf-8') as f:
-            f.write(updated_content)
+        with open(tmp_path, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(content)
+        if path.exists():
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def normalize_newlines(content):
+    """统一换行符，与按文本模式读取的结果相同"""
+    return content.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def read_original(path):
+    """原样读取文件内容（不转换换行符），用于回滚时逐字节恢复"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def delete_document(doc_path, backup=True, journal=None):
+    """
+    删除文档
+    backup 为 True 时先保存原内容：给定（已开始的）回滚日志时记录在日志中，可用 rollback() 恢复；
+    否则在同目录创建 .md.backup 副本
+    """
+    doc_path = Path(doc_path)
+
+    if journal is not None:
+        path = os.path.abspath(doc_path)
+        if path not in journal.records:
+            original = read_original(doc_path) if backup else None
+            journal.record([{'op': 'delete', 'path': path, 'original': original}])
+    elif backup:
+        backup_path = doc_path.with_suffix('.md.backup')
+        shutil.copy2(doc_path, backup_path)
+        print(f"📦 备份已创建: {backup_path}")
+
+    doc_path.unlink()
+    print(f"🗑️  已删除: {doc_path}")
+    return True
+
+
+def update_document(doc_path, issues, backup=True, journal=None):
+    """
+    更新文档，添加（或替换）过时标记，内容不变时不写入
+    给定（已开始的）回滚日志且 backup 为 True 时，写入前把原内容记录在日志中
+    """
+    doc_path = Path(doc_path)
+
+    try:
+        original = read_original(doc_path)
+    except Exception as e:
+        print(f"❌ 无法读取文件: {e}")
+        return False
+
+    content = normalize_newlines(original)
+    updated_content = render_update(content, issues)
+    if updated_content == content:
+        print(f"⏭️  内容未变化: {doc_path}")
+        return True
+
+    try:
+        if journal is not None:
+            entry = {'op': 'update', 'path': os.path.abspath(doc_path), 'original': original if backup else None}
+            journal.record([entry])
+        atomic_write(doc_path, updated_content)
         print(f"✅ 已更新: {doc_path}")
         return True
     except Exception as e:
@@ -92,64 +159,316 @@ def update_document(doc_path, issues):
         return False
 
 
-def main():
-    parser = argparse.ArgumentParser(description='批量处理文档')
-    parser.add_argument('manifest', help='审计结果清单（JSON 格式）')
-    parser.add_argument('--project-root', '-p', help='项目根目录', default='.')
-    parser.add_argument('--dry-run', '-d', help='模拟运行，不实际修改文件', action='store_true')
-    parser.add_argument('--backup', '-b', help='删除前创建备份', action='store_true', default=True)
+class UnfinishedJournalError(Exception):
+    """回滚日志中有未完成的批处理，需要先继续（--resume）或回滚（--rollback）"""
 
-    args = parser.parse_args()
+    def __init__(self, path):
+        super().__init__(f'回滚日志中有未完成的批处理: {path}')
+        self.path = path
+
+
+class RollbackJournal:
+    """
+    回滚日志（JSONL）：每个将被修改或删除的文件一行，记录其原内容；
+    全部执行完毕后追加 commit 记录。没有 commit 记录的日志说明上次处理被中断
+    """
 
-    # 读取审计清单
-    with open(args.manifest, 'r', encoding='utf-8') as f:
-        manifest = json.load(f)
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = {}   # 绝对路径 -> 记录（只保留每个文件第一次被记录时的原内容）
+        self.committed = True
 
+    def load(self):
+        """读取已有日志，返回是否存在未完成的批处理"""
+        self.records = {}
+        self.committed = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return False
+
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # 崩溃时可能只写了半行
+            if record.get('op') == 'commit':
+                self.committed = True
+            else:
+                self.committed = False
+                self.records.setdefault(record['path'], record)
+        return bool(self.records) and not self.committed
+
+    def begin(self, resume):
+        """
+        开始新的批处理（清空已提交的旧日志），或在未完成的日志上继续；
+        旧日志未完成时不会清空，而是抛出 UnfinishedJournalError，以免丢掉唯一的回滚记录
+        """
+        if not resume:
+            if self.load():
+                raise UnfinishedJournalError(self.path)
+            self.records = {}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8'):
+                pass
+        self.committed = False
+
+    def record(self, entries):
+        """在修改文件之前写入并落盘"""
+        new_entries = [e for e in entries if e['path'] not in self.records]
+        if not new_entries:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in new_entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                self.records[entry['path']] = entry
+            f.flush()
+            os.fsync(f.fileno())
+
+    def commit(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'op': 'commit'}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.committed = True
+
+
+def _prepare(item, backup):
+    """读取文档并计算要执行的操作，返回 (状态, 日志记录, 新内容)"""
+    with phase('prepare', doc=item['path']):
+        return _prepare_document(item, backup)
+
+
+def _prepare_document(item, backup):
+    path = item['abs_path']
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            original = f.read()
+            PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+    except FileNotFoundError:
+        return 'missing', None, None
+    except Exception as e:
+        return f'无法读取文件: {e}', None, None
+
+    if item['action'] == 'delete':
+        entry = {'op': 'delete', 'path': path, 'original': original if backup else None}
+        return 'pending', entry, None
+
+    # 更新按统一换行符后的内容处理（与按文本模式读取一致），日志中保存原样的内容
+    document = ParsedDocument(normalize_newlines(original))
+    content = document.content
+    updated_content = render_update(document, item['issues'])
+    if updated_content == content:
+        return 'unchanged', None, None
+    entry = {'op': 'update', 'path': path, 'original': original if backup else None}
+    return 'pending', entry, updated_content
+
+
+def _apply(item, new_content, backup, journal):
+    try:
+        with phase('apply', doc=item['path']):
+            if item['action'] == 'delete':
+                # 原内容已批量写入回滚日志，这里不会重复记录
+                delete_document(item['path'], backup=backup, journal=journal)
+            else:
+                atomic_write(item['abs_path'], new_content)
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def process_manifest(manifest, dry_run=False, backup=True, workers=None, journal_path=None, resume=False):
+    """
+    按审计清单并行处理文档，返回统计
+    backup 为 True 时回滚日志记录原内容，可用 rollback() 恢复
+    """
+    return process_documents(manifest.get('documents', []), dry_run, backup, workers, journal_path, resume=resume)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def process_documents(documents, dry_run=False, backup=True, workers=None, journal_path=None,
+                      chunk_size=DEFAULT_CHUNK_SIZE, resume=False):
+    """
+    处理文档记录（可以是逐条产生的流），每 chunk_size 条并行处理一批，内存占用与清单大小无关
+    所有批次共用同一个回滚日志，全部完成后才提交；
+    上次的批处理未完成时，resume 为 True 则在其日志上继续，否则抛出 UnfinishedJournalError
+    """
     stats = {
         'deleted': 0,
         'updated': 0,
+        'unchanged': 0,
         'kept': 0,
         'errors': 0
     }
+    if journal_path is None:
+        journal_path = JOURNAL_PATH
+    journal = RollbackJournal(journal_path)
+    unfinished = journal.load()
+    if unfinished and dry_run:
+        print(f"⚠️  回滚日志中有未完成的批处理: {journal.path}")
+    elif unfinished and not resume:
+        raise UnfinishedJournalError(journal.path)
+    resume = unfinished and not dry_run
+    if resume:
+        print(f"↩️  从回滚日志继续未完成的批处理: {journal.path}")
+    started = False
 
-    # 处理每个文档
-    for doc_info in manifest.get('documents', []):
-        doc_path = doc_info['path']
-        action = doc_info.get('action', 'keep')
-        issues = doc_info.get('issues', [])
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk in _chunks(documents, chunk_size):
+            items = []
+            for doc_info in chunk:
+                action = doc_info.get('action', 'keep')
+                if action not in ('delete', 'update'):
+                    print(f"✅ 保留: {doc_info['path']}")
+                    stats['kept'] += 1
+                    continue
+                items.append({
+                    'path': doc_info['path'],
+                    'abs_path': os.path.abspath(doc_info['path']),
+                    'action': action,
+                    'issues': doc_info.get('issues', [])
+                })
 
-        print(f"\n处理: {doc_path}")
-        print(f"操作: {action}")
+            prepared = list(executor.map(lambda item: _prepare(item, backup), items))
 
-        if action == 'delete':
-            if args.dry_run:
-                print(f"🔍 [模拟] 将删除: {doc_path}")
-                stats['deleted'] += 1
-            else:
-                if delete_document(doc_path, backup=args.backup):
-                    stats['deleted'] += 1
-                else:
+            to_apply = []
+            for item, (status, entry, new_content) in zip(items, prepared):
+                label = '删除' if item['action'] == 'delete' else '更新'
+                if status == 'unchanged':
+                    print(f"⏭️  内容未变化: {item['path']}")
+                    stats['unchanged'] += 1
+                elif status == 'missing':
+                    if item['action'] == 'delete' and item['abs_path'] in journal.records:
+                        # 上次中断前已经删除
+                        print(f"🗑️  已删除: {item['path']}")
+                        stats['deleted'] += 1
+                    else:
+                        print(f"❌ 文件不存在: {item['path']}")
+                        stats['errors'] += 1
+                elif status != 'pending':
+                    print(f"❌ {status}: {item['path']}")
                     stats['errors'] += 1
-
-        elif action == 'update':
-            if args.dry_run:
-                print(f"🔍 [模拟] 将更新: {doc_path}")
-                stats['updated'] += 1
-            else:
-                if update_document(doc_path, issues):
-                    stats['updated'] += 1
+                elif dry_run:
+                    print(f"🔍 [模拟] 将{label}: {item['path']}")
+                    stats['deleted' if item['action'] == 'delete' else 'updated'] += 1
                 else:
+                    to_apply.append((item, entry, new_content))
+
+            if not to_apply:
+                continue
+
+            # 先落盘回滚日志，再修改文件
+            if not started:
+                journal.begin(resume)
+                started = True
+            journal.record([entry for _, entry, _ in to_apply])
+
+            errors = list(executor.map(lambda task: _apply(task[0], task[2], backup, journal), to_apply))
+
+            for (item, _, _), error in zip(to_apply, errors):
+                if error:
+                    print(f"❌ 处理失败: {item['path']}（{error}）")
                     stats['errors'] += 1
+                elif item['action'] == 'delete':
+                    stats['deleted'] += 1  # delete_document 已输出
+                else:
+                    print(f"✅ 已更新: {item['path']}")
+                    stats['updated'] += 1
+
+    if started or resume:
+        journal.commit()
+    return stats
+
+
+def rollback(journal_path=None):
+    """按回滚日志恢复最近一次批处理修改或删除的文档，返回统计"""
+    journal = RollbackJournal(journal_path or JOURNAL_PATH)
+    journal.load()
+    stats = {'restored': 0, 'skipped': 0, 'errors': 0}
+
+    for path, record in journal.records.items():
+        if record.get('original') is None:
+            print(f"⚠️  日志中没有原内容，无法恢复: {path}")
+            stats['skipped'] += 1
+            continue
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(path, record['original'], newline='')
+        except Exception as e:
+            print(f"❌ 无法恢复: {path}（{e}）")
+            stats['errors'] += 1
+            continue
+        print(f"↩️  已恢复: {path}")
+        stats['restored'] += 1
+
+    if not stats['errors'] and journal.path.exists():
+        journal.path.unlink()
+    return stats
+
 
-        else:  # keep
-            print(f"✅ 保留: {doc_path}")
-            stats['kept'] += 1
+def main():
+    parser = argparse.ArgumentParser(description='批量处理文档')
+    parser.add_argument('manifest', help='审计结果清单（JSON 格式；为 - 时从标准输入逐行读取 NDJSON 记录；--rollback 时省略）',
+                        nargs='?')
+    parser.add_argument('--project-root', '-p', help='项目根目录', default='.')
+    parser.add_argument('--dry-run', '-d', help='模拟运行，不实际修改文件', action='store_true')
+    parser.add_argument('--backup', '-b', help='在回滚日志中记录原内容（默认开启）',
+                        action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument('--workers', '-j', help='并行线程数', type=int)
+    parser.add_argument('--journal', help='回滚日志路径（默认: <项目根目录>/.doc-auditor/journal.jsonl）')
+    parser.add_argument('--resume', help='在未完成的回滚日志上继续上次中断的批处理', action='store_true')
+    parser.add_argument('--rollback', help='按回滚日志恢复最近一次批处理', action='store_true')
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    start_profile(args)
+
+    journal_path = args.journal or Path(args.project_root) / JOURNAL_PATH
+
+    if args.rollback:
+        stats = rollback(journal_path)
+        print(f"\n回滚完成: 恢复 {stats['restored']}，跳过 {stats['skipped']}，错误 {stats['errors']}")
+        return
+
+    if args.manifest is None:
+        parser.error('需要指定审计结果清单')
+
+    if args.manifest == '-':
+        # 流式输入：audit_document.py --format ndjson 的输出
+        documents = iter_records()
+    else:
+        # 读取审计清单
+        with open(args.manifest, 'r', encoding='utf-8') as f:
+            documents = json.load(f).get('documents', [])
+
+    try:
+        stats = process_documents(
+            documents, dry_run=args.dry_run, backup=args.backup, workers=args.workers,
+            journal_path=journal_path, resume=args.resume
+        )
+    except UnfinishedJournalError as e:
+        print(f"❌ {e}")
+        print("   使用 --resume 继续上次的批处理，或使用 --rollback 恢复到处理前的状态")
+        sys.exit(1)
+    finish_profile(args, args.project_root)
 
     # 输出统计
     print(f"\n{'='*50}")
     print(f"处理完成:")
     print(f"  删除: {stats['deleted']}")
     print(f"  更新: {stats['updated']}")
+    print(f"  未变化: {stats['unchanged']}")
     print(f"  保留: {stats['kept']}")
     print(f"  错误: {stats['errors']}")
     print(f"{'='*50}")
@@ -157,6 +476,10 @@ def main():
     if args.dry_run:
         print("\n⚠️  这是模拟运行，没有实际修改文件")
         print("   如需实际执行，请移除 --dry-run 参数")
+    elif not args.backup:
+        print(f"\n⚠️  回滚日志未记录原内容，无法回滚")
+    else:
+        print(f"\n回滚日志: {journal_path}（使用 --rollback 恢复）")
 
 
 if __name__ == '__main__':
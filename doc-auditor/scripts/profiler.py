@@ -0,0 +1,226 @@
+"""
+阶段级性能剖析
+用 with phase('名称'): 包住各个阶段（目录遍历、文件读取、引用提取、存在性检查、代码搜索、git 子进程等），
+记录墙钟时间、调用次数和读取的字节数，按阶段汇总，也按文档汇总；
+结束时输出汇总表，并写出可在 chrome://tracing 或 Perfetto 中打开的 trace 文件
+未启用时 phase() 返回空的上下文管理器，几乎没有开销
+"""
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+from pathlib import Path
+
+
+TRACE_PATH = Path('.doc-auditor') / 'trace.json'
+# trace 事件数量上限，超出后只汇总不再记录事件
+MAX_TRACE_EVENTS = 500000
+DOCUMENT_PHASE = 'document'
+
+_NULL = contextlib.nullcontext()
+
+
+def _new_stats():
+    return {'calls': 0, 'seconds': 0.0, 'bytes': 0}
+
+
+def _add_stats(stats, other):
+    stats['calls'] += other['calls']
+    stats['seconds'] += other['seconds']
+    stats['bytes'] += other['bytes']
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.totals = {}     # 阶段 -> 统计
+        self.documents = {}  # 文档路径 -> 阶段 -> 统计
+        self.events = []     # Chrome trace 事件
+        self.dropped_events = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def phase(self, name, doc=None):
+        """记录一个阶段；嵌套的阶段时间和字节数都计入外层阶段，未指定 doc 时沿用外层的文档"""
+        if not self.enabled:
+            return _NULL
+        return self._phase(name, doc)
+
+    def document(self, doc_path):
+        """审计单个文档的整个过程，其中的阶段都按该文档汇总"""
+        if not self.enabled:
+            return _NULL
+        return self._phase(DOCUMENT_PHASE, str(doc_path))
+
+    @contextlib.contextmanager
+    def _phase(self, name, doc):
+        stack = self._stack()
+        if doc is None and stack:
+            doc = stack[-1]['doc']
+        frame = {'name': name, 'doc': doc, 'bytes': 0}
+        stack.append(frame)
+        ts = time.time_ns() // 1000
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            self._record(frame, ts, seconds)
+
+    def add_bytes(self, count):
+        """当前阶段（及其外层阶段）读取了 count 字节"""
+        if not self.enabled:
+            return
+        for frame in self._stack():
+            frame['bytes'] += count
+
+    def _record(self, frame, ts, seconds):
+        name, doc, count = frame['name'], frame['doc'], frame['bytes']
+        with self._lock:
+            stats = self.totals.setdefault(name, _new_stats())
+            _add_stats(stats, {'calls': 1, 'seconds': seconds, 'bytes': count})
+            if doc is not None:
+                stats = self.documents.setdefault(doc, {}).setdefault(name, _new_stats())
+                _add_stats(stats, {'calls': 1, 'seconds': seconds, 'bytes': count})
+
+            if len(self.events) >= MAX_TRACE_EVENTS:
+                self.dropped_events += 1
+                return
+            args = {}
+            if doc is not None:
+                args['doc'] = doc
+            if count:
+                args['bytes'] = count
+            self.events.append({
+                'name': name, 'cat': 'doc-auditor', 'ph': 'X',
+                'ts': ts, 'dur': round(seconds * 1e6, 1),
+                'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args
+            })
+
+    def drain(self):
+        """取出并清空已记录的数据（worker 进程交给主进程汇总）"""
+        with self._lock:
+            data = {
+                'totals': self.totals,
+                'documents': self.documents,
+                'events': self.events,
+                'dropped_events': self.dropped_events
+            }
+            self.totals, self.documents, self.events, self.dropped_events = {}, {}, [], 0
+        return data
+
+    def merge(self, data):
+        with self._lock:
+            for name, stats in data['totals'].items():
+                _add_stats(self.totals.setdefault(name, _new_stats()), stats)
+            for doc, phases in data['documents'].items():
+                doc_phases = self.documents.setdefault(doc, {})
+                for name, stats in phases.items():
+                    _add_stats(doc_phases.setdefault(name, _new_stats()), stats)
+            room = max(0, MAX_TRACE_EVENTS - len(self.events))
+            self.events.extend(data['events'][:room])
+            self.dropped_events += data['dropped_events'] + max(0, len(data['events']) - room)
+
+    def slowest_documents(self, limit=10):
+        """按文档总耗时排序: [(路径, 统计)]"""
+        documents = [
+            (doc, phases[DOCUMENT_PHASE]) for doc, phases in self.documents.items() if DOCUMENT_PHASE in phases
+        ]
+        documents.sort(key=lambda item: item[1]['seconds'], reverse=True)
+        return documents[:limit]
+
+    def format_summary(self, limit=10):
+        lines = [f"{'阶段':<22}{'调用次数':>10}{'总耗时(s)':>12}{'平均(ms)':>12}{'读取(KB)':>12}"]
+        for name, stats in sorted(self.totals.items(), key=lambda item: item[1]['seconds'], reverse=True):
+            average = stats['seconds'] / stats['calls'] * 1000 if stats['calls'] else 0
+            lines.append(
+                f"{name:<22}{stats['calls']:>10}{stats['seconds']:>12.3f}{average:>12.2f}{stats['bytes'] / 1024:>12.1f}"
+            )
+
+        slowest = self.slowest_documents(limit)
+        if slowest:
+            lines.append('')
+            lines.append(f'最慢的 {len(slowest)} 个文档:')
+            for doc, stats in slowest:
+                phases = {
+                    name: s for name, s in self.documents[doc].items() if name != DOCUMENT_PHASE
+                }
+                detail = ''
+                if phases:
+                    name, s = max(phases.items(), key=lambda item: item[1]['seconds'])
+                    detail = f'（{name} {s["seconds"] * 1000:.1f} ms）'
+                lines.append(f"  {stats['seconds'] * 1000:>9.1f} ms  {stats['bytes'] / 1024:>8.1f} KB  {doc}{detail}")
+
+        if self.dropped_events:
+            lines.append('')
+            lines.append(f'⚠️  trace 事件超过 {MAX_TRACE_EVENTS} 个，{self.dropped_events} 个未写入 trace（汇总不受影响）')
+        return '\n'.join(lines)
+
+    def write_trace(self, trace_path):
+        """写出 Chrome trace-event 格式的 JSON，汇总数据放在 otherData 中"""
+        process_names = [
+            {'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f'doc-auditor {pid}'}}
+            for pid in sorted({event['pid'] for event in self.events})
+        ]
+        data = {
+            'traceEvents': process_names + self.events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'totals': self.totals,
+                'documents': self.documents
+            }
+        }
+        trace_path = Path(trace_path)
+        trace_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = trace_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, trace_path)
+
+
+PROFILER = Profiler()
+
+
+def phase(name, doc=None):
+    return PROFILER.phase(name, doc)
+
+
+def document(doc_path):
+    return PROFILER.document(doc_path)
+
+
+def add_bytes(count):
+    PROFILER.add_bytes(count)
+
+
+def add_profile_argument(parser):
+    parser.add_argument('--profile', help='记录各阶段的耗时、调用次数和读取字节数，输出汇总表和 Chrome trace'
+                                          '（默认: <项目根目录>/.doc-auditor/trace.json）',
+                        nargs='?', const='', metavar='TRACE')
+
+
+def start_profile(args):
+    if args.profile is not None:
+        PROFILER.enable()
+
+
+def finish_profile(args, project_root):
+    """输出汇总表（到标准错误，不影响 JSON 输出）并写出 trace 文件"""
+    if args.profile is None:
+        return
+    trace_path = args.profile or Path(project_root) / TRACE_PATH
+    PROFILER.write_trace(trace_path)
+    print(PROFILER.format_summary(), file=sys.stderr)
+    print(f"📊 trace 已保存到 {trace_path}（可在 chrome://tracing 或 Perfetto 中打开）", file=sys.stderr)
@@ -0,0 +1,130 @@
+"""
+文档引用提取器（所有审计脚本共用）
+用预编译的正则扫描一遍文档，识别文件路径、代码块范围、函数/类/变量名和 API 端点，
+每个引用都带有所在行号
+"""
+import re
+
+
+# 文件路径（如: src/utils/helper.py, ./scripts/test.sh）
+# 结果与原有各脚本中的 r'(?:[`:]?)([a-zA-Z0-9_\-./]+\.(?:py|...))(?:`|\)|\s|$|,)' 相同：
+# 结尾的分隔符不是路径字符，匹配只可能从一串路径字符的开头开始，
+# 开头的 (?<!...) 边界检查让正则在串中间的位置直接失败，不必每个位置都回溯整串
+FILE_PATH_PATTERN = re.compile(
+    r'(?<![a-zA-Z0-9_\-./])[a-zA-Z0-9_\-./]+\.(?:py|js|ts|tsx|java|go|rs|sh|yaml|yml|json|sql)(?=[`)\s,]|\Z)'
+)
+# API 端点（如: GET /users/{id}）
+API_PATTERN = re.compile(r'(GET|POST|PUT|DELETE|PATCH)\s+([\/\w\-{}]+)')
+# 代码块围栏行
+FENCE_PATTERN = re.compile(r'^[ \t]*```[ \t]*([^\n`]*?)[ \t]*$', re.MULTILINE)
+# 代码块中的函数/类定义
+DEFINITION_PATTERN = re.compile(
+    r'def\s+(\w+)\s*\(|function\s+(\w+)\s*\(|class\s+(\w+)\s*[:\(]'
+)
+# 变量赋值，结果与原有的 r'(\w+)\s*=\s*' 相同（同样只从单词开头匹配）
+VARIABLE_PATTERN = re.compile(r'(?<!\w)(\w+)\s*=\s*')
+
+# 只从这些语言（或未标注语言）的代码块中提取符号
+CODE_LANGUAGES = {'', 'python', 'javascript', 'typescript', 'java', 'go', 'rust', 'bash', 'sh'}
+
+
+class _LineCounter:
+    """按递增的偏移量计算行号（偏移量必须单调递增），整篇文档只数一遍换行符"""
+
+    def __init__(self, content):
+        self.content = content
+        self.offset = 0
+        self.line = 1
+
+    def __call__(self, offset):
+        self.line += self.content.count('\n', self.offset, offset)
+        self.offset = offset
+        return self.line
+
+
+def find_code_blocks(content):
+    """
+    查找代码块范围
+    返回 [{'language', 'start_line', 'end_line', 'start', 'end', 'content'}]，
+    start/end 为代码内容在文档中的字符偏移，未闭合的代码块会被忽略
+    """
+    blocks = []
+    line_of = _LineCounter(content)
+    opening = None
+
+    for match in FENCE_PATTERN.finditer(content):
+        if opening is None:
+            opening = match
+            continue
+
+        start = opening.end() + 1
+        end = match.start()
+        blocks.append({
+            'language': opening.group(1),
+            'start_line': line_of(opening.start()),
+            'end_line': line_of(match.start()),
+            'start': start,
+            'end': end,
+            'content': content[start:end] if end > start else ''
+        })
+        opening = None
+
+    return blocks
+
+
+def find_file_paths(content):
+    """查找文件路径引用，返回 [(路径, 行号)]"""
+    line_of = _LineCounter(content)
+    return [(match.group(), line_of(match.start())) for match in FILE_PATH_PATTERN.finditer(content)]
+
+
+def extract_references(content, code_blocks=None):
+    """
+    提取文档中的所有引用
+    返回的每类引用都是 (值, 行号) 列表，行号从 1 开始；
+    api_endpoints 额外带上 HTTP 方法: (路径, 行号, 方法)；
+    code_blocks 为 find_code_blocks 返回的代码块中属于 CODE_LANGUAGES 的部分
+    （已解析过代码块时可以直接传入，如 ParsedDocument.code_blocks）
+    """
+    # 文件路径和 API 端点在整篇文档中提取
+    line_of = _LineCounter(content)
+    tokens = {
+        'file_paths': find_file_paths(content),
+        'function_names': [],
+        'class_names': [],
+        'variables': [],
+        'api_endpoints': [
+            (match.group(2), line_of(match.start()), match.group(1))
+            for match in API_PATTERN.finditer(content)
+        ],
+        'code_blocks': []
+    }
+
+    # 函数名、类名、变量只从代码块中提取
+    definition_line_of = _LineCounter(content)
+    variable_line_of = _LineCounter(content)
+    if code_blocks is None:
+        code_blocks = find_code_blocks(content)
+    for block in code_blocks:
+        if block['language'] not in CODE_LANGUAGES:
+            continue
+        tokens['code_blocks'].append(block)
+
+        start, end = block['start'], block['end']
+        for match in DEFINITION_PATTERN.finditer(content, start, end):
+            line_number = definition_line_of(match.start())
+            function_name = match.group(1) or match.group(2)
+            if function_name:
+                tokens['function_names'].append((function_name, line_number))
+            else:
+                tokens['class_names'].append((match.group(3), line_number))
+
+        for match in VARIABLE_PATTERN.finditer(content, start, end):
+            tokens['variables'].append((match.group(1), variable_line_of(match.start())))
+
+    return tokens
+
+
+def reference_values(tokens):
+    """去掉行号，按首次出现顺序去重"""
+    return list(dict.fromkeys(token[0] for token in tokens))
@@ -0,0 +1,185 @@
+"""
+文档引用图
+记录每篇文档引用的文件路径、函数/类名和 API 端点，并建立 路径/符号/端点 -> 文档 的反向映射，
+用于在代码变化后找出需要重新审计的文档；图保存在磁盘上，只重新解析发生变化的文档
+"""
+import os
+import json
+from pathlib import Path
+from reference_extractor import extract_references, reference_values
+from route_trie import RouteTrie
+
+
+GRAPH_VERSION = 3
+GRAPH_PATH = Path('.doc-auditor') / 'reference_graph.json'
+
+
+def path_key(file_path):
+    """引用路径的规范形式（去掉 ./ 和 ../），用于与变化的文件按后缀匹配"""
+    return '/'.join(p for p in Path(file_path).as_posix().split('/') if p not in ('', '.', '..'))
+
+
+class ReferenceGraph:
+    def __init__(self, project_root, graph_path=None):
+        self.project_root = Path(project_root)
+        self.root = os.path.abspath(project_root)
+        if graph_path is None:
+            graph_path = self.project_root / GRAPH_PATH
+        self.graph_path = Path(graph_path)
+
+        # 文档相对路径 -> {'mtime_ns', 'size', 'paths', 'symbols', 'routes'}
+        self.docs = {}
+        self.docs_by_path = {}    # 规范化的路径引用 -> 文档集合
+        self.docs_by_symbol = {}  # 函数名/类名 -> 文档集合
+        self.docs_by_route = {}   # 'METHOD /path' -> 文档集合
+        self._dirty = False
+
+    @classmethod
+    def build(cls, project_root, doc_paths, graph_path=None, persist=True):
+        """加载磁盘上的引用图，按文档列表增量刷新后返回"""
+        graph = cls(project_root, graph_path)
+        if persist:
+            graph.load()
+        graph.refresh(doc_paths)
+        if persist and graph._dirty:
+            graph.save()
+        return graph
+
+    def load(self):
+        try:
+            with open(self.graph_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if data.get('version') != GRAPH_VERSION:
+            return False
+
+        for rel_path, entry in data.get('docs', {}).items():
+            self._link(rel_path, entry)
+        return True
+
+    def save(self):
+        """保存到磁盘（原子替换，失败时静默跳过）"""
+        data = {
+            'version': GRAPH_VERSION,
+            'docs': self.docs
+        }
+        tmp_path = self.graph_path.with_suffix('.tmp')
+        try:
+            self.graph_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.graph_path)
+            self._dirty = False
+            return True
+        except OSError:
+            return False
+
+    def relative(self, doc_path):
+        return os.path.relpath(os.path.abspath(doc_path), self.root).replace(os.sep, '/')
+
+    def absolute(self, rel_path):
+        return os.path.join(self.root, rel_path)
+
+    def refresh(self, doc_paths):
+        """只重新解析新增或修改过的文档，不在列表中的文档被移除"""
+        seen = set()
+        for doc_path in doc_paths:
+            rel_path = self.relative(doc_path)
+            seen.add(rel_path)
+            try:
+                st = os.stat(self.absolute(rel_path))
+            except OSError:
+                self.remove(rel_path)
+                continue
+
+            entry = self.docs.get(rel_path)
+            if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+                continue
+            self.update(rel_path, st)
+
+        for rel_path in list(self.docs):
+            if rel_path not in seen:
+                self.remove(rel_path)
+
+    def update(self, rel_path, st=None):
+        """重新解析一篇文档的引用，文档不存在时移除"""
+        self.remove(rel_path)
+        full_path = self.absolute(rel_path)
+        try:
+            if st is None:
+                st = os.stat(full_path)
+            with open(full_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception:
+            return
+
+        tokens = extract_references(content)
+        self._link(rel_path, {
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'paths': sorted({path_key(p) for p in reference_values(tokens['file_paths'])}),
+            'symbols': sorted(
+                set(reference_values(tokens['function_names'])) | set(reference_values(tokens['class_names']))
+            ),
+            # 与 DocumentAuditor 中 api_routes 的形式一致
+            'routes': sorted({f'{method} {path}' for path, _, method in tokens['api_endpoints']})
+        })
+        self._dirty = True
+
+    def remove(self, rel_path):
+        entry = self.docs.pop(rel_path, None)
+        if entry is None:
+            return
+        for lookup, keys in ((self.docs_by_path, entry['paths']), (self.docs_by_symbol, entry['symbols']),
+                             (self.docs_by_route, entry['routes'])):
+            for key in keys:
+                docs = lookup.get(key)
+                if docs is not None:
+                    docs.discard(rel_path)
+                    if not docs:
+                        del lookup[key]
+        self._dirty = True
+
+    def _link(self, rel_path, entry):
+        self.docs[rel_path] = entry
+        for key in entry['paths']:
+            self.docs_by_path.setdefault(key, set()).add(rel_path)
+        for name in entry['symbols']:
+            self.docs_by_symbol.setdefault(name, set()).add(rel_path)
+        for route in entry['routes']:
+            self.docs_by_route.setdefault(route, set()).add(rel_path)
+
+    def docs_for_path(self, rel_path):
+        """引用了该文件的文档（引用可能只写了路径的后半段，如 utils/helper.py）"""
+        docs = set()
+        parts = rel_path.split('/')
+        for i in range(len(parts)):
+            docs |= self.docs_by_path.get('/'.join(parts[i:]), set())
+        return docs
+
+    def docs_for_symbol(self, name):
+        return set(self.docs_by_symbol.get(name, ()))
+
+    def docs_for_routes(self, routes):
+        """
+        引用的端点会被给定路由 [(方法, 路径)] 匹配到的文档
+        （按路由前缀树的规则匹配，如代码中新增的 /users/<id> 会影响引用 GET /users/{id} 的文档）
+        """
+        trie = RouteTrie(routes)
+        if not len(trie):
+            return set()
+        docs = set()
+        for route, route_docs in self.docs_by_route.items():
+            method, _, path = route.partition(' ')
+            if path.startswith('/') and trie.match(method, path):
+                docs |= route_docs
+        return docs
+
+    def docs_with_routes(self):
+        """引用了任何 API 端点的文档"""
+        docs = set()
+        for route_docs in self.docs_by_route.values():
+            docs |= route_docs
+        return docs
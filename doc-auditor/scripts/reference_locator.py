@@ -0,0 +1,95 @@
+"""
+多模式引用定位器
+用 Aho-Corasick 自动机一次扫描文档，找出所有引用的全部出现位置，
+再把相邻的上下文窗口合并成不重叠的问题片段
+"""
+from collections import deque
+
+
+class ReferenceLocator:
+    def __init__(self, references):
+        # 状态 0 为根；goto[s] 为状态 s 的转移表，fail[s] 为失败指针，
+        # output[s] 为到达状态 s 时匹配完成的引用
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        self.references = []
+
+        for reference in dict.fromkeys(references):
+            if reference:
+                self._add(reference)
+                self.references.append(reference)
+        self._build_fail_links()
+
+    def _add(self, reference):
+        state = 0
+        for ch in reference:
+            next_state = self.goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][ch] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+            state = next_state
+        self.output[state] = self.output[state] + (reference,)
+
+    def _build_fail_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(ch, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def locate(self, content):
+        """
+        返回每个引用出现的所有行（行下标从 0 开始）: {引用: [行下标, ...]}
+        同一行中出现多次只记录一次
+        """
+        occurrences = {}
+        if not self.references:
+            return occurrences
+
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        line_index = 0
+
+        for ch in content:
+            if ch == '\n':
+                line_index += 1
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for reference in output[state]:
+                    lines = occurrences.setdefault(reference, [])
+                    if not lines or lines[-1] != line_index:
+                        lines.append(line_index)
+
+        return occurrences
+
+
+def build_sections(line_count, hits, radius=2):
+    """
+    把命中的行合并成上下文片段
+    line_count 为文档行数，hits 为 [(行下标, 附带数据)]；每个命中取前后 radius 行，重叠的窗口合并为一个片段
+    返回 [{'start', 'end', 'hits'}]，start/end 为片段的行下标范围 [start, end)
+    """
+    sections = []
+    for line_index, payload in sorted(hits, key=lambda hit: hit[0]):
+        start = max(0, line_index - radius)
+        end = min(line_count, line_index + radius + 1)
+        if sections and start < sections[-1]['end']:
+            section = sections[-1]
+            section['end'] = max(section['end'], end)
+            section['hits'].append((line_index, payload))
+        else:
+            sections.append({'start': start, 'end': end, 'hits': [(line_index, payload)]})
+    return sections
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+审计结果存储（SQLite，WAL 模式）
+每次审计记为一次运行，文档、问题和引用分表保存并建立索引，
+可以跨运行查询，例如"最近一周内操作变为 delete 的文档"
+"""
+import os
+import re
+import json
+import sqlite3
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+
+STORE_PATH = Path('.doc-auditor') / 'results.db'
+DEFAULT_BATCH_SIZE = 500
+# 存入 doc_references 表的引用类型
+REFERENCE_KINDS = ('file_paths', 'function_names', 'class_names', 'api_routes')
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tool TEXT NOT NULL,
+    project_root TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    doc_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS documents (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    path TEXT NOT NULL,
+    status TEXT,
+    action TEXT,
+    issue_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, path)
+);
+CREATE INDEX IF NOT EXISTS documents_path ON documents (path, run_id);
+CREATE INDEX IF NOT EXISTS documents_action ON documents (action, run_id);
+CREATE TABLE IF NOT EXISTS issues (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    path TEXT NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT,
+    reference TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS issues_doc ON issues (run_id, path);
+CREATE INDEX IF NOT EXISTS issues_type ON issues (type, run_id);
+CREATE TABLE IF NOT EXISTS doc_references (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS doc_references_doc ON doc_references (run_id, path);
+CREATE INDEX IF NOT EXISTS doc_references_value ON doc_references (kind, value);
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime(TIME_FORMAT)
+
+
+def parse_since(value):
+    """'7d'、'12h'、'2w' 或日期（YYYY-MM-DD[ HH:MM:SS]）转为 UTC 时间字符串"""
+    match = re.fullmatch(r'(\d+)([hdw])', value.strip())
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        delta = {'h': timedelta(hours=amount), 'd': timedelta(days=amount), 'w': timedelta(weeks=amount)}[unit]
+        return (datetime.now(timezone.utc) - delta).strftime(TIME_FORMAT)
+
+    for fmt in (TIME_FORMAT, '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime(TIME_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f'无法解析时间: {value}')
+
+
+class ResultStore:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._run_roots = {}
+
+    @classmethod
+    def for_project(cls, project_root, db_path=None):
+        return cls(db_path or Path(project_root) / STORE_PATH)
+
+    def close(self):
+        self.conn.close()
+
+    def begin_run(self, tool, project_root):
+        project_root = os.path.abspath(project_root)
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO runs (tool, project_root, started_at) VALUES (?, ?, ?)',
+                (tool, project_root, _now())
+            )
+        self._run_roots[cursor.lastrowid] = project_root
+        return cursor.lastrowid
+
+    def _doc_key(self, run_id, path):
+        """文档路径统一存为相对项目根目录的路径，不同工作目录下的运行才能互相比较"""
+        project_root = self._run_roots.get(run_id)
+        if project_root is None:
+            row = self.conn.execute('SELECT project_root FROM runs WHERE id = ?', (run_id,)).fetchone()
+            project_root = self._run_roots[run_id] = row['project_root']
+        return os.path.relpath(os.path.abspath(path), project_root).replace(os.sep, '/')
+
+    def add_documents(self, run_id, documents, batch_size=DEFAULT_BATCH_SIZE):
+        """批量写入文档审计结果（每条为带 'path' 的结果记录），每 batch_size 篇提交一次"""
+        for _ in self.write_through(run_id, documents, batch_size):
+            pass
+
+    def write_through(self, run_id, documents, batch_size=DEFAULT_BATCH_SIZE):
+        """边写入边把记录原样传给下游，用于流式处理"""
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                self._write_batch(run_id, batch)
+                batch = []
+            yield document
+        if batch:
+            self._write_batch(run_id, batch)
+
+    def _write_batch(self, run_id, documents):
+        # 同一运行中重复出现的文档以最后一次为准，三张表都按 (run_id, path) 整体替换
+        latest = {}
+        for document in documents:
+            latest[self._doc_key(run_id, document['path'])] = document
+
+        doc_rows = []
+        issue_rows = []
+        reference_rows = []
+        for path, document in latest.items():
+            issues = document.get('issues', [])
+            doc_rows.append((run_id, path, document.get('status'), document.get('action'), len(issues)))
+            for issue in issues:
+                issue_rows.append((
+                    run_id, path, issue.get('type'), issue.get('severity'),
+                    issue.get('reference'), issue.get('message')
+                ))
+            references = document.get('references') or {}
+            for kind in REFERENCE_KINDS:
+                for value in references.get(kind, ()):
+                    reference_rows.append((run_id, path, kind, value))
+
+        keys = [(run_id, path) for path in latest]
+        with self.conn:
+            self.conn.executemany('DELETE FROM issues WHERE run_id = ? AND path = ?', keys)
+            self.conn.executemany('DELETE FROM doc_references WHERE run_id = ? AND path = ?', keys)
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO documents (run_id, path, status, action, issue_count) VALUES (?, ?, ?, ?, ?)',
+                doc_rows
+            )
+            self.conn.executemany(
+                'INSERT INTO issues (run_id, path, type, severity, reference, message) VALUES (?, ?, ?, ?, ?, ?)',
+                issue_rows
+            )
+            self.conn.executemany(
+                'INSERT INTO doc_references (run_id, path, kind, value) VALUES (?, ?, ?, ?)',
+                reference_rows
+            )
+            self.conn.execute(
+                'UPDATE runs SET doc_count = (SELECT COUNT(*) FROM documents WHERE run_id = ?) WHERE id = ?',
+                (run_id, run_id)
+            )
+
+    def finish_run(self, run_id):
+        with self.conn:
+            self.conn.execute('UPDATE runs SET finished_at = ? WHERE id = ?', (_now(), run_id))
+
+    def record_run(self, tool, project_root, documents, batch_size=DEFAULT_BATCH_SIZE):
+        """写入一次完整的运行，返回运行 ID"""
+        run_id = self.begin_run(tool, project_root)
+        self.add_documents(run_id, documents, batch_size)
+        self.finish_run(run_id)
+        return run_id
+
+    def runs(self, limit=20):
+        rows = self.conn.execute('SELECT * FROM runs ORDER BY id DESC LIMIT ?', (limit,))
+        return [dict(row) for row in rows]
+
+    def action_changes(self, to_action=None, since=None):
+        """
+        返回操作发生变化的文档: [{'path', 'tool', 'project_root', 'previous_action', 'action', 'run_id', 'changed_at'}]
+        与该文档上一次出现在同一工具、同一项目的运行中时比较（只审计部分文档的运行不影响其他文档）；
+        首次出现的文档 previous_action 为 None
+        """
+        query = """
+            WITH history AS (
+                SELECT d.path, r.tool, r.project_root, d.action, d.run_id, r.started_at,
+                       LAG(d.action) OVER (
+                           PARTITION BY r.tool, r.project_root, d.path ORDER BY d.run_id
+                       ) AS previous_action
+                FROM documents d JOIN runs r ON r.id = d.run_id
+            )
+            SELECT path, tool, project_root, previous_action, action, run_id, started_at AS changed_at
+            FROM history
+            WHERE previous_action IS NOT action
+        """
+        params = []
+        if to_action:
+            query += ' AND action = ?'
+            params.append(to_action)
+        if since:
+            query += ' AND started_at >= ?'
+            params.append(since)
+        query += ' ORDER BY run_id, path'
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def latest_documents(self, action=None):
+        """最近一次运行中的文档"""
+        query = 'SELECT * FROM documents WHERE run_id = (SELECT MAX(id) FROM runs)'
+        params = []
+        if action:
+            query += ' AND action = ?'
+            params.append(action)
+        return [dict(row) for row in self.conn.execute(query + ' ORDER BY path', params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='查询审计结果存储')
+    parser.add_argument('--project-root', '-p', help='项目根目录', default='.')
+    parser.add_argument('--db', help='数据库路径（默认: <项目根目录>/.doc-auditor/results.db）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    runs_parser = subparsers.add_parser('runs', help='列出最近的运行')
+    runs_parser.add_argument('--limit', type=int, default=20)
+
+    changes_parser = subparsers.add_parser('changes', help='列出操作发生变化的文档')
+    changes_parser.add_argument('--to', help='只看变为该操作的文档（如 delete）')
+    changes_parser.add_argument('--since', help='起始时间（如 7d、12h、2w 或 2024-01-31）')
+
+    latest_parser = subparsers.add_parser('latest', help='列出最近一次运行中的文档')
+    latest_parser.add_argument('--action', help='只看该操作的文档')
+
+    import_parser = subparsers.add_parser('import', help='导入已有的审计清单（JSON 格式）')
+    import_parser.add_argument('manifest', help='audit_project.py 输出的清单')
+
+    args = parser.parse_args()
+
+    store = ResultStore.for_project(args.project_root, args.db)
+    try:
+        if args.command == 'runs':
+            result = store.runs(args.limit)
+        elif args.command == 'changes':
+            since = parse_since(args.since) if args.since else None
+            result = store.action_changes(args.to, since)
+        elif args.command == 'latest':
+            result = store.latest_documents(args.action)
+        else:
+            with open(args.manifest, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            run_id = store.record_run('import', args.project_root, manifest.get('documents', []))
+            result = {'run_id': run_id, 'doc_count': len(manifest.get('documents', []))}
+    finally:
+        store.close()
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+API 路由索引
+从 Flask / FastAPI 装饰器和 Express 风格的 app.get(...)、router.post(...) 调用中提取路由，
+按路径模板存入前缀树：/users/{id}、/users/<int:id>、/users/:id 视为同一路由，
+查找文档中的端点只需按路径段走一遍树。
+蓝图和子路由（Blueprint、APIRouter、express.Router 等）可能在别处挂载到未知前缀下
+（register_blueprint(url_prefix=...)、include_router(prefix=...)、app.use('/api', router)），
+它们的路由记为 /.../<路径>，匹配文档端点路径的任意后缀
+"""
+import re
+
+
+# 候选: .route('/x')、.get("/x")、.post(`/x`) 等，再按所在行中调用之前的部分判断是否为路由定义
+ROUTE_PATTERN = re.compile(
+    rb'\.(route|api_route|get|post|put|delete|patch)\(\s*[\'"`](/[^\'"`\s]*)[\'"`]'
+)
+# 装饰器: @app.route('/x')、@bp.get("/x")、@router.post('/x')（接收者不限）
+DECORATOR_PREFIX = re.compile(rb'[ \t]*@\w+(?:\.\w+)*')
+# Express 风格的调用只认常见的应用/路由对象: app.get('/x', ...)、router.delete(`/x`)、usersRouter.post(...)；
+# requests.get('/x')、session.post('/login') 之类的 HTTP 客户端调用不是路由
+RECEIVER_SUFFIX = re.compile(
+    rb'(?:^|[^\w.@])(?:\w+\.)*(?:app|router|api|server|bp|blueprint|\w+(?:Router|_router|App|_app|_bp))$'
+)
+
+# 根应用对象，其路由的路径是完整的；其他接收者（router、bp 等）的路由可能挂载在前缀下
+ROOT_RECEIVER = re.compile(rb'(?:app|server|api|\w+(?:App|_app))')
+RECEIVER_NAME = re.compile(rb'(\w+)$')
+# 同一文件中创建的蓝图/子路由及其自带的前缀: bp = Blueprint('x', __name__, url_prefix='/x')、router = APIRouter(prefix='/x')
+ROUTER_CONSTRUCTOR = re.compile(rb'\b(\w+)\s*(?::\s*\w+\s*)?=\s*(?:[\w.]+\.)?(?:APIRouter|Blueprint)\s*\(([^)]*)\)')
+PREFIX_ARGUMENT = re.compile(rb'\b(?:url_)?prefix\s*=\s*[\'"]([^\'"]*)[\'"]')
+
+ANY_METHOD = 'ANY'
+MOUNT = '...'     # 路径开头的未知挂载前缀（零个或多个路径段）
+PARAM = '*'       # 单个路径参数
+CATCH_ALL = '**'  # 匹配剩余所有路径段（如 <path:p>、* ）
+
+# 路径参数的几种写法: {id}、{id:int}、<id>、<int:id>、:id、:id?
+_PARAM_SEGMENT = re.compile(r'^(?:\{[^}]*\}|<(?:\w+:)?\w+>|:\w+\??)$')
+_CATCH_ALL_SEGMENT = re.compile(r'^(?:<path:\w+>|\{\w+:path\}|\*\w*|:\w+\*)$')
+
+
+def parse_routes(content):
+    """
+    从代码内容（bytes 或 mmap）中提取 [(方法, 路径)]，route/api_route 的方法记为 ANY
+    蓝图/子路由的路由加上同一文件中构造时给出的前缀，并以 /... 开头表示可能挂载在未知前缀下
+    """
+    router_prefixes = {}
+    for match in ROUTER_CONSTRUCTOR.finditer(content):
+        argument = PREFIX_ARGUMENT.search(match.group(2))
+        router_prefixes[match.group(1)] = argument.group(1).rstrip(b'/') if argument else b''
+
+    routes = set()
+    for match in ROUTE_PATTERN.finditer(content):
+        start = match.start()
+        line_prefix = content[content.rfind(b'\n', 0, start) + 1:start]
+        if not (DECORATOR_PREFIX.fullmatch(line_prefix) or RECEIVER_SUFFIX.search(line_prefix)):
+            continue
+        name = match.group(1).decode('ascii')
+        method = ANY_METHOD if name in ('route', 'api_route') else name.upper()
+        path = match.group(2)
+        receiver = RECEIVER_NAME.search(line_prefix).group(1)
+        if receiver in router_prefixes or not ROOT_RECEIVER.fullmatch(receiver):
+            path = b'/' + MOUNT.encode('ascii') + router_prefixes.get(receiver, b'') + path
+        routes.add((method, path.decode('utf-8', errors='replace')))
+    return sorted(routes)
+
+
+def split_path(path):
+    """把路径模板拆成规范化的路径段，参数统一为 PARAM"""
+    segments = []
+    for segment in path.strip('/').split('/'):
+        if not segment:
+            continue
+        if segment == MOUNT and not segments:
+            segments.append(MOUNT)
+            continue
+        if _CATCH_ALL_SEGMENT.match(segment):
+            segments.append(CATCH_ALL)
+            break
+        segments.append(PARAM if _PARAM_SEGMENT.match(segment) else segment)
+    return segments
+
+
+class _Node:
+    __slots__ = ('children', 'methods')
+
+    def __init__(self):
+        self.children = {}
+        self.methods = None  # 在此结束的路由的方法集合
+
+
+class RouteTrie:
+    def __init__(self, routes=()):
+        self.root = _Node()
+        self.count = 0
+        for method, path in routes:
+            self.add(method, path)
+
+    def add(self, method, path):
+        node = self.root
+        for segment in split_path(path):
+            node = node.children.setdefault(segment, _Node())
+        if node.methods is None:
+            node.methods = set()
+        node.methods.add(method.upper())
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def match(self, method, path):
+        """文档中的端点是否有对应的路由（文档中的参数只匹配代码中的参数）"""
+        method = method.upper()
+        segments = split_path(path)
+        # 每个路径段只有字面量和参数两种走法，待查状态数有限
+        stack = [(self.root, 0)]
+        mount = self.root.children.get(MOUNT)
+        if mount is not None:
+            # 挂载前缀可以吃掉端点路径开头任意多个路径段
+            stack.extend((mount, i) for i in range(len(segments) + 1))
+        while stack:
+            node, i = stack.pop()
+            catch_all = node.children.get(CATCH_ALL)
+            if catch_all is not None and _accepts(catch_all, method):
+                return True
+            if i == len(segments):
+                if _accepts(node, method):
+                    return True
+                continue
+
+            segment = segments[i]
+            param = node.children.get(PARAM)
+            if param is not None:
+                stack.append((param, i + 1))
+            if segment != PARAM and segment != CATCH_ALL:
+                literal = node.children.get(segment)
+                if literal is not None:
+                    stack.append((literal, i + 1))
+        return False
+
+
+def _accepts(node, method):
+    return node.methods is not None and (method in node.methods or ANY_METHOD in node.methods)
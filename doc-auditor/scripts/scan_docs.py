@@ -3,27 +3,202 @@
 扫描项目中所有 Markdown 文档
 """
 import os
+import re
+import hashlib
 import argparse
 from pathlib import Path
 import json
+from streaming import add_format_argument, write_record
+from profiler import phase, add_profile_argument, start_profile, finish_profile
 
 
-def find_markdown_files(root_dir, exclude_dirs=None):
-    """查找所有 Markdown 文件"""
+DEFAULT_EXCLUDE_DIRS = ['.git', 'node_modules', '__pycache__', '.venv', 'venv', 'dist', 'build']
+IGNORE_FILE_NAMES = ('.gitignore',)
+PROJECT_IGNORE_FILE = '.auditignore'
+
+
+def _glob_to_regex(pattern):
+    """把 gitignore 通配符转换为正则（支持 *、?、[...] 和 **）"""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('/**', i) and i + 3 == len(pattern):
+            regex.append('/.*')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+            continue
+        if c == '*':
+            regex.append('[^/]*')
+        elif c == '?':
+            regex.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex.append(f'[{body}]')
+                i = end
+        elif c == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return re.compile(''.join(regex) + r'\Z')
+
+
+class IgnoreRule:
+    """一条 gitignore 规则"""
+
+    def __init__(self, base, pattern):
+        self.base = base  # 规则文件所在目录（相对扫描根目录，'' 表示根目录）
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        # 含有 '/' 的规则相对规则文件所在目录匹配，否则匹配任意层级的名字
+        self.anchored = '/' in pattern
+        self.regex = _glob_to_regex(pattern.lstrip('/'))
+
+    def matches(self, rel_path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base + '/'):
+                return False
+            rel_path = rel_path[len(self.base) + 1:]
+        if self.anchored:
+            return self.regex.match(rel_path) is not None
+        return self.regex.match(rel_path.rsplit('/', 1)[-1]) is not None
+
+
+def load_ignore_rules(ignore_file, base):
+    """读取 .gitignore / .auditignore 规则"""
+    rules = []
+    try:
+        with open(ignore_file, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return rules
+
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        rules.append(IgnoreRule(base, line))
+    return rules
+
+
+def is_ignored(rules, rel_path, is_dir):
+    """按 gitignore 语义判断：最后一条匹配的规则生效"""
+    ignored = False
+    for rule in rules:
+        if rule.matches(rel_path, is_dir):
+            ignored = not rule.negated
+    return ignored
+
+
+def parse_shard(value):
+    """解析 'i/N'（i 从 1 开始），返回 (i, N)"""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', value)
+    if not match:
+        raise argparse.ArgumentTypeError(f'分片格式应为 i/N: {value}')
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f'分片编号应在 1 到 N 之间: {value}')
+    return index, count
+
+
+def shard_of(rel_path, count):
+    """
+    文档所属的分片（1 到 count）
+    按相对路径的 SHA-1 划分，不受机器、检出目录和 Python 哈希随机化影响
+    """
+    digest = hashlib.sha1(rel_path.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def in_shard(path, root_dir, shard):
+    """文档是否属于分片 shard=(i, N)；shard 为 None 时总是属于"""
+    if shard is None:
+        return True
+    index, count = shard
+    rel_path = os.path.relpath(path, root_dir).replace(os.sep, '/')
+    return shard_of(rel_path, count) == index
+
+
+def add_shard_argument(parser):
+    parser.add_argument('--shard', help='只处理第 i 个分片（共 N 个，i 从 1 开始），按文档相对路径的稳定哈希划分',
+                        type=parse_shard, metavar='i/N')
+
+
+def iter_markdown_files(root_dir, exclude_dirs=None, use_ignore_files=True, shard=None):
+    """
+    遍历目录并逐个返回 Markdown 文件
+    排除的目录和被 .gitignore / .auditignore 忽略的目录在进入之前就被剪掉；
+    给定 shard=(i, N) 时只返回属于该分片的文件
+    """
     if exclude_dirs is None:
-        exclude_dirs = ['.git', 'node_modules', '__pycache__', '.venv', 'venv', 'dist', 'build']
+        exclude_dirs = DEFAULT_EXCLUDE_DIRS
+    exclude_dirs = set(exclude_dirs)
 
-    md_files = []
     root_path = Path(root_dir)
+    root = os.fspath(root_path)
 
-    for file_path in root_path.rglob('*.md'):
-        # 排除特定目录
-        if any(excluded in file_path.parts for excluded in exclude_dirs):
-            continue
+    rules_by_dir = {'': []}
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        if rel_dir == '.':
+            rel_dir = ''
+        prefix = rel_dir + '/' if rel_dir else ''
+
+        rules = rules_by_dir.pop(rel_dir, [])
+        if use_ignore_files:
+            for name in IGNORE_FILE_NAMES:
+                if name in filenames:
+                    rules = rules + load_ignore_rules(os.path.join(dirpath, name), rel_dir)
+            # 项目级的 .auditignore 优先于根目录的 .gitignore
+            if not rel_dir:
+                rules = rules + load_ignore_rules(os.path.join(root, PROJECT_IGNORE_FILE), '')
 
-        md_files.append(str(file_path))
+        # 剪枝：不进入排除的目录
+        kept = []
+        for name in sorted(dirnames):
+            if name in exclude_dirs:
+                continue
+            if rules and is_ignored(rules, prefix + name, True):
+                continue
+            kept.append(name)
+            rules_by_dir[prefix + name] = rules
+        dirnames[:] = kept
 
-    return sorted(md_files)
+        for name in sorted(filenames):
+            if not name.endswith('.md'):
+                continue
+            if rules and is_ignored(rules, prefix + name, False):
+                continue
+            if shard is not None and shard_of(prefix + name, shard[1]) != shard[0]:
+                continue
+            yield str(root_path / (prefix + name))
+
+
+def find_markdown_files(root_dir, exclude_dirs=None, use_ignore_files=True, shard=None):
+    """查找所有 Markdown 文件"""
+    with phase('walk_docs'):
+        return sorted(iter_markdown_files(root_dir, exclude_dirs, use_ignore_files, shard))
 
 
 def main():
@@ -31,21 +206,42 @@ def main():
     parser.add_argument('directory', help='项目根目录', default='.', nargs='?')
     parser.add_argument('--output', '-o', help='输出文件路径（JSON 格式）')
     parser.add_argument('--exclude', '-e', help='要排除的目录（逗号分隔）', default='')
+    parser.add_argument('--no-ignore', help='不读取 .gitignore 和 .auditignore', action='store_true')
+    add_shard_argument(parser)
+    add_format_argument(parser)
+    add_profile_argument(parser)
 
     args = parser.parse_args()
+    start_profile(args)
 
     # 处理排除目录
-    exclude_dirs = ['.git', 'node_modules', '__pycache__', '.venv', 'venv', 'dist', 'build']
+    exclude_dirs = list(DEFAULT_EXCLUDE_DIRS)
     if args.exclude:
         exclude_dirs.extend([d.strip() for d in args.exclude.split(',')])
 
+    if args.format == 'ndjson':
+        # 边扫描边输出，每个文件一行
+        out = open(args.output, 'w', encoding='utf-8') if args.output else None
+        try:
+            with phase('walk_docs'):
+                for path in iter_markdown_files(args.directory, exclude_dirs, not args.no_ignore, args.shard):
+                    write_record({'path': path}, out)
+        finally:
+            if out is not None:
+                out.close()
+        finish_profile(args, args.directory)
+        return
+
     # 查找 Markdown 文件
-    md_files = find_markdown_files(args.directory, exclude_dirs)
+    md_files = find_markdown_files(args.directory, exclude_dirs, not args.no_ignore, args.shard)
+    finish_profile(args, args.directory)
 
     result = {
         'total_count': len(md_files),
         'files': md_files
     }
+    if args.shard:
+        result['shard'] = {'index': args.shard[0], 'count': args.shard[1]}
 
     # 输出结果
     if args.output:
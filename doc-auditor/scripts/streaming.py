@@ -0,0 +1,60 @@
+"""
+NDJSON 流式输入输出（所有脚本共用）
+每行一个 JSON 记录，写出后立即 flush，下游脚本可以边读边处理：
+    scan_docs.py --format ndjson | audit_document.py --format ndjson | process_docs.py -
+"""
+import os
+import sys
+import json
+
+
+FORMATS = ('json', 'ndjson')
+
+
+def add_format_argument(parser):
+    parser.add_argument('--format', help='输出格式: json（默认）或 ndjson（每个文档一行，逐条输出）',
+                        choices=FORMATS, default='json')
+
+
+def write_record(record, stream=None):
+    """写出一条记录并立即 flush；下游提前退出（如 | head）时静默结束"""
+    stream = stream or sys.stdout
+    try:
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        stream.flush()
+    except BrokenPipeError:
+        # 避免解释器退出时再次 flush 已关闭的管道
+        os.dup2(os.open(os.devnull, os.O_WRONLY), stream.fileno())
+        sys.exit(1)
+
+
+def iter_records(stream=None):
+    """逐行读取 NDJSON 记录，跳过空行"""
+    stream = stream or sys.stdin
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_paths(stream=None):
+    """
+    从标准输入逐个读取文档路径
+    每行可以是纯路径，也可以是带 'path' 字段的 JSON 记录（如 scan_docs.py --format ndjson 的输出）
+    """
+    stream = stream or sys.stdin
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            path = json.loads(line).get('path')
+            if path:
+                yield path
+        else:
+            yield line
+
+
+def wants_stdin(paths):
+    """没有给出文档路径，或路径为 '-' 时从标准输入读取"""
+    return not paths or list(paths) == ['-']
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+代码符号索引
+一次遍历代码库，建立 函数名/类名 -> 定义文件 的倒排索引，同时收集 API 路由，
+索引保存在磁盘上，下次运行时只重新解析发生变化的文件
+"""
+import os
+import re
+import json
+import argparse
+from pathlib import Path
+from code_scan import DEFAULT_MAX_FILE_SIZE, SKIP_TOO_LARGE, open_code_file
+from route_trie import RouteTrie, parse_routes
+from profiler import phase, add_bytes
+
+
+INDEX_VERSION = 6
+INDEX_DIR = '.doc-auditor'
+INDEX_FILENAME = 'symbol_index.json'
+CODE_EXTENSIONS = ('.py', '.js', '.ts', '.tsx', '.java', '.go', '.rs')
+SKIP_DIRS = {'.git', INDEX_DIR}
+
+# 与 DocumentAuditor 原有的搜索模式保持一致（str 正则，\w 匹配 Unicode 标识符，如 def 计算(、class Café:）
+FUNCTION_PATTERN = re.compile(r'\bdef\s+(\w+)\s*\(|\bfunction\s+(\w+)\s*\(')
+CLASS_PATTERN = re.compile(r'\bclass\s+(\w+)\s*[:\(]')
+
+
+def parse_symbols(content):
+    """
+    从代码内容（bytes 或 mmap）中提取 (函数名列表, 类名列表)
+    内容按 UTF-8 解码后再匹配；不是 UTF-8 的文件与原来按文本读取失败时一样，不提取符号
+    """
+    try:
+        text = bytes(content).decode('utf-8')
+    except UnicodeDecodeError:
+        return [], []
+    functions = set()
+    for match in FUNCTION_PATTERN.finditer(text):
+        functions.add(match.group(1) or match.group(2))
+    classes = set(CLASS_PATTERN.findall(text))
+    return sorted(functions), sorted(classes)
+
+
+class SymbolIndex:
+    def __init__(self, project_root, index_path=None, max_file_size=DEFAULT_MAX_FILE_SIZE):
+        self.project_root = Path(project_root)
+        if index_path is None:
+            index_path = self.project_root / INDEX_DIR / INDEX_FILENAME
+        self.index_path = Path(index_path)
+        self.max_file_size = max_file_size
+
+        # 相对路径 -> {'mtime_ns', 'size', 'functions', 'classes', 'routes'[, 'skipped']}
+        self.files = {}
+        # 符号名 -> 定义该符号的文件集合
+        self.functions = {}
+        self.classes = {}
+        # 路由前缀树，首次查询时构建，文件变化后重建
+        self._routes = None
+
+        self.stats = {'parsed': 0, 'reused': 0, 'removed': 0}
+        self._dirty = False
+
+    @classmethod
+    def build(cls, project_root, index_path=None, persist=True, snapshot=None,
+              max_file_size=DEFAULT_MAX_FILE_SIZE):
+        """加载磁盘索引，增量刷新后返回（给定 PathSnapshot 时复用其文件列表，不再遍历目录）"""
+        index = cls(project_root, index_path, max_file_size)
+        if persist:
+            index.load()
+        index.refresh(snapshot)
+        if persist and index._dirty:
+            index.save()
+        return index
+
+    def load(self):
+        """从磁盘加载索引，格式不匹配时忽略"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if data.get('version') != INDEX_VERSION:
+            return False
+
+        self.files = data.get('files', {})
+        self._rebuild_lookup()
+        return True
+
+    def save(self):
+        """保存索引到磁盘（原子替换，失败时静默跳过）"""
+        data = {
+            'version': INDEX_VERSION,
+            'files': self.files
+        }
+        tmp_path = self.index_path.with_suffix('.tmp')
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+            return True
+        except OSError:
+            return False
+
+    def iter_code_files(self, snapshot=None):
+        """遍历代码文件，返回 (相对路径, os.stat_result)"""
+        root = str(self.project_root)
+        if snapshot is not None:
+            for rel_path in sorted(snapshot.files):
+                if not rel_path.endswith(CODE_EXTENSIONS) or rel_path.split('/', 1)[0] in SKIP_DIRS:
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, rel_path))
+                except OSError:
+                    continue
+                yield rel_path, st
+            return
+
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in filenames:
+                if not name.endswith(CODE_EXTENSIONS):
+                    continue
+                full_path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full_path)
+                except OSError:
+                    continue
+                rel_path = os.path.relpath(full_path, root).replace(os.sep, '/')
+                yield rel_path, st
+
+    def refresh(self, snapshot=None):
+        """增量刷新：只解析新增或修改过的文件"""
+        with phase('symbol_index'):
+            self._refresh(snapshot)
+
+    def _refresh(self, snapshot):
+        seen = set()
+
+        for rel_path, st in self.iter_code_files(snapshot):
+            seen.add(rel_path)
+            entry = self.files.get(rel_path)
+            if (entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size
+                    and (entry.get('skipped') == SKIP_TOO_LARGE) == self._too_large(st.st_size)):
+                self.stats['reused'] += 1
+                continue
+
+            functions, classes, routes, skipped = self._parse_file(self.project_root / rel_path)
+            entry = {
+                'mtime_ns': st.st_mtime_ns,
+                'size': st.st_size,
+                'functions': functions,
+                'classes': classes,
+                'routes': routes
+            }
+            if skipped:
+                entry['skipped'] = skipped
+            self.files[rel_path] = entry
+            self.stats['parsed'] += 1
+            self._dirty = True
+
+        for rel_path in list(self.files):
+            if rel_path not in seen:
+                del self.files[rel_path]
+                self.stats['removed'] += 1
+                self._dirty = True
+
+        self._rebuild_lookup()
+
+    def update_files(self, rel_paths):
+        """
+        只重新解析给定的文件（已删除或不再是代码文件的会被移除），
+        返回 (定义发生变化的符号名集合, 新增或消失的路由集合 {(方法, 路径)})
+        """
+        changed = set()
+        changed_routes = set()
+        for rel_path in rel_paths:
+            old = self.files.pop(rel_path, None)
+            old_symbols = set(old['functions']) | set(old['classes']) if old else set()
+            old_routes = {tuple(route) for route in old.get('routes', ())} if old else set()
+            if old:
+                self._unlink(rel_path, old)
+
+            full_path = self.project_root / rel_path
+            st = None
+            if rel_path.endswith(CODE_EXTENSIONS) and rel_path.split('/', 1)[0] not in SKIP_DIRS:
+                try:
+                    st = os.stat(full_path)
+                except OSError:
+                    st = None
+
+            if st is None:
+                if old:
+                    self.stats['removed'] += 1
+                    self._dirty = True
+                changed |= old_symbols
+                changed_routes |= old_routes
+                continue
+
+            functions, classes, routes, skipped = self._parse_file(full_path)
+            entry = {
+                'mtime_ns': st.st_mtime_ns,
+                'size': st.st_size,
+                'functions': functions,
+                'classes': classes,
+                'routes': routes
+            }
+            if skipped:
+                entry['skipped'] = skipped
+            self.files[rel_path] = entry
+            self._link(rel_path, entry)
+            self.stats['parsed'] += 1
+            self._dirty = True
+            changed |= old_symbols ^ (set(functions) | set(classes))
+            changed_routes |= old_routes ^ {tuple(route) for route in routes}
+
+        return changed, changed_routes
+
+    def _link(self, rel_path, entry):
+        if entry.get('routes'):
+            self._routes = None
+        for name in entry['functions']:
+            self.functions.setdefault(name, set()).add(rel_path)
+        for name in entry['classes']:
+            self.classes.setdefault(name, set()).add(rel_path)
+
+    def _unlink(self, rel_path, entry):
+        if entry.get('routes'):
+            self._routes = None
+        for lookup, names in ((self.functions, entry['functions']), (self.classes, entry['classes'])):
+            for name in names:
+                paths = lookup.get(name)
+                if paths is not None:
+                    paths.discard(rel_path)
+                    if not paths:
+                        del lookup[name]
+
+    def _too_large(self, size):
+        return self.max_file_size is not None and size > self.max_file_size
+
+    def _parse_file(self, file_path):
+        """
+        提取文件中定义的函数名、类名和 API 路由
+        返回 (函数列表, 类列表, 路由列表, 跳过原因)，二进制或超过大小上限的文件不解析
+        """
+        with phase('parse_code'):
+            buffer, skipped = open_code_file(file_path, self.max_file_size)
+            if buffer is None:
+                return [], [], [], skipped
+
+            try:
+                add_bytes(len(buffer))
+                functions, classes = parse_symbols(buffer)
+                routes = [list(route) for route in parse_routes(buffer)]
+            finally:
+                buffer.close()
+
+        return functions, classes, routes, None
+
+    def _rebuild_lookup(self):
+        """根据文件条目重建倒排表"""
+        self.functions = {}
+        self.classes = {}
+        self._routes = None
+        for rel_path, entry in self.files.items():
+            self._link(rel_path, entry)
+
+    def skipped_files(self):
+        """返回未解析的文件: [{'path', 'reason'}]"""
+        return [
+            {'path': rel_path, 'reason': entry['skipped']}
+            for rel_path, entry in sorted(self.files.items())
+            if entry.get('skipped')
+        ]
+
+    def has_function(self, name):
+        return name in self.functions
+
+    def has_class(self, name):
+        return name in self.classes
+
+    @property
+    def routes(self):
+        """所有代码文件中的路由组成的前缀树"""
+        if self._routes is None:
+            self._routes = RouteTrie(
+                (method, path) for entry in self.files.values() for method, path in entry.get('routes', ())
+            )
+        return self._routes
+
+    def has_route(self, method, path):
+        return self.routes.match(method, path)
+
+    def find_function(self, name):
+        """返回定义该函数的文件列表"""
+        return sorted(self.functions.get(name, ()))
+
+    def find_class(self, name):
+        """返回定义该类的文件列表"""
+        return sorted(self.classes.get(name, ()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='构建或刷新代码符号索引')
+    parser.add_argument('project_root', help='项目根目录', default='.', nargs='?')
+    parser.add_argument('--index-path', help='索引文件路径（默认: <项目根目录>/.doc-auditor/symbol_index.json）')
+    parser.add_argument('--rebuild', help='忽略已有索引，完全重建', action='store_true')
+    parser.add_argument('--max-file-size', help='单个代码文件的大小上限（MB），超过的文件不解析',
+                        type=float, default=DEFAULT_MAX_FILE_SIZE / 1024 / 1024)
+
+    args = parser.parse_args()
+
+    index = SymbolIndex(args.project_root, args.index_path, int(args.max_file_size * 1024 * 1024))
+    if not args.rebuild:
+        index.load()
+    index.refresh()
+    index.save()
+
+    print(f"✅ 索引已保存到 {index.index_path}")
+    print(f"  文件: {len(index.files)}（解析 {index.stats['parsed']}，复用 {index.stats['reused']}，移除 {index.stats['removed']}）")
+    print(f"  函数: {len(index.functions)}")
+    print(f"  类: {len(index.classes)}")
+    print(f"  路由: {len(index.routes)}")
+    skipped = index.skipped_files()
+    if skipped:
+        print(f"  跳过: {len(skipped)}")
+        for item in skipped:
+            print(f"    {item['path']} ({item['reason']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+生成用于性能测试的合成项目
+按给定数量生成代码文件和 Markdown 文档，文档中的引用按比例指向已不存在的文件、函数和类
+"""
+import os
+import json
+import random
+import argparse
+import subprocess
+from pathlib import Path
+
+
+FILES_PER_PACKAGE = 50
+DOCS_PER_SECTION = 50
+FUNCTIONS_PER_FILE = 5
+API_METHODS = ('GET', 'POST', 'PUT', 'DELETE', 'PATCH')
+
+
+def _code_file_path(i):
+    package = f'src/pkg_{i // FILES_PER_PACKAGE}'
+    if i % 4 == 3:
+        return f'{package}/module_{i}.js'
+    return f'{package}/module_{i}.py'
+
+
+def _write_code_file(root, i):
+    rel_path = _code_file_path(i)
+    lines = []
+    if rel_path.endswith('.py'):
+        lines.append(f'class Module{i}:')
+        lines.append('    pass')
+        lines.append('')
+        for j in range(FUNCTIONS_PER_FILE):
+            lines.append(f'def func_{i}_{j}(value):')
+            lines.append(f'    return value + {j}')
+            lines.append('')
+    else:
+        lines.append(f'class Module{i} {{}}')
+        lines.append('')
+        for j in range(FUNCTIONS_PER_FILE):
+            lines.append(f'function func_{i}_{j}(value) {{')
+            lines.append(f'  return value + {j};')
+            lines.append('}')
+            lines.append('')
+
+    full_path = root / rel_path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    full_path.write_text('\n'.join(lines), encoding='utf-8')
+    return rel_path
+
+
+def _reference(rng, code_files, broken):
+    """随机生成一个引用：(类型, 值)，broken 时指向不存在的目标"""
+    kind = rng.choice(('file', 'function', 'class'))
+    i = rng.randrange(len(code_files))
+    if kind == 'file':
+        if broken:
+            return kind, f'src/pkg_{i // FILES_PER_PACKAGE}/removed_{i}.py'
+        return kind, code_files[i]
+    if kind == 'function':
+        if broken:
+            return kind, f'removed_func_{i}'
+        return kind, f'func_{i}_{rng.randrange(FUNCTIONS_PER_FILE)}'
+    if broken:
+        return kind, f'RemovedModule{i}'
+    if code_files[i].endswith('.js'):
+        # 类检查只认 `class Name(` / `class Name:`，JS 类写法找不到，改指向前一个 Python 模块
+        i -= 1
+    return kind, f'Module{i}'
+
+
+def _render_doc(rng, doc_index, references):
+    lines = [f'# 文档 {doc_index}', '', f'这是第 {doc_index} 篇合成文档，用于性能测试。', '']
+
+    code_lines = []
+    for kind, value in references:
+        if kind == 'file':
+            lines.append(f'相关实现见 `{value}`。')
+            lines.append('')
+        elif kind == 'function':
+            code_lines.append(f'def {value}(value):')
+            code_lines.append('    result = value')
+        else:
+            code_lines.append(f'class {value}:')
+            code_lines.append('    pass')
+
+    if code_lines:
+        lines.append('## 示例')
+        lines.append('')
+        lines.append('```python')
+        lines.extend(code_lines)
+        lines.append('```')
+        lines.append('')
+
+    method = rng.choice(API_METHODS)
+    lines.append(f'{method} /api/items/{{id}}')
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def _init_git(root):
+    """初始化 Git 仓库并提交所有文件，git 不可用时跳过"""
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME='benchmark', GIT_AUTHOR_EMAIL='benchmark@example.com',
+        GIT_COMMITTER_NAME='benchmark', GIT_COMMITTER_EMAIL='benchmark@example.com'
+    )
+    try:
+        for command in (['git', 'init', '-q'], ['git', 'add', '-A'], ['git', 'commit', '-q', '-m', 'init']):
+            subprocess.run(command, cwd=root, env=env, check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return True
+
+
+def generate_repo(root, docs=200, code_files=500, refs_per_doc=10, broken_ratio=0.1, seed=0, git=True):
+    """
+    在 root 下生成合成项目，返回生成参数和统计
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    code_paths = [_write_code_file(root, i) for i in range(code_files)]
+
+    broken_refs = 0
+    for doc_index in range(docs):
+        references = []
+        for _ in range(refs_per_doc):
+            broken = rng.random() < broken_ratio
+            broken_refs += broken
+            references.append(_reference(rng, code_paths, broken))
+
+        doc_path = root / 'docs' / f'section_{doc_index // DOCS_PER_SECTION}' / f'doc_{doc_index}.md'
+        doc_path.parent.mkdir(parents=True, exist_ok=True)
+        doc_path.write_text(_render_doc(rng, doc_index, references), encoding='utf-8')
+
+    return {
+        'root': str(root),
+        'docs': docs,
+        'code_files': code_files,
+        'refs_per_doc': refs_per_doc,
+        'broken_ratio': broken_ratio,
+        'broken_refs': broken_refs,
+        'seed': seed,
+        'git': _init_git(root) if git else False
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成用于性能测试的合成项目')
+    parser.add_argument('directory', help='输出目录')
+    parser.add_argument('--docs', help='文档数量', type=int, default=200)
+    parser.add_argument('--code-files', help='代码文件数量', type=int, default=500)
+    parser.add_argument('--refs-per-doc', help='每篇文档的引用数量', type=int, default=10)
+    parser.add_argument('--broken-ratio', help='失效引用的比例', type=float, default=0.1)
+    parser.add_argument('--seed', help='随机种子', type=int, default=0)
+    parser.add_argument('--no-git', help='不初始化 Git 仓库', action='store_true')
+
+    args = parser.parse_args()
+
+    info = generate_repo(
+        args.directory, args.docs, args.code_files, args.refs_per_doc,
+        args.broken_ratio, args.seed, git=not args.no_git
+    )
+    print(json.dumps(info, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+增量审计缓存的测试：缓存结果与不用缓存时一致，文档内容或引用的存在性变化时失效
+"""
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+import pytest
+from conftest import write
+from audit_cache import AuditCache, reference_fingerprint
+from audit_document import DocumentAuditor
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+DOC = '''# Guide
+
+See `src/helper.py` and `src/later.py`.
+
+```python
+helper()
+def helper():
+    pass
+class Widget:
+    pass
+```
+
+POST /items/{id}
+'''
+
+
+@pytest.fixture
+def project(tmp_path):
+    write(tmp_path, 'src/helper.py', 'def helper():\n    pass\n\nclass Widget:\n    pass\n')
+    write(tmp_path, 'src/app.py', "@app.get('/health')\ndef health():\n    pass\n")
+    doc = write(tmp_path, 'docs/guide.md', DOC)
+    return tmp_path, doc
+
+
+def audit(root, doc):
+    """模拟一次命令行运行：新的快照和索引，缓存从磁盘加载后再保存"""
+    cache = AuditCache(root, 'audit_document')
+    cache.load()
+    result = DocumentAuditor(root, cache=cache).audit_document(doc)
+    cache.save()
+    return result, cache.hits
+
+
+def uncached(root, doc):
+    return DocumentAuditor(root).audit_document(doc)
+
+
+def issue_refs(result):
+    return sorted((issue['type'], issue['reference']) for issue in result['issues'])
+
+
+def test_cached_result_matches_uncached(project):
+    root, doc = project
+    first, hits = audit(root, doc)
+    assert hits == 0
+    second, hits = audit(root, doc)
+    assert hits == 1
+    assert first == second == uncached(root, doc)
+
+
+@pytest.mark.parametrize('change', ['file_appears', 'file_disappears', 'symbol_removed', 'route_added', 'doc_edited'])
+def test_cache_invalidation(project, change):
+    root, doc = project
+    before, _ = audit(root, doc)
+
+    if change == 'file_appears':
+        write(root, 'src/later.py', '')
+    elif change == 'file_disappears':
+        os.remove(root / 'src/helper.py')
+        write(root, 'src/other.py', 'def helper():\n    pass\n\nclass Widget:\n    pass\n')
+    elif change == 'symbol_removed':
+        write(root, 'src/helper.py', 'def helper():\n    pass\n')
+    elif change == 'route_added':
+        write(root, 'src/items.py', "@router.post('/items/<int:item_id>')\ndef create():\n    pass\n")
+    else:
+        write(root, 'docs/guide.md', DOC.replace('`src/later.py`', '`src/app.py`'))
+
+    after, hits = audit(root, doc)
+    assert hits == 0
+    assert after == uncached(root, doc)
+    assert issue_refs(after) != issue_refs(before)
+
+
+def test_unrelated_change_keeps_cache(project):
+    root, doc = project
+    audit(root, doc)
+    write(root, 'src/unrelated.py', 'def unrelated():\n    pass\n')
+    _, hits = audit(root, doc)
+    assert hits == 1
+
+
+def test_cache_version_mismatch_is_ignored(project):
+    root, doc = project
+    audit(root, doc)
+    cache_path = root / '.doc-auditor' / 'cache' / 'audit_document.json'
+    data = json.loads(cache_path.read_text(encoding='utf-8'))
+    data['version'] = -1
+    cache_path.write_text(json.dumps(data), encoding='utf-8')
+    assert not AuditCache(root, 'audit_document').load()
+
+
+def test_fingerprint_ignores_order_and_duplicates():
+    checks = [('file', 'a.py', True), ('function', 'f', False)]
+    assert reference_fingerprint(checks) == reference_fingerprint(checks[::-1] + checks)
+    assert reference_fingerprint(checks) != reference_fingerprint([('file', 'a.py', False), ('function', 'f', False)])
+
+
+def run_script(root, *args):
+    result = subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / 'audit_document.py'), *args],
+        cwd=root, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def test_plain_audit_writes_nothing_into_project(project):
+    root, _ = project
+    result = run_script(root, 'docs/guide.md')
+    assert 'cache' not in result
+    assert not (root / '.doc-auditor').exists()
+
+
+def test_cache_is_opt_in_and_stats_on_request(project):
+    root, _ = project
+    result = run_script(root, 'docs/guide.md', '--cache')
+    assert 'cache' not in result
+    assert (root / '.doc-auditor' / 'cache' / 'audit_document.json').exists()
+    result = run_script(root, 'docs/guide.md', '--cache', '--stats')
+    assert result['cache'] == {'hits': 1, 'misses': 0}
@@ -0,0 +1,68 @@
+"""
+性能测试工具的测试：合成项目可复现、失效引用的比例生效，基线比较只报告超出容差的退化
+"""
+import hashlib
+import pytest
+from audit_document import DocumentAuditor
+from benchmark import MIN_TIME_DELTA, compare_with_baseline, run_benchmark
+from scan_docs import find_markdown_files
+from synthetic_repo import generate_repo
+
+
+def tree_digest(root):
+    digest = hashlib.sha1()
+    for path in sorted(root.rglob('*')):
+        if path.is_file() and '.git' not in path.relative_to(root).parts:
+            digest.update(path.relative_to(root).as_posix().encode('utf-8'))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def test_generated_repo_is_reproducible(tmp_path):
+    first = generate_repo(tmp_path / 'a', docs=20, code_files=30, seed=7, git=False)
+    second = generate_repo(tmp_path / 'b', docs=20, code_files=30, seed=7, git=False)
+    other = generate_repo(tmp_path / 'c', docs=20, code_files=30, seed=8, git=False)
+    assert tree_digest(tmp_path / 'a') == tree_digest(tmp_path / 'b') != tree_digest(tmp_path / 'c')
+    assert first['broken_refs'] == second['broken_refs']
+    assert other['seed'] == 8
+
+
+@pytest.mark.parametrize('broken_ratio', [0.0, 1.0])
+def test_broken_ratio_controls_issues(tmp_path, broken_ratio):
+    info = generate_repo(tmp_path, docs=10, code_files=20, broken_ratio=broken_ratio, git=False)
+    auditor = DocumentAuditor(tmp_path)
+    results = [auditor.audit_document(path) for path in find_markdown_files(tmp_path)]
+    assert len(results) == 10
+    issues = sum(len(result['issues']) for result in results)
+    if broken_ratio:
+        assert info['broken_refs'] == 100
+        assert all(result['issues'] for result in results)
+        assert all(issue['type'].startswith('missing_') for result in results for issue in result['issues'])
+    else:
+        assert info['broken_refs'] == 0
+        assert issues == 0
+
+
+def test_compare_with_baseline():
+    baseline = {'phases': {
+        'scan': {'seconds': 1.0, 'peak_rss_kb': 1000},
+        'audit_document': {'seconds': 0.01, 'peak_rss_kb': None},
+    }}
+    results = {
+        'scan': {'seconds': 1.2, 'peak_rss_kb': 1300},
+        'audit_document': {'seconds': 0.01 + MIN_TIME_DELTA / 2, 'peak_rss_kb': 5000},
+        'process_docs': {'seconds': 100.0, 'peak_rss_kb': 1},
+    }
+    # 耗时在容差内、差异低于噪声阈值、没有基线的阶段都不算退化
+    assert compare_with_baseline(results, baseline) == [
+        {'phase': 'scan', 'metric': 'peak_rss_kb', 'baseline': 1000, 'current': 1300}
+    ]
+    assert [r['metric'] for r in compare_with_baseline(results, baseline, tolerance=0.1)] == ['seconds', 'peak_rss_kb']
+
+
+def test_run_benchmark_smoke(tmp_path):
+    generate_repo(tmp_path, docs=5, code_files=10, git=False)
+    results = run_benchmark(tmp_path, phases=('scan', 'audit_document'))
+    assert list(results) == ['scan', 'audit_document']
+    assert results['scan']['items'] == results['audit_document']['items'] == 5
+    assert results['scan']['seconds'] >= 0
@@ -0,0 +1,89 @@
+"""
+--changed-since 受影响文档选择的测试
+"""
+import subprocess
+import pytest
+from conftest import write
+from changed_since import find_impacted_docs
+
+
+def git(root, *args):
+    subprocess.run(
+        ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+        cwd=root, check=True, capture_output=True
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    write(tmp_path, 'app.py', "@app.get('/users')\ndef list_users():\n    pass\n")
+    write(tmp_path, 'src/helper.py', 'def helper():\n    pass\n')
+    docs = {
+        'api': str(write(tmp_path, 'docs/api.md', '# API\n\nPOST /users/{id}/avatar 上传头像。\n')),
+        'helper': str(write(tmp_path, 'docs/helper.md', '# Helper\n\n```python\ndef helper():\n    pass\n```\n')),
+        'path': str(write(tmp_path, 'docs/path.md', '# Path\n\n见 `src/helper.py`。\n')),
+    }
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'add', '-A')
+    git(tmp_path, 'commit', '-q', '-m', 'init')
+    return tmp_path, docs
+
+
+def impacted(root, docs):
+    selected, _ = find_impacted_docs(root, 'HEAD', sorted(docs.values()))
+    return {name for name, path in docs.items() if path in selected}
+
+
+def test_unchanged_tree_selects_nothing(repo):
+    root, docs = repo
+    assert impacted(root, docs) == set()
+
+
+def test_route_only_change_selects_endpoint_docs(repo):
+    root, docs = repo
+    write(root, 'app.py', "@app.get('/users')\n@app.post('/users/<id>/avatar')\ndef list_users():\n    pass\n")
+    assert impacted(root, docs) == {'api'}
+
+
+def test_removed_route_selects_endpoint_docs(repo):
+    root, docs = repo
+    write(root, 'app.py', "@app.post('/users/:id/avatar')\ndef list_users():\n    pass\n")
+    git(root, 'commit', '-q', '-am', 'add avatar')
+    write(root, 'app.py', 'def list_users():\n    pass\n')
+    assert impacted(root, docs) == {'api'}
+
+
+def test_symbol_and_path_changes(repo):
+    root, docs = repo
+    write(root, 'src/helper.py', 'def renamed_helper():\n    pass\n')
+    assert impacted(root, docs) == {'helper'}
+
+    git(root, 'mv', 'src/helper.py', 'src/util.py')
+    assert impacted(root, docs) == {'helper', 'path'}
+
+
+@pytest.mark.parametrize('switch', ['all_removed', 'first_added'])
+def test_routes_switching_on_or_off_selects_all_endpoint_docs(repo, switch):
+    root, docs = repo
+    docs['orders'] = str(write(root, 'docs/orders.md', '# Orders\n\nGET /orders 列出订单。\n'))
+    if switch == 'first_added':
+        write(root, 'app.py', 'def list_users():\n    pass\n')
+    git(root, 'add', '-A')
+    git(root, 'commit', '-q', '-m', 'orders')
+
+    # 两种情况下变化的路由都与文档中的端点无关，但端点检查随之开启或关闭
+    if switch == 'all_removed':
+        write(root, 'app.py', 'def list_users():\n    pass\n')
+    else:
+        write(root, 'src/helper.py', "def helper():\n    pass\n\n@app.get('/health')\ndef health():\n    pass\n")
+    assert impacted(root, docs) == {'api', 'orders'}
+
+
+def test_route_change_with_other_routes_left_selects_matching_docs(repo):
+    root, docs = repo
+    docs['orders'] = str(write(root, 'docs/orders.md', '# Orders\n\nGET /orders 列出订单。\n'))
+    write(root, 'src/routes.py', "@app.get('/health')\ndef health():\n    pass\n")
+    git(root, 'add', '-A')
+    git(root, 'commit', '-q', '-m', 'health')
+    write(root, 'app.py', 'def list_users():\n    pass\n')
+    assert impacted(root, docs) == set()
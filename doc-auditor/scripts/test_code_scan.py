@@ -0,0 +1,75 @@
+"""
+mmap 代码扫描的测试：搜索结果与逐个文件读入文本再搜索的原实现一致，二进制和超大文件被跳过并记录
+"""
+import re
+import pytest
+from conftest import baseline_search, write
+from audit_document import DocumentAuditor
+from code_scan import (
+    BINARY_SNIFF_BYTES, SKIP_BINARY, SKIP_TOO_LARGE, SKIP_UNREADABLE, CodeScanner, compile_bytes_pattern
+)
+
+
+CODE = {
+    'app/service.py': 'class Service(Base):\n    def handle(self, request):\n        pass\n',
+    'app/cafe.py': '# -*- coding: utf-8 -*-\ndef café():\n    return "naïve"\n',
+    'web/render.js': 'function render(props) {}\n',
+    'web/types.ts': 'export function typed(x) {}\n',
+    'lib/main.go': 'func main() {}\n',
+    'empty.py': '',
+}
+
+PATTERNS = [
+    r'\bdef\s+handle\s*\(|\bfunction\s+handle\s*\(',
+    r'\bfunction\s+render\s*\(',
+    r'\bclass\s+Service\s*[:\(]',
+    r'naïve',
+    r'func\s+main',
+    r'^def',
+    r'nothing_here',
+]
+
+
+@pytest.mark.parametrize('pattern', PATTERNS)
+def test_search_matches_baseline(project, pattern):
+    auditor = DocumentAuditor(project)
+    assert auditor.search_in_codebase(pattern) == baseline_search(project, pattern)
+    assert auditor.skipped_files() == []
+
+
+def test_compiled_patterns_are_accepted(project):
+    auditor = DocumentAuditor(project)
+    assert auditor.search_in_codebase(re.compile(r'def\s+café')) == [str(project / 'app/cafe.py')]
+    assert compile_bytes_pattern(rb'x').pattern == b'x'
+
+
+def test_guards(tmp_path):
+    scanner = CodeScanner(max_file_size=1024)
+    pattern = compile_bytes_pattern(r'def\s+target')
+    large = write(tmp_path, 'large.py', 'def target():\n' + '#' * 2000)
+    binary = write(tmp_path, 'binary.py', b'\0def target():\n')
+    late_nul = write(tmp_path, 'late_nul.py', b'def target():\n#' + b'x' * BINARY_SNIFF_BYTES + b'\0')
+    empty = write(tmp_path, 'empty.py', '')
+    directory = tmp_path / 'package.py'
+    directory.mkdir()
+
+    scanner.max_file_size = None
+    assert scanner.search_file(late_nul, pattern)
+    scanner.max_file_size = 1024
+    assert not scanner.search_file(large, pattern)
+    assert not scanner.search_file(binary, pattern)
+    assert not scanner.search_file(empty, pattern)
+    assert not scanner.search_file(directory, pattern)
+    assert scanner.skipped_files() == sorted([
+        {'path': str(large), 'reason': SKIP_TOO_LARGE},
+        {'path': str(binary), 'reason': SKIP_BINARY},
+        {'path': str(directory), 'reason': SKIP_UNREADABLE},
+    ], key=lambda item: item['path'])
+
+
+def test_skipped_files_are_reported_relative_to_the_project(project):
+    write(project, 'dist/bundle.min.js', 'function render(props) {}\n' + 'x' * 4096)
+    auditor = DocumentAuditor(project)
+    auditor.scanner.max_file_size = 1024
+    assert auditor.search_in_codebase(r'\bfunction\s+render\s*\(') == [str(project / 'web/render.js')]
+    assert auditor.skipped_files() == [{'path': 'dist/bundle.min.js', 'reason': SKIP_TOO_LARGE}]
@@ -0,0 +1,124 @@
+"""
+上下文收集的测试（与系列改动之前的实现逐项比较；Git 历史索引与 git log 比较）
+"""
+import subprocess
+from pathlib import Path
+import pytest
+from collect_context import ContextCollector, GitHistoryIndex
+from parsed_document import ParsedDocument
+
+
+def baseline_document_structure(content):
+    """改动之前 ContextCollector.extract_document_structure 的实现"""
+    lines = content.split('\n')
+
+    headings = []
+    for line in lines:
+        if line.startswith('#'):
+            headings.append(line.strip())
+
+    title = ''
+    for line in lines[:20]:
+        if line.startswith('#'):
+            title = line.strip()
+            break
+
+    first_paragraph = []
+    for line in lines:
+        if line.strip() == '':
+            if first_paragraph:
+                break
+            continue
+        if not line.startswith('#'):
+            first_paragraph.append(line.strip())
+
+    return {
+        'headings': headings,
+        'title': title,
+        'first_paragraph': ' '.join(first_paragraph[:3])
+    }
+
+
+STRUCTURE_CASES = {
+    'plain': '# Title\n\nFirst line.\nSecond line.\n\n## Section\ntext\n',
+    'front_matter': '---\ntitle: x\n---\n# Title\n\nBody.\n',
+    'fenced_hash': '# Title\n\n```bash\n# comment\necho hi\n```\n\n## After\n',
+    'late_title': '\n' * 25 + '# Late\ntext\n',
+    'no_heading': 'Just text\nmore text\n\nnext paragraph\n',
+    'crlf': '# Title\r\n\r\nLine one.\r\n## Two\r\n',
+    'empty': '',
+    'indented': '  # not a heading\n#tag\n####  Deep  \n',
+}
+
+
+@pytest.fixture
+def collector(tmp_path):
+    return ContextCollector(tmp_path)
+
+
+@pytest.mark.parametrize('name', sorted(STRUCTURE_CASES))
+def test_document_structure_matches_baseline(collector, name):
+    content = STRUCTURE_CASES[name]
+    expected = baseline_document_structure(content)
+    assert collector.extract_document_structure(content) == expected
+    assert collector.extract_document_structure(ParsedDocument(content)) == expected
+
+
+def test_document_structure_matches_baseline_on_repo_docs(collector):
+    docs = sorted(Path(__file__).resolve().parent.parent.glob('**/*.md'))
+    assert docs
+    for doc in docs:
+        content = doc.read_text(encoding='utf-8')
+        assert collector.extract_document_structure(content) == baseline_document_structure(content), doc
+
+
+def git(root, *args):
+    result = subprocess.run(
+        ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+        cwd=root, check=True, capture_output=True, text=True
+    )
+    return result.stdout
+
+
+def commit(root, rel_path, content, message):
+    (root / rel_path).write_text(content, encoding='utf-8')
+    git(root, 'add', '-A')
+    git(root, 'commit', '-q', '-m', message)
+
+
+def test_git_history_index_with_merges(tmp_path):
+    (tmp_path / 'docs').mkdir()
+    git(tmp_path, 'init', '-q', '-b', 'main')
+    commit(tmp_path, 'docs/guide.md', '# Guide\n', 'add guide')
+    commit(tmp_path, 'other.md', '# Other\n', 'add other')
+
+    # 旁支上修改后又改回：合并后与主线相同，git log -- <路径> 会把这两个提交简化掉
+    git(tmp_path, 'checkout', '-q', '-b', 'side')
+    commit(tmp_path, 'docs/guide.md', '# Guide\n\nDraft.\n', 'draft on side')
+    commit(tmp_path, 'docs/guide.md', '# Guide\n', 'revert draft')
+    git(tmp_path, 'checkout', '-q', 'main')
+    commit(tmp_path, 'other.md', '# Other\n\nMore.\n', 'edit other')
+    git(tmp_path, 'merge', '-q', '--no-ff', '-m', 'merge side', 'side')
+    # 两边都修改了文档的合并
+    git(tmp_path, 'checkout', '-q', '-b', 'feature', 'HEAD~1')
+    commit(tmp_path, 'docs/guide.md', '# Guide\n\nFeature.\n', 'feature guide')
+    git(tmp_path, 'checkout', '-q', 'main')
+    commit(tmp_path, 'other.md', '# Other\n\nMore.\n\nAgain.\n', 'edit other again')
+    git(tmp_path, 'merge', '-q', '--no-ff', '-m', 'merge feature', 'feature')
+
+    def log(*options):
+        return git(tmp_path, 'log', *options, '--pretty=format:%s', '--', 'docs/guide.md').split('\n')
+
+    index = GitHistoryIndex(tmp_path)
+    assert index.load()
+    expected = log('--full-history', '--no-merges')
+    assert [message for _, _, message in index.lookup('docs/guide.md', max_commits=10)] == expected
+    assert {'draft on side', 'revert draft'} <= set(expected)
+    assert not {'draft on side', 'revert draft'} & set(log())
+    assert 'merge feature' not in expected
+
+    # 有索引和没有索引时结果相同
+    with_index = ContextCollector(tmp_path, git_index=index).get_git_history('docs/guide.md', 10)
+    without_index = ContextCollector(tmp_path).get_git_history('docs/guide.md', 10)
+    assert with_index['commits'] == without_index['commits']
+    assert index.lookup('other.md', 2) == [tuple(c) for c in index.commits if c[2].startswith('edit other')][:2]
@@ -0,0 +1,98 @@
+"""
+git blame 缓存的测试
+"""
+import os
+import subprocess
+import pytest
+from git_blame import GitBlame, parse_incremental
+
+
+def git(root, *args, date='2020-01-01T00:00:00'):
+    env = dict(os.environ, GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+    subprocess.run(
+        ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+        cwd=root, check=True, capture_output=True, env=env
+    )
+
+
+def commit(root, message, date):
+    git(root, 'add', '-A')
+    git(root, 'commit', '-q', '-m', message, date=date)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, 'init', '-q')
+    return tmp_path
+
+
+def summaries(blame):
+    return [blame['commits'][index][2] for index in blame['lines']]
+
+
+def test_identical_content_in_different_files_is_blamed_separately(repo):
+    (repo / 'a.md').write_text('# Doc\n', encoding='utf-8')
+    commit(repo, 'add a', '2020-01-01T00:00:00')
+    (repo / 'b.md').write_text('# Doc\n', encoding='utf-8')
+    commit(repo, 'add b', '2021-01-01T00:00:00')
+
+    blame = GitBlame(repo)
+    assert blame.load()
+    assert summaries(blame.blame(repo / 'a.md')) == ['add a']
+    assert summaries(blame.blame(repo / 'b.md')) == ['add b']
+    assert blame.runs == 2
+
+    # 再次查询命中缓存
+    assert summaries(blame.blame(repo / 'b.md')) == ['add b']
+    assert blame.runs == 2
+
+
+def test_cache_survives_reload_and_misses_after_move(repo):
+    (repo / 'doc.md').write_text('# Doc\nline\n', encoding='utf-8')
+    commit(repo, 'add doc', '2020-01-01T00:00:00')
+
+    blame = GitBlame(repo)
+    blame.load()
+    assert summaries(blame.blame(repo / 'doc.md')) == ['add doc', 'add doc']
+    assert blame.save()
+
+    reloaded = GitBlame(repo)
+    reloaded.load()
+    reloaded.blame(repo / 'doc.md')
+    assert reloaded.runs == 0
+
+    # 移动后内容相同，但应重新 blame 新路径
+    git(repo, 'mv', 'doc.md', 'moved.md')
+    commit(repo, 'move doc', '2021-01-01T00:00:00')
+    assert reloaded.blame(repo / 'moved.md') is not None
+    assert reloaded.runs == 1
+
+
+def test_uncommitted_lines_are_not_persisted(repo):
+    (repo / 'doc.md').write_text('# Doc\n', encoding='utf-8')
+    commit(repo, 'add doc', '2020-01-01T00:00:00')
+    (repo / 'doc.md').write_text('# Doc\nnew\n', encoding='utf-8')
+
+    blame = GitBlame(repo)
+    blame.load()
+    assert summaries(blame.blame(repo / 'doc.md')) == ['add doc', '未提交的修改']
+    assert blame.entries == {}
+
+
+def test_parse_incremental_groups_lines_by_commit():
+    output = '\n'.join([
+        'a' * 40 + ' 1 1 2',
+        'author-time 100',
+        'summary first',
+        'filename doc.md',
+        'b' * 40 + ' 3 3 1',
+        'author-time 200',
+        'summary second',
+        'filename doc.md',
+        'a' * 40 + ' 4 4 1',
+        'filename doc.md',
+    ])
+    assert parse_incremental(output) == {
+        'commits': [['a' * 40, 100, 'first'], ['b' * 40, 200, 'second']],
+        'lines': [0, 0, 1, 0]
+    }
@@ -0,0 +1,156 @@
+"""
+分片审计的测试：各分片互不重叠且合起来是全部文档，合并后的清单与不分片审计一致，能发现重复、冲突和缺失的分片
+"""
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+import pytest
+from merge_manifests import load_partial, merge_manifests
+from scan_docs import find_markdown_files, in_shard, parse_shard, shard_of
+from synthetic_repo import generate_repo
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def run_script(root, script, *args, check=True):
+    return subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / script), *args],
+        cwd=root, capture_output=True, text=True, check=check
+    )
+
+
+def document(path, action='keep', **extra):
+    return {'path': path, 'status': 'current' if action == 'keep' else 'outdated', 'action': action, 'issues': [], **extra}
+
+
+def partial(index, count, *documents):
+    return {'documents': list(documents), 'shard': {'index': index, 'count': count}}
+
+
+@pytest.mark.parametrize('value, expected', [('1/1', (1, 1)), ('2/5', (2, 5)), (' 3 / 4 ', (3, 4))])
+def test_parse_shard(value, expected):
+    assert parse_shard(value) == expected
+
+
+@pytest.mark.parametrize('value', ['0/3', '4/3', '1/0', '1', 'a/b', '-1/3'])
+def test_parse_shard_rejects_invalid(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_shard(value)
+
+
+def test_shards_partition_the_documents(tmp_path):
+    generate_repo(tmp_path, docs=60, code_files=10, git=False)
+    all_docs = find_markdown_files(tmp_path)
+    for count in (1, 2, 3, 7):
+        parts = [find_markdown_files(tmp_path, shard=(i, count)) for i in range(1, count + 1)]
+        assert sorted(path for part in parts for path in part) == all_docs
+        assert sum(len(part) for part in parts) == len(all_docs)
+        for index, part in enumerate(parts, 1):
+            assert all(in_shard(path, tmp_path, (index, count)) for path in part)
+    assert all(find_markdown_files(tmp_path, shard=(i, 3)) for i in (1, 2, 3))
+
+
+def test_shard_of_is_stable():
+    # 按路径内容的哈希划分，与进程的哈希随机化无关，固定值防止划分方式被无意改变
+    assert [shard_of(f'docs/doc_{i}.md', 4) for i in range(8)] == [
+        shard_of(f'docs/doc_{i}.md', 4) for i in range(8)
+    ]
+    result = subprocess.run(
+        [sys.executable, '-c', 'from scan_docs import shard_of; print([shard_of(f"docs/doc_{i}.md", 4) for i in range(8)])'],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True, env={'PYTHONHASHSEED': '123'}
+    )
+    assert json.loads(result.stdout) == [shard_of(f'docs/doc_{i}.md', 4) for i in range(8)]
+    assert all(1 <= shard_of(f'docs/doc_{i}.md', 4) <= 4 for i in range(100))
+
+
+def test_merged_shards_match_unsharded_audit(tmp_path):
+    generate_repo(tmp_path, docs=30, code_files=40, broken_ratio=0.3, git=False)
+    run_script(tmp_path, 'audit_project.py', '.', '-j', '1', '-o', 'full.json')
+    for i in (1, 2, 3):
+        run_script(tmp_path, 'audit_project.py', '.', '-j', '1', '--shard', f'{i}/3', '-o', f'part_{i}.json')
+    # 合并顺序与分片顺序无关
+    run_script(tmp_path, 'merge_manifests.py', 'part_3.json', 'part_1.json', 'part_2.json', '-o', 'merged.json')
+
+    full = json.loads((tmp_path / 'full.json').read_text(encoding='utf-8'))
+    merged = json.loads((tmp_path / 'merged.json').read_text(encoding='utf-8'))
+    assert merged.pop('shards') == {'count': 3, 'merged': [1, 2, 3], 'missing': [], 'repeated': []}
+    assert merged == full
+    assert set(full['summary']) != {'keep'}
+
+
+def test_duplicates_are_kept_once():
+    a = document('docs/a.md')
+    merged, conflicts = merge_manifests([
+        ('p1', partial(1, 2, a, document('docs/b.md', 'update'))),
+        ('p2', partial(2, 2, document('./docs/a.md'), document('docs/c.md'))),
+    ])
+    assert conflicts == []
+    assert [doc['path'] for doc in merged['documents']] == ['docs/a.md', 'docs/b.md', 'docs/c.md']
+    assert merged['duplicates'] == [{'path': 'docs/a.md', 'sources': ['p1', 'p2']}]
+    assert merged['summary'] == {'keep': 2, 'update': 1}
+    assert merged['total_count'] == 3
+
+
+def test_conflicting_results_are_reported():
+    merged, conflicts = merge_manifests([
+        ('p1', partial(1, 2, document('docs/a.md'))),
+        ('p2', partial(2, 2, document('docs/a.md', 'delete'))),
+    ])
+    assert conflicts == [{'path': 'docs/a.md', 'sources': ['p1', 'p2']}]
+    assert 'duplicates' not in merged
+
+
+def test_missing_repeated_and_mismatched_shards():
+    merged, _ = merge_manifests([
+        ('p1', partial(1, 4, document('a.md'))),
+        ('p1-again', partial(1, 4)),
+        ('p3', partial(3, 4, document('c.md'))),
+        ('other', partial(1, 2)),
+    ])
+    assert merged['shards'] == {
+        'count': 4, 'merged': [1, 3], 'missing': [2, 4], 'repeated': [1], 'mismatched_counts': [2]
+    }
+
+
+def test_unsharded_partials_merge_other_fields():
+    merged, conflicts = merge_manifests([
+        ('p1', {'documents': [document('a.md')], 'cache': {'hits': 1, 'misses': 2},
+                'skipped_files': [{'path': 'big.js', 'reason': 'too_large'}],
+                'changed_since': {'rev': 'HEAD~1', 'changed_files': 2, 'total_docs': 5, 'impacted_docs': 1}}),
+        ('p2', {'documents': [document('b.md')], 'cache': {'hits': 3, 'misses': 0},
+                'skipped_files': [{'path': 'big.js', 'reason': 'too_large'}],
+                'changed_since': {'rev': 'HEAD~1', 'changed_files': 2, 'total_docs': 4, 'impacted_docs': 2}}),
+    ])
+    assert conflicts == [] and 'shards' not in merged
+    assert merged['cache'] == {'hits': 4, 'misses': 2}
+    assert merged['skipped_files'] == [{'path': 'big.js', 'reason': 'too_large'}]
+    assert merged['changed_since'] == {'rev': 'HEAD~1', 'changed_files': 2, 'total_docs': 9, 'impacted_docs': 3}
+
+
+def test_load_partial_reads_json_and_ndjson(tmp_path):
+    records = [document('a.md'), document('b.md', 'update')]
+    (tmp_path / 'part.json').write_text(json.dumps(partial(1, 2, *records)), encoding='utf-8')
+    (tmp_path / 'part.ndjson').write_text(''.join(json.dumps(r) + '\n' for r in records), encoding='utf-8')
+    assert load_partial(tmp_path / 'part.json')['documents'] == records
+    assert load_partial(tmp_path / 'part.ndjson') == {'documents': records}
+
+
+def test_cli_exit_status(tmp_path):
+    def save(name, manifest):
+        (tmp_path / name).write_text(json.dumps(manifest), encoding='utf-8')
+
+    save('p1.json', partial(1, 2, document('a.md')))
+    save('p2.json', partial(2, 2, document('b.md')))
+    save('p2-conflict.json', partial(2, 2, document('a.md', 'delete')))
+
+    assert run_script(tmp_path, 'merge_manifests.py', 'p1.json', 'p2.json').returncode == 0
+    missing = run_script(tmp_path, 'merge_manifests.py', 'p1.json', check=False)
+    assert missing.returncode == 1 and '缺少分片' in missing.stderr
+    assert run_script(tmp_path, 'merge_manifests.py', 'p1.json', '--allow-missing').returncode == 0
+    repeated = run_script(tmp_path, 'merge_manifests.py', 'p1.json', 'p1.json', 'p2.json', check=False)
+    assert repeated.returncode == 1 and '重复合并' in repeated.stderr
+    conflict = run_script(tmp_path, 'merge_manifests.py', 'p1.json', 'p2-conflict.json', check=False)
+    assert conflict.returncode == 1 and 'a.md' in conflict.stderr
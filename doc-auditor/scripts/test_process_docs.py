@@ -0,0 +1,246 @@
+"""
+批量处理、回滚日志和原子写入的测试
+"""
+import os
+import json
+import shutil
+import pytest
+from conftest import write
+import process_docs
+from process_docs import (
+    RollbackJournal, UnfinishedJournalError, atomic_write, delete_document, process_documents, rollback,
+    update_document
+)
+
+
+def records(tmp_path):
+    old = write(tmp_path, 'old.md', '# Old\n')
+    stale = write(tmp_path, 'stale.md', '# Stale\n')
+    keep = write(tmp_path, 'keep.md', '# Keep\n')
+    issues = [{'type': 'missing_file', 'reference': 'src/gone.py'}]
+    return [
+        {'path': str(old), 'action': 'delete'},
+        {'path': str(stale), 'action': 'update', 'issues': issues},
+        {'path': str(keep), 'action': 'keep'},
+    ]
+
+
+def test_atomic_write_keeps_mode_and_leaves_no_temp_files(tmp_path):
+    path = write(tmp_path, 'doc.md', 'old')
+    os.chmod(path, 0o640)
+    atomic_write(path, 'new')
+    assert path.read_text(encoding='utf-8') == 'new'
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ['doc.md']
+
+
+def test_atomic_write_failure_keeps_old_content(tmp_path, monkeypatch):
+    path = write(tmp_path, 'doc.md', 'old')
+
+    def fail(src, dst):
+        raise OSError('disk full')
+    monkeypatch.setattr(process_docs.os, 'replace', fail)
+    with pytest.raises(OSError):
+        atomic_write(path, 'new')
+    assert path.read_text(encoding='utf-8') == 'old'
+    assert os.listdir(tmp_path) == ['doc.md']
+
+
+def test_process_and_rollback_restore_original_tree(tmp_path):
+    journal_path = tmp_path / '.doc-auditor' / 'journal.jsonl'
+    documents = records(tmp_path)
+    stats = process_documents(documents, journal_path=journal_path, workers=2)
+    assert stats == {'deleted': 1, 'updated': 1, 'unchanged': 0, 'kept': 1, 'errors': 0}
+    assert not (tmp_path / 'old.md').exists()
+    assert (tmp_path / 'stale.md').read_text(encoding='utf-8').startswith(process_docs.WARNING_HEADER)
+
+    # 再次处理时警告被替换而不是叠加，内容不变时不写入
+    stats = process_documents(documents[1:], journal_path=journal_path)
+    assert stats['unchanged'] == 1
+
+    journal = RollbackJournal(journal_path)
+    assert not journal.load()
+
+    # 回滚只恢复最近一次批处理；第一次批处理的日志已被第二次替换
+    write(tmp_path, 'old.md', '# Old\n')
+    write(tmp_path, 'stale.md', '# Stale\n')
+    process_documents(records(tmp_path), journal_path=journal_path)
+    stats = rollback(journal_path)
+    assert stats == {'restored': 2, 'skipped': 0, 'errors': 0}
+    assert (tmp_path / 'old.md').read_text(encoding='utf-8') == '# Old\n'
+    assert (tmp_path / 'stale.md').read_text(encoding='utf-8') == '# Stale\n'
+    assert not journal_path.exists()
+
+
+def test_unfinished_journal_is_not_overwritten(tmp_path):
+    journal_path = tmp_path / 'journal.jsonl'
+    documents = records(tmp_path)
+    # 模拟记录日志并删除文件后崩溃（没有 commit 记录）
+    journal = RollbackJournal(journal_path)
+    journal.begin(resume=False)
+    delete_document(documents[0]['path'], journal=journal)
+    crashed_journal = journal_path.read_text(encoding='utf-8')
+
+    with pytest.raises(UnfinishedJournalError):
+        process_documents(documents[1:], journal_path=journal_path)
+    with pytest.raises(UnfinishedJournalError):
+        RollbackJournal(journal_path).begin(resume=False)
+    assert journal_path.read_text(encoding='utf-8') == crashed_journal
+
+    # --resume 在日志上继续，上次已删除的文件算作已删除
+    stats = process_documents(documents, journal_path=journal_path, resume=True)
+    assert stats == {'deleted': 1, 'updated': 1, 'unchanged': 0, 'kept': 1, 'errors': 0}
+    assert not RollbackJournal(journal_path).load()
+
+    rollback(journal_path)
+    assert (tmp_path / 'old.md').read_text(encoding='utf-8') == '# Old\n'
+    assert (tmp_path / 'stale.md').read_text(encoding='utf-8') == '# Stale\n'
+
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    journal_path = tmp_path / 'journal.jsonl'
+    entry = {'op': 'update', 'path': str(tmp_path / 'a.md'), 'original': 'a'}
+    journal_path.write_text(json.dumps(entry) + '\n{"op": "upd', encoding='utf-8')
+    journal = RollbackJournal(journal_path)
+    assert journal.load()
+    assert list(journal.records) == [entry['path']]
+
+
+def test_delete_document_backup(tmp_path):
+    doc = write(tmp_path, 'doc.md', '# Doc\n')
+    assert delete_document(doc)
+    assert not doc.exists()
+    assert (tmp_path / 'doc.md.backup').read_text(encoding='utf-8') == '# Doc\n'
+
+    doc = write(tmp_path, 'other.md', '# Other\n')
+    delete_document(doc, backup=False)
+    assert not (tmp_path / 'other.md.backup').exists()
+
+    # 给定回滚日志时原内容写入日志，不生成 .md.backup
+    journal = RollbackJournal(tmp_path / 'journal.jsonl')
+    journal.begin(resume=False)
+    doc = write(tmp_path, 'third.md', '# Third\n')
+    delete_document(doc, journal=journal)
+    assert journal.records[str(doc)]['original'] == '# Third\n'
+    assert not (tmp_path / 'third.md.backup').exists()
+
+
+def test_update_document(tmp_path):
+    doc = write(tmp_path, 'doc.md', '# Doc\r\n')
+    issues = [{'type': 'missing_file', 'reference': 'src/gone.py'},
+              {'type': 'missing_endpoint', 'reference': 'GET /api/items'}]
+    journal = RollbackJournal(tmp_path / 'journal.jsonl')
+    journal.begin(resume=False)
+    assert update_document(doc, issues, journal=journal)
+    content = doc.read_text(encoding='utf-8')
+    assert content.startswith(process_docs.WARNING_HEADER) and content.endswith('# Doc\n')
+    assert 'GET /api/items' in content
+
+    # 内容不变时不写入，日志中只保留第一次的原内容
+    mtime_ns = os.stat(doc).st_mtime_ns
+    assert update_document(doc, issues, journal=journal)
+    assert os.stat(doc).st_mtime_ns == mtime_ns
+    journal.commit()
+    rollback(tmp_path / 'journal.jsonl')
+    assert doc.read_bytes() == b'# Doc\r\n'
+
+    other = write(tmp_path, 'other.md', '# Other\n')
+    assert update_document(other, issues)
+    assert other.read_text(encoding='utf-8').endswith('# Other\n')
+    assert not update_document(tmp_path / 'missing.md', issues)
+
+
+def test_dry_run_changes_nothing(tmp_path):
+    journal_path = tmp_path / 'journal.jsonl'
+    stats = process_documents(records(tmp_path), dry_run=True, journal_path=journal_path)
+    assert stats['deleted'] == 1 and stats['updated'] == 1
+    assert (tmp_path / 'old.md').exists()
+    assert (tmp_path / 'stale.md').read_text(encoding='utf-8') == '# Stale\n'
+    assert not journal_path.exists()
+
+
+def baseline_process(documents):
+    """改动之前 process_docs.py 逐个删除、更新文档的实现（不含备份和输出）"""
+    for doc_info in documents:
+        doc_path = doc_info['path']
+        action = doc_info.get('action', 'keep')
+        if action == 'delete':
+            os.unlink(doc_path)
+        elif action == 'update':
+            with open(doc_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            warning = "> **⚠️ 文档已过时**\n> \n"
+            issues = doc_info.get('issues', [])
+            for kind, label in [('missing_file', '以下文件不存在'), ('missing_function', '以下函数可能已删除'),
+                                ('missing_class', '以下类可能已删除')]:
+                references = [i['reference'] for i in issues if i['type'] == kind]
+                if references:
+                    warning += f"> - {label}: {', '.join(references)}\n"
+            warning += "> \n> 请更新文档以反映当前代码状态。\n\n---\n\n"
+            if not content.startswith('> **⚠️ 文档已过时**'):
+                updated_content = warning + content
+            else:
+                new_content = []
+                skip_until_separator = False
+                for line in content.split('\n'):
+                    if line.strip() == '---' and skip_until_separator:
+                        skip_until_separator = False
+                        continue
+                    if skip_until_separator:
+                        continue
+                    if line.startswith('> **⚠️'):
+                        skip_until_separator = True
+                        new_content.append(warning.strip())
+                        continue
+                    new_content.append(line)
+                updated_content = '\n'.join(new_content)
+            with open(doc_path, 'w', encoding='utf-8') as f:
+                f.write(updated_content)
+
+
+def markdown_tree(root):
+    return {
+        path.relative_to(root).as_posix(): path.read_bytes()
+        for path in root.rglob('*.md') if '.doc-auditor' not in path.parts
+    }
+
+
+def test_processed_tree_matches_baseline(tmp_path):
+    contents = {
+        'a.md': '# A\n\ntext\n',
+        'b.md': '# B\r\nwindows line endings\r\n',
+        'c.md': '> **⚠️ 文档已过时**\n> \n> - 以下文件不存在: old.py\n> \n\n---\n\n# C\n\n---\n\nmore\n',
+        'd.md': '# D 说明\n',
+        'e.md': '',
+        'docs/f.md': '# F\n',
+    }
+    issues = [
+        {'type': 'missing_file', 'reference': 'src/gone.py'},
+        {'type': 'missing_function', 'reference': 'run'},
+        {'type': 'missing_class', 'reference': 'Engine'},
+        {'type': 'missing_file', 'reference': 'lib/也没了.py'},
+    ]
+    manifests = {}
+    for name in ('baseline', 'current'):
+        root = tmp_path / name
+        for rel_path, content in contents.items():
+            path = root / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content.encode('utf-8'))
+        manifests[name] = [
+            {'path': str(root / 'a.md'), 'action': 'update', 'issues': issues},
+            {'path': str(root / 'b.md'), 'action': 'update', 'issues': issues[1:2]},
+            {'path': str(root / 'c.md'), 'action': 'update', 'issues': issues[2:]},
+            {'path': str(root / 'd.md'), 'action': 'delete', 'issues': issues},
+            {'path': str(root / 'e.md'), 'action': 'update', 'issues': issues[:1]},
+            {'path': str(root / 'docs/f.md'), 'action': 'keep', 'issues': []},
+        ]
+
+    baseline_process(manifests['baseline'])
+    stats = process_documents(manifests['current'], journal_path=tmp_path / 'journal.jsonl', workers=2)
+    assert stats == {'deleted': 1, 'updated': 4, 'unchanged': 0, 'kept': 1, 'errors': 0}
+    assert markdown_tree(tmp_path / 'current') == markdown_tree(tmp_path / 'baseline')
+
+    # 回滚后与处理之前逐字节相同
+    rollback(tmp_path / 'journal.jsonl')
+    assert markdown_tree(tmp_path / 'current') == {k: v.encode('utf-8') for k, v in contents.items()}
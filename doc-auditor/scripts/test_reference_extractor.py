@@ -0,0 +1,136 @@
+"""
+引用提取器的测试：与系列改动之前各脚本中的提取逻辑逐项比较
+"""
+import re
+import random
+from pathlib import Path
+import pytest
+from audit_document import DocumentAuditor
+from audit_with_context import DocumentAuditorWithContext
+from collect_context import ContextCollector
+from reference_extractor import (
+    FILE_PATH_PATTERN, VARIABLE_PATTERN, API_PATTERN, extract_references, find_code_blocks, find_file_paths
+)
+
+
+# 改动之前 audit_document / audit_with_context / collect_context 中的正则
+BASELINE_FILE_PATTERN = r'(?:[`:]?)([a-zA-Z0-9_\-./]+\.(?:py|js|ts|tsx|java|go|rs|sh|yaml|yml|json|sql))(?:`|\)|\s|$|,)'
+BASELINE_CODE_BLOCK_PATTERN = r'```(?:python|javascript|typescript|java|go|rust|bash|sh)?\n(.*?)```'
+BASELINE_API_PATTERN = r'(?:GET|POST|PUT|DELETE|PATCH)\s+([\/\w\-{}]+)'
+
+
+def baseline_code_references(doc_content):
+    """改动之前 DocumentAuditor.extract_code_references 的实现"""
+    references = {
+        'file_paths': [],
+        'function_names': [],
+        'class_names': [],
+        'variables': [],
+        'api_endpoints': [],
+        'code_blocks': []
+    }
+    references['file_paths'].extend(re.findall(BASELINE_FILE_PATTERN, doc_content))
+    references['code_blocks'].extend(re.findall(BASELINE_CODE_BLOCK_PATTERN, doc_content, re.DOTALL))
+    for code in references['code_blocks']:
+        references['function_names'].extend(re.findall(r'def\s+(\w+)\s*\(', code))
+        references['function_names'].extend(re.findall(r'function\s+(\w+)\s*\(', code))
+        references['class_names'].extend(re.findall(r'class\s+(\w+)\s*[:\(]', code))
+        references['variables'].extend(re.findall(r'(\w+)\s*=\s*', code))
+    references['api_endpoints'].extend(re.findall(BASELINE_API_PATTERN, doc_content))
+    for key in references:
+        references[key] = list(set(references[key]))
+    return references
+
+
+DOCS = {
+    'paths': (
+        'See `src/utils/helper.py`, ./scripts/test.sh and (config/app.yaml).\n'
+        'Also a.py,b.js c.json\tdocs/x.tsx\n'
+        'Not paths: foo.py.bak, "quoted.py", bar.pyc, .py alone, x.py: y\n'
+        'Edge: ..py archive.tar.sh/inner.go last.sql'
+    ),
+    'code': (
+        '# Usage\n\n'
+        '```python\n'
+        'from app import run\n'
+        'result = run(x=1, y = 2)\n'
+        'flag\n= True\n'
+        'if a == b: pass\n'
+        'def handler(request):\n    value=compute()\n'
+        'class Service(Base):\n    pass\n'
+        '```\n\n'
+        '```javascript\n'
+        'function render (props) { let total = 0; total += 1 }\n'
+        'class Widget { }\n'
+        '```\n\n'
+        '```bash\nexport PATH=/usr/bin\n```\n'
+    ),
+    'api': (
+        'GET /users/{id} returns a user.\n'
+        'POST\n/users creates one; DELETE  /users/{id}\n'
+        'PATCH /items/item-1 and GETTING /nothing\n'
+    ),
+    'mixed': (
+        '---\ntitle: Guide\n---\n# Guide\n\nRun `python tools/run.py` then PUT /jobs/{job_id}.\n\n'
+        '```\nconfig = load("conf.yaml")\ndef main():\n    pass\n```\n'
+    ),
+}
+
+
+@pytest.mark.parametrize('name', sorted(DOCS))
+def test_extract_code_references_matches_baseline(name, tmp_path):
+    content = DOCS[name]
+    references = DocumentAuditor(tmp_path).extract_code_references(content)
+    expected = baseline_code_references(content)
+    for key in ('file_paths', 'function_names', 'class_names', 'variables', 'api_endpoints'):
+        assert sorted(references[key]) == sorted(expected[key]), key
+    assert sorted(references['code_blocks']) == sorted(expected['code_blocks'])
+
+
+@pytest.mark.parametrize('name', sorted(DOCS))
+def test_context_scripts_file_references_match_baseline(name, tmp_path):
+    content = DOCS[name]
+    expected = re.findall(BASELINE_FILE_PATTERN, content)
+    assert DocumentAuditorWithContext(tmp_path).extract_file_references(content) == expected
+    assert ContextCollector(tmp_path).extract_file_references(content) == expected
+
+
+def test_extraction_matches_baseline_on_repo_docs(tmp_path):
+    auditor = DocumentAuditor(tmp_path)
+    docs = sorted(Path(__file__).resolve().parent.parent.glob('**/*.md'))
+    for doc in docs:
+        content = doc.read_text(encoding='utf-8')
+        assert [value for value, _ in find_file_paths(content)] == re.findall(BASELINE_FILE_PATTERN, content), doc
+        references = auditor.extract_code_references(content)
+        assert sorted(references['api_endpoints']) == sorted(set(re.findall(BASELINE_API_PATTERN, content))), doc
+
+
+def test_patterns_match_baseline_on_random_text():
+    # 随机拼接容易出错的片段：路径字符、扩展名、分隔符、赋值和 HTTP 方法
+    pieces = ['a', 'b', '.', '/', '-', '_', 'py', 'js', 'json', 'x', '`', ')', ',', ' ', '\n', '\t', ':',
+              '=', '==', 'GET', 'POST', ' /u', '{id}', '"', 'é', '\r', '.sh', '.py']
+    rng = random.Random(0)
+    for _ in range(20000):
+        text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 20)))
+        assert [m.group() for m in FILE_PATH_PATTERN.finditer(text)] == re.findall(BASELINE_FILE_PATTERN, text)
+        assert [m.group(1) for m in VARIABLE_PATTERN.finditer(text)] == re.findall(r'(\w+)\s*=\s*', text)
+        assert [m.group(2) for m in API_PATTERN.finditer(text)] == re.findall(BASELINE_API_PATTERN, text)
+
+
+def test_line_numbers():
+    tokens = extract_references(DOCS['code'])
+    assert ('handler', 9) in tokens['function_names']
+    assert tokens['class_names'] == [('Service', 11)]
+    assert ('flag', 6) in tokens['variables']
+    assert tokens['variables'].index(('result', 5)) < tokens['variables'].index(('value', 10))
+    assert find_file_paths('x\n\n`src/a.py`') == [('src/a.py', 3)]
+
+
+def test_unlisted_language_block_does_not_swallow_next_block():
+    # 有意与原实现不同：原来的 DOTALL 正则会把 json 块的结束围栏当成开始，吞掉后面的正文
+    content = '```json\n{"a": 1}\n```\n\ntext = 1\n\n```python\ndef real():\n    pass\n```\n'
+    blocks = find_code_blocks(content)
+    assert [block['language'] for block in blocks] == ['json', 'python']
+    tokens = extract_references(content)
+    assert [name for name, _ in tokens['function_names']] == ['real']
+    assert tokens['variables'] == []
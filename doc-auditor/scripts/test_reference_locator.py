@@ -0,0 +1,103 @@
+"""
+多模式引用定位器的测试：与逐个引用逐行查找的原实现比较
+"""
+import random
+from pathlib import Path
+import pytest
+from audit_with_context import DocumentAuditorWithContext
+from reference_locator import ReferenceLocator, build_sections
+
+
+def baseline_locate(content, references):
+    """逐个引用逐行查找（改动之前 extract_problematic_lines 的查找方式，但不在第一次命中时停止）"""
+    lines = content.split('\n')
+    occurrences = {}
+    for reference in dict.fromkeys(references):
+        if not reference:
+            continue
+        found = [i for i, line in enumerate(lines) if reference in line]
+        if found:
+            occurrences[reference] = found
+    return occurrences
+
+
+def baseline_problematic_lines(doc_content, issues):
+    """改动之前 DocumentAuditorWithContext.extract_problematic_lines 的实现"""
+    lines = doc_content.split('\n')
+    problematic_sections = []
+    for issue in issues:
+        reference = issue.get('reference', '')
+        for i, line in enumerate(lines):
+            if reference in line:
+                start = max(0, i - 2)
+                end = min(len(lines), i + 3)
+                section = {'line_number': i + 1, 'context': lines[start:end], 'highlight_index': i - start, 'issue': issue}
+                if not any(s['line_number'] == section['line_number'] for s in problematic_sections):
+                    problematic_sections.append(section)
+                break
+    return problematic_sections
+
+
+def test_locate_matches_baseline_on_random_text():
+    rng = random.Random(0)
+    alphabet = 'ab.\n/'
+    for _ in range(2000):
+        content = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        references = [''.join(rng.choice('ab./') for _ in range(rng.randint(0, 4))) for _ in range(rng.randint(0, 6))]
+        assert ReferenceLocator(references).locate(content) == baseline_locate(content, references)
+
+
+def test_locate_overlapping_references():
+    content = 'see src/data.py and data.py\n\nold `a.py` then ata.py\nsrc/data.py.bak'
+    references = ['data.py', 'src/data.py', 'a.py', 'ata.py', 'missing.py']
+    assert ReferenceLocator(references).locate(content) == baseline_locate(content, references)
+
+
+@pytest.mark.parametrize('line_count, hit_lines, radius', [
+    (10, [0, 1, 9], 2), (10, [4], 2), (20, [2, 7, 12, 13], 2), (5, [], 2), (30, [3, 9, 15], 2), (8, [1, 6], 0),
+])
+def test_sections_are_merged_context_windows(line_count, hit_lines, radius):
+    sections = build_sections(line_count, [(i, None) for i in hit_lines], radius)
+    # 每个命中行都在某个片段内，片段互不重叠，片段内的行都离某个命中行不超过 radius
+    covered = [line for section in sections for line in range(section['start'], section['end'])]
+    assert len(covered) == len(set(covered))
+    assert sorted(covered) == sorted({
+        line for i in hit_lines for line in range(max(0, i - radius), min(line_count, i + radius + 1))
+    })
+    assert sorted(i for section in sections for i, _ in section['hits']) == sorted(hit_lines)
+
+
+def test_problematic_lines_cover_every_baseline_section(tmp_path):
+    content = '\n'.join([
+        '# Guide', '', 'Run `tools/run.py` first.', 'Then edit conf.yaml.', '', '', '', '',
+        'Again `tools/run.py` here.', 'And `lib/gone.py`.', '', 'End.'
+    ])
+    issues = [
+        {'type': 'missing_file', 'reference': 'tools/run.py'},
+        {'type': 'missing_file', 'reference': 'lib/gone.py'},
+        {'type': 'missing_file', 'reference': 'conf.yaml'},
+        {'type': 'missing_file', 'reference': 'tools/run.py'},
+    ]
+    sections = DocumentAuditorWithContext(tmp_path).extract_problematic_lines(content, issues)
+    baseline = baseline_problematic_lines(content, issues)
+
+    # 原实现的每个片段（引用第一次出现的位置）都被某个新片段高亮，并带有同一个问题
+    for old in baseline:
+        matching = [
+            section for section in sections
+            if old['line_number'] - section['line_number'] + section['highlight_index'] in section['highlight_indexes']
+        ]
+        assert len(matching) == 1
+        assert old['issue'] in matching[0]['issues']
+        assert set(old['context']) <= set(matching[0]['context'])
+    # 后面的出现位置也被找到，重复的问题只保留一条
+    assert [section['line_number'] for section in sections] == [3, 9]
+    assert sections[0]['issues'] == [issues[0], issues[2]]
+
+
+def test_repo_docs_locate_like_baseline():
+    docs = sorted(Path(__file__).resolve().parent.parent.glob('**/*.md'))
+    for doc in docs:
+        content = doc.read_text(encoding='utf-8')
+        references = sorted(set(content.split()))[:200]
+        assert ReferenceLocator(references).locate(content) == baseline_locate(content, references), doc
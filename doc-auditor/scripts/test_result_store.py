@@ -0,0 +1,207 @@
+"""
+审计结果存储的测试：写入的运行能原样读回，跨运行的操作变化查询与按运行逐个比较的结果一致
+"""
+import os
+import sys
+import json
+import sqlite3
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+import pytest
+from result_store import REFERENCE_KINDS, ResultStore, parse_since
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def document(path, action='keep', issues=(), references=None):
+    record = {'path': path, 'status': 'current' if action == 'keep' else 'outdated', 'action': action,
+              'issues': [{'type': t, 'severity': 'high', 'reference': r, 'message': f'{t}: {r}'} for t, r in issues]}
+    if references is not None:
+        record['references'] = references
+    return record
+
+
+def stored_documents(store, run_id):
+    """从三张表还原一次运行的文档记录"""
+    documents = {}
+    for row in store.conn.execute('SELECT * FROM documents WHERE run_id = ?', (run_id,)):
+        documents[row['path']] = {'status': row['status'], 'action': row['action'],
+                                  'issue_count': row['issue_count'], 'issues': [], 'references': {}}
+    for row in store.conn.execute('SELECT * FROM issues WHERE run_id = ? ORDER BY rowid', (run_id,)):
+        documents[row['path']]['issues'].append(
+            {'type': row['type'], 'severity': row['severity'], 'reference': row['reference'], 'message': row['message']}
+        )
+    for row in store.conn.execute('SELECT * FROM doc_references WHERE run_id = ? ORDER BY rowid', (run_id,)):
+        documents[row['path']]['references'].setdefault(row['kind'], []).append(row['value'])
+    return documents
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # 相对路径按工作目录解析，与脚本在项目根目录下运行时一致
+    monkeypatch.chdir(tmp_path)
+    store = ResultStore(tmp_path / 'results.db')
+    yield store
+    store.close()
+
+
+DOCUMENTS = [
+    document('docs/a.md'),
+    document('docs/b.md', 'update', [('missing_file', 'src/x.py'), ('missing_function', 'run')],
+             {'file_paths': ['src/x.py'], 'function_names': ['run'], 'class_names': [], 'api_routes': [],
+              'code_blocks': ['ignored']}),
+    document('docs/说明.md', 'delete', [('missing_class', 'Gone')], {'class_names': ['Gone']}),
+]
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 500])
+def test_run_round_trip(tmp_path, store, batch_size):
+    documents = [{**doc, 'path': str(tmp_path / doc['path'])} for doc in DOCUMENTS]
+    run_id = store.record_run('audit_project', tmp_path, documents, batch_size)
+
+    stored = stored_documents(store, run_id)
+    assert sorted(stored) == sorted(doc['path'] for doc in DOCUMENTS)
+    for doc in DOCUMENTS:
+        row = stored[doc['path']]
+        assert (row['status'], row['action'], row['issue_count']) == (doc['status'], doc['action'], len(doc['issues']))
+        assert row['issues'] == doc['issues']
+        references = doc.get('references', {})
+        assert row['references'] == {k: references[k] for k in REFERENCE_KINDS if references.get(k)}
+
+    [run] = store.runs()
+    assert (run['id'], run['tool'], run['doc_count']) == (run_id, 'audit_project', 3)
+    assert run['project_root'] == os.path.abspath(tmp_path) and run['finished_at'] is not None
+
+
+def test_paths_are_relative_to_the_project(tmp_path, store, monkeypatch):
+    first = store.record_run('audit_project', '.', [document('docs/a.md')])
+    second = store.record_run('audit_project', tmp_path, [document(str(tmp_path / 'docs' / 'a.md'))])
+    monkeypatch.chdir(tmp_path / '..')
+    third = store.record_run('audit_project', tmp_path.name, [document(os.path.join(tmp_path.name, 'docs', 'a.md'))])
+    assert [sorted(stored_documents(store, run)) for run in (first, second, third)] == [['docs/a.md']] * 3
+
+
+def test_write_through_passes_records_on(store, tmp_path):
+    run_id = store.begin_run('audit_document', tmp_path)
+    records = [{**doc, 'path': str(tmp_path / doc['path'])} for doc in DOCUMENTS]
+    assert list(store.write_through(run_id, iter(records), batch_size=2)) == records
+    assert store.runs()[0]['finished_at'] is None
+    store.finish_run(run_id)
+    assert len(stored_documents(store, run_id)) == 3
+    assert store.runs()[0]['finished_at'] is not None
+
+
+def baseline_action_changes(runs):
+    """逐个运行比较每个文档与它上一次出现时的操作"""
+    changes = []
+    last_action = {}
+    for run_id, documents in runs:
+        for doc in sorted(documents, key=lambda d: d['path']):
+            previous = last_action.get(doc['path'])
+            if previous != doc['action']:
+                changes.append((doc['path'], previous, doc['action'], run_id))
+            last_action[doc['path']] = doc['action']
+    return sorted(changes, key=lambda c: (c[3], c[0]))
+
+
+def test_action_changes_match_run_by_run_comparison(tmp_path, store):
+    history = [
+        [document('a.md'), document('b.md'), document('c.md', 'update')],
+        [document('a.md', 'delete'), document('c.md', 'update')],
+        [document('a.md', 'delete'), document('b.md', 'delete'), document('c.md'), document('d.md', 'delete')],
+        [document('a.md'), document('b.md', 'delete')],
+    ]
+    runs = [(store.record_run('audit_project', tmp_path, docs), docs) for docs in history]
+
+    changes = store.action_changes()
+    assert [(c['path'], c['previous_action'], c['action'], c['run_id']) for c in changes] == baseline_action_changes(runs)
+    deleted = store.action_changes('delete')
+    assert [(c['path'], c['run_id']) for c in deleted] == [
+        ('a.md', runs[1][0]), ('b.md', runs[2][0]), ('d.md', runs[2][0])
+    ]
+    assert store.action_changes(since='2000-01-01 00:00:00') == changes
+    assert store.action_changes(since='2999-01-01 00:00:00') == []
+
+    latest = store.latest_documents()
+    assert [(d['path'], d['action']) for d in latest] == [('a.md', 'keep'), ('b.md', 'delete')]
+    assert [d['path'] for d in store.latest_documents('delete')] == ['b.md']
+
+
+def test_store_is_shared_between_connections(tmp_path, store):
+    store.record_run('audit_project', tmp_path, [document('a.md')])
+    other = ResultStore(store.db_path)
+    try:
+        assert other.conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert [d['path'] for d in other.latest_documents()] == ['a.md']
+    finally:
+        other.close()
+    with pytest.raises(sqlite3.IntegrityError):
+        with store.conn:
+            store.conn.execute('INSERT INTO runs (tool) VALUES (?)', ('x',))
+
+
+def test_parse_since():
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for value, seconds in [('12h', 12 * 3600), ('7d', 7 * 86400), ('2w', 14 * 86400)]:
+        since = datetime.strptime(parse_since(value), '%Y-%m-%d %H:%M:%S')
+        assert abs((now - since).total_seconds() - seconds) < 60
+    assert parse_since('2024-01-31') == '2024-01-31 00:00:00'
+    assert parse_since(' 2024-01-31 08:30:00 ') == '2024-01-31 08:30:00'
+    with pytest.raises(ValueError):
+        parse_since('last week')
+
+
+def test_audit_document_store_matches_output(tmp_path):
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'guide.md').write_text('# Guide\n\nSee `src/gone.py` and `Missing`.\n', encoding='utf-8')
+    (tmp_path / 'docs' / 'ok.md').write_text('# OK\n', encoding='utf-8')
+    result = subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / 'audit_document.py'), '--store'],
+        cwd=tmp_path, input='docs/guide.md\ndocs/ok.md\n', capture_output=True, text=True, check=True
+    )
+    output = json.loads(result.stdout)
+
+    store = ResultStore.for_project(tmp_path)
+    try:
+        stored = stored_documents(store, output['run_id'])
+        assert store.runs()[0]['finished_at'] is not None
+    finally:
+        store.close()
+    for doc in output['documents']:
+        row = stored[doc['path']]
+        assert (row['status'], row['action'], row['issues']) == (doc['status'], doc['action'], doc['issues'])
+    assert stored['docs/guide.md']['issues']
+
+
+def test_action_changes_compare_within_tool_and_project(tmp_path, store):
+    other_project = tmp_path / 'other'
+    other_project.mkdir()
+    store.record_run('audit_project', tmp_path, [document('a.md'), document('b.md')])
+    store.record_run('audit_with_context', tmp_path, [document('a.md', 'delete')])
+    store.record_run('audit_project', other_project, [document(str(other_project / 'a.md'), 'delete')])
+    # 只审计了一个文档的运行不影响其他文档
+    store.record_run('audit_project', tmp_path, [document('b.md')])
+    last = store.record_run('audit_project', tmp_path, [document('a.md', 'delete'), document('b.md')])
+
+    changes = [(c['tool'], c['path'], c['previous_action'], c['action']) for c in store.action_changes('delete')]
+    assert changes == [
+        ('audit_with_context', 'a.md', None, 'delete'),
+        ('audit_project', 'a.md', None, 'delete'),
+        ('audit_project', 'a.md', 'keep', 'delete'),
+    ]
+    assert [c['run_id'] for c in store.action_changes('delete')][-1] == last
+    assert store.action_changes('delete')[1]['project_root'] == os.path.abspath(other_project)
+
+
+@pytest.mark.parametrize('batch_size', [1, 500])
+def test_repeated_document_in_a_run_is_replaced(tmp_path, store, batch_size):
+    first = document('a.md', 'update', [('missing_file', 'x.py')], {'file_paths': ['x.py']})
+    second = document('a.md', 'delete', [('missing_file', 'y.py'), ('missing_class', 'Gone')], {'file_paths': ['y.py']})
+    run_id = store.record_run('audit_project', tmp_path, [first, document('b.md'), second], batch_size)
+    stored = stored_documents(store, run_id)
+    assert stored['a.md']['action'] == 'delete'
+    assert stored['a.md']['issues'] == second['issues']
+    assert stored['a.md']['references'] == {'file_paths': ['y.py']}
+    assert store.runs()[0]['doc_count'] == 2
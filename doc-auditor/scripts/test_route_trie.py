@@ -0,0 +1,175 @@
+"""
+API 路由提取与前缀树匹配的测试：匹配结果与逐条比较路由模板的结果一致
+"""
+import random
+import pytest
+from audit_document import DocumentAuditor
+from route_trie import ANY_METHOD, CATCH_ALL, MOUNT, PARAM, RouteTrie, parse_routes, split_path
+
+
+def test_parse_decorator_and_router_calls():
+    content = b'\n'.join([
+        b"@app.get('/users')",
+        b'    @users_bp.route("/users/<int:user_id>")',
+        b"app.post('/login', handler)",
+        b"router.delete(`/items/:id`)",
+        b"usersRouter.put('/users/:id')",
+        b"this.app.patch('/settings')",
+    ])
+    # 蓝图和子路由可能挂载在别处给出的前缀下
+    assert parse_routes(content) == [
+        (ANY_METHOD, '/.../users/<int:user_id>'),
+        ('DELETE', '/.../items/:id'),
+        ('GET', '/users'),
+        ('PATCH', '/settings'),
+        ('POST', '/login'),
+        ('PUT', '/.../users/:id'),
+    ]
+
+
+def test_http_client_calls_are_not_routes():
+    content = b'\n'.join([
+        b"response = requests.get('/x')",
+        b"session.post('/login', data=payload)",
+        b"await axios.delete(`/items/1`)",
+        b"self.client.put('/users/1')",
+        b"r = requests.get('/y'); app.get('/health')",
+    ])
+    assert parse_routes(content) == [('GET', '/health')]
+
+
+def linear_match(routes, method, path):
+    """逐条比较路由模板的路径段（不建树），作为前缀树匹配的参照"""
+    method = method.upper()
+    segments = split_path(path)
+    for route_method, route_path in routes:
+        if route_method.upper() not in (method, ANY_METHOD):
+            continue
+        template = split_path(route_path)
+        # 挂载前缀: 与端点路径的每个后缀比较
+        starts = range(len(segments) + 1) if template[:1] == [MOUNT] else [0]
+        if template[:1] == [MOUNT]:
+            template = template[1:]
+        for start in starts:
+            if template_matches(template, segments[start:]):
+                return True
+    return False
+
+
+def template_matches(template, segments):
+    for j, code in enumerate(template):
+        if code == CATCH_ALL:
+            return j <= len(segments)
+        if j >= len(segments):
+            return False
+        doc = segments[j]
+        if code != PARAM and (code != doc or doc in (PARAM, CATCH_ALL)):
+            return False
+    return len(template) == len(segments)
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/users/{id}', ['users', PARAM]),
+    ('/users/<int:id>/', ['users', PARAM]),
+    ('users/:id?', ['users', PARAM]),
+    ('//a//b', ['a', 'b']),
+    ('/files/<path:p>/ignored', ['files', CATCH_ALL]),
+    ('/static/*', ['static', CATCH_ALL]),
+    ('/', []),
+    ('/.../api/{id}', [MOUNT, 'api', PARAM]),
+    ('/a/.../b', ['a', '...', 'b']),
+])
+def test_split_path(path, expected):
+    assert split_path(path) == expected
+
+
+def test_match_backtracks_from_literal_to_param():
+    trie = RouteTrie([('GET', '/users/me/settings'), ('GET', '/users/{id}/posts'), ('POST', '/users/me/posts')])
+    # 先走字面量 me 到达死路，再退回参数分支
+    assert trie.match('GET', '/users/me/posts')
+    assert trie.match('get', '/users/:user_id/posts')
+    assert not trie.match('GET', '/users/{id}/settings')
+    assert not trie.match('DELETE', '/users/me/posts')
+    assert not trie.match('GET', '/users/me')
+
+
+def test_any_method_and_catch_all():
+    trie = RouteTrie([(ANY_METHOD, '/health'), ('GET', '/files/<path:p>'), ('GET', '/files/index')])
+    assert trie.match('DELETE', '/health')
+    assert trie.match('GET', '/files/a/b/c') and trie.match('GET', '/files') and trie.match('GET', '/files/index')
+    assert not trie.match('POST', '/files/a')
+    assert len(trie) == 3
+
+
+def test_match_agrees_with_linear_scan():
+    rng = random.Random(0)
+    literals = ['users', 'me', 'posts', 'v1', 'items']
+    mounts = ['', '', '/...']
+    params = ['{id}', '<int:id>', ':id', '<path:p>', '*']
+    methods = ['GET', 'POST', ANY_METHOD]
+
+    def random_path():
+        return '/' + '/'.join(
+            rng.choice(literals) if rng.random() < 0.7 else rng.choice(params) for _ in range(rng.randint(0, 4))
+        )
+
+    for _ in range(300):
+        routes = [(rng.choice(methods), rng.choice(mounts) + random_path()) for _ in range(rng.randint(1, 8))]
+        trie = RouteTrie(routes)
+        for _ in range(20):
+            method, path = rng.choice(['GET', 'POST', 'PUT']), random_path()
+            assert trie.match(method, path) == linear_match(routes, method, path), (routes, method, path)
+
+
+def test_flask_blueprint_prefixes():
+    content = b'\n'.join([
+        b"users = Blueprint('users', __name__, url_prefix='/api/users/')",
+        b"admin = Blueprint('admin', __name__)",
+        b"@users.route('/<int:user_id>')",
+        b"@admin.get('/stats')",
+        b"@app.route('/health')",
+    ])
+    routes = parse_routes(content)
+    assert routes == [(ANY_METHOD, '/.../api/users/<int:user_id>'), (ANY_METHOD, '/health'), ('GET', '/.../stats')]
+    trie = RouteTrie(routes)
+    # 构造时的前缀已知；注册时的 url_prefix 在别的文件中，挂载前缀不确定
+    assert trie.match('GET', '/api/users/{id}')
+    assert trie.match('GET', '/v2/api/users/{id}')
+    assert trie.match('GET', '/admin/stats') and trie.match('GET', '/stats')
+    assert not trie.match('GET', '/users/{id}')
+    assert not trie.match('GET', '/admin/health')
+
+
+def test_fastapi_router_prefixes():
+    content = b'\n'.join([
+        b"router = APIRouter(",
+        b"    prefix='/users',",
+        b"    tags=['users'],",
+        b")",
+        b"items_router: APIRouter = fastapi.APIRouter()",
+        b"@router.get('/{user_id}')",
+        b"@items_router.post('/items')",
+        b"app.include_router(router, prefix='/api')",
+    ])
+    trie = RouteTrie(parse_routes(content))
+    assert trie.match('GET', '/api/users/{id}')
+    assert trie.match('GET', '/users/{id}')
+    assert trie.match('POST', '/api/v1/items')
+    assert not trie.match('GET', '/api/items')
+    assert not trie.match('GET', '/api/posts/{id}')
+
+
+def test_prefixed_router_endpoint_is_not_reported_missing(tmp_path):
+    (tmp_path / 'app').mkdir()
+    (tmp_path / 'app' / 'users.py').write_text(
+        "router = APIRouter(prefix='/users')\n\n@router.get('/{user_id}')\ndef get_user(user_id):\n    pass\n",
+        encoding='utf-8'
+    )
+    (tmp_path / 'app' / 'main.py').write_text(
+        "app = FastAPI()\napp.include_router(users.router, prefix='/api')\n\n@app.get('/health')\ndef health():\n    pass\n",
+        encoding='utf-8'
+    )
+    doc = tmp_path / 'api.md'
+    doc.write_text('# API\n\nGET /api/users/{id}\n\nGET /health\n\nDELETE /api/users/{id}\n', encoding='utf-8')
+    result = DocumentAuditor(tmp_path).audit_document(doc)
+    assert [(i['type'], i['reference']) for i in result['issues']] == [('missing_endpoint', 'DELETE /api/users/{id}')]
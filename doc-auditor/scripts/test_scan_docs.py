@@ -0,0 +1,73 @@
+"""
+文档扫描的测试：不读忽略文件时与改动之前的 rglob 实现一致，.gitignore / .auditignore 按 gitignore 语义剪枝
+"""
+from pathlib import Path
+import pytest
+from conftest import write
+from scan_docs import DEFAULT_EXCLUDE_DIRS, find_markdown_files, is_ignored, load_ignore_rules
+
+
+def baseline_find_markdown_files(root_dir, exclude_dirs=None):
+    """改动之前 find_markdown_files 的实现"""
+    if exclude_dirs is None:
+        exclude_dirs = ['.git', 'node_modules', '__pycache__', '.venv', 'venv', 'dist', 'build']
+    md_files = []
+    for file_path in Path(root_dir).rglob('*.md'):
+        if any(excluded in file_path.parts for excluded in exclude_dirs):
+            continue
+        md_files.append(str(file_path))
+    return sorted(md_files)
+
+
+@pytest.fixture
+def project(tmp_path):
+    for rel_path in [
+        'README.md', 'docs/guide.md', 'docs/api/v1.md', 'docs/build.md', 'docs/notes.txt',
+        'node_modules/pkg/README.md', 'src/node_modules/x.md', 'a/b/c/dist/deep.md', 'build/out.md',
+        '.git/info.md', 'venv2/ok.md', 'docs/__pycache__/cached.md', 'tmp/scratch.md', 'tmp/keep.md',
+        'generated/api.md', 'docs/drafts/wip.md', 'docs/drafts/final.md', 'vendor/lib/doc.md',
+    ]:
+        write(tmp_path, rel_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize('exclude_dirs', [None, DEFAULT_EXCLUDE_DIRS + ['drafts', 'api']])
+def test_matches_baseline_without_ignore_files(project, exclude_dirs):
+    write(project, '.gitignore', 'docs/\n')
+    expected = baseline_find_markdown_files(project, exclude_dirs)
+    assert expected
+    assert find_markdown_files(project, exclude_dirs, use_ignore_files=False) == expected
+
+
+def test_ignore_files_prune_directories(project):
+    write(project, '.gitignore', 'tmp/*\n!tmp/keep.md\n/generated/\n**/drafts/wip.md\n')
+    write(project, 'docs/.gitignore', 'api/\n')
+    write(project, '.auditignore', 'vendor\n')
+    found = {Path(path).relative_to(project).as_posix() for path in find_markdown_files(project)}
+    assert found == {
+        'README.md', 'docs/guide.md', 'docs/build.md', 'venv2/ok.md', 'tmp/keep.md', 'docs/drafts/final.md'
+    }
+
+
+@pytest.mark.parametrize('pattern, rel_path, is_dir, expected', [
+    ('*.md', 'a/b.md', False, True),
+    ('/b.md', 'a/b.md', False, False),
+    ('a/*.md', 'a/b.md', False, True),
+    ('a/*.md', 'a/c/b.md', False, False),
+    ('a/**/b.md', 'a/c/d/b.md', False, True),
+    ('a/**', 'a/c/b.md', False, True),
+    ('out/', 'out', False, False),
+    ('out/', 'out', True, True),
+    ('b?.md', 'x/b1.md', False, True),
+    ('b[!0-9].md', 'b1.md', False, False),
+])
+def test_ignore_rule_semantics(tmp_path, pattern, rel_path, is_dir, expected):
+    ignore_file = write(tmp_path, '.gitignore', pattern + '\n')
+    assert is_ignored(load_ignore_rules(ignore_file, ''), rel_path, is_dir) == expected
+
+
+def test_nested_rules_only_apply_below_their_directory(tmp_path):
+    ignore_file = write(tmp_path, 'docs/.gitignore', 'private.md\n')
+    rules = load_ignore_rules(ignore_file, 'docs')
+    assert is_ignored(rules, 'docs/sub/private.md', False)
+    assert not is_ignored(rules, 'private.md', False)
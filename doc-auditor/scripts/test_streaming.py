@@ -0,0 +1,113 @@
+"""
+NDJSON 流式输入输出的测试：记录读写往返一致，管道各环节的 NDJSON 输出与 JSON 输出内容相同
+"""
+import io
+import sys
+import json
+import subprocess
+from pathlib import Path
+import pytest
+from conftest import write
+from streaming import iter_paths, iter_records, wants_stdin, write_record
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+DOCS = {
+    'README.md': '# 项目\n\n见 `src/app.py` 和 `src/gone.py`。\n',
+    'docs/guide.md': '# Guide\n\n```python\ndef run(x):\n    pass\n```\n\nUse `Engine` and `Missing` classes.\n',
+    'docs/api.md': '# API\n\nGET /api/items\n\nCall `helper()` then `vanished()`.\n',
+    'docs/ok.md': '# Nothing to check\n',
+}
+
+
+@pytest.fixture
+def project(tmp_path):
+    for rel_path, content in DOCS.items():
+        write(tmp_path, rel_path, content)
+    write(tmp_path, 'src/app.py', "class Engine:\n    pass\n\ndef helper():\n    pass\n\n@app.get('/api/items')\ndef items():\n    pass\n")
+    return tmp_path
+
+
+def run_script(root, script, *args, stdin=None):
+    result = subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / script), *args],
+        cwd=root, input=stdin, capture_output=True, text=True, check=True
+    )
+    return result.stdout
+
+
+def test_records_round_trip():
+    records = [{'path': 'docs/说明.md'}, {'path': 'a b.md', 'issues': [{'reference': 'x\ny'}]}, {}]
+    stream = io.StringIO()
+    for record in records:
+        write_record(record, stream)
+    lines = stream.getvalue().split('\n')
+    assert len(lines) == len(records) + 1 and lines[-1] == ''
+    assert '说明' in lines[0]
+    assert list(iter_records(io.StringIO('\n' + stream.getvalue() + '\n  \n'))) == records
+
+
+def test_iter_paths_accepts_plain_and_json_lines():
+    stream = io.StringIO('docs/a.md\n\n{"path": "docs/b.md", "status": "current"}\n  docs/c.md  \n{"other": 1}\n')
+    assert list(iter_paths(stream)) == ['docs/a.md', 'docs/b.md', 'docs/c.md']
+
+
+@pytest.mark.parametrize('paths, expected', [([], True), (['-'], True), (['a.md'], False), (['-', 'a.md'], False)])
+def test_wants_stdin(paths, expected):
+    assert wants_stdin(paths) == expected
+
+
+def test_scan_ndjson_matches_json(project):
+    scanned = json.loads(run_script(project, 'scan_docs.py', '.'))
+    streamed = [record['path'] for record in iter_records(io.StringIO(run_script(project, 'scan_docs.py', '.', '--format', 'ndjson')))]
+    assert streamed == scanned['files']
+    assert len(streamed) == len(DOCS)
+
+
+def test_audit_pipeline_matches_single_document_audits(project):
+    paths = run_script(project, 'scan_docs.py', '.', '--format', 'ndjson')
+    streamed = list(iter_records(io.StringIO(run_script(project, 'audit_document.py', '--format', 'ndjson', stdin=paths))))
+    batched = json.loads(run_script(project, 'audit_document.py', stdin=paths))['documents']
+    assert streamed == batched
+
+    # 每条记录与单独审计该文档（原来唯一的用法）的结果相同，只多了 path 字段
+    for record in streamed:
+        single = json.loads(run_script(project, 'audit_document.py', record['path']))
+        assert {k: v for k, v in record.items() if k != 'path'} == single
+    assert {record['status'] for record in streamed} == {'current', 'outdated'}
+
+
+def test_context_audit_ndjson_matches_json(project):
+    paths = run_script(project, 'scan_docs.py', '.', '--format', 'ndjson')
+    streamed = list(iter_records(io.StringIO(
+        run_script(project, 'audit_with_context.py', '--no-blame', '--format', 'ndjson', stdin=paths)
+    )))
+    output = project / 'result.json'
+    run_script(project, 'audit_with_context.py', '--no-blame', '-o', str(output), stdin=paths)
+    assert streamed == json.loads(output.read_text(encoding='utf-8'))['documents']
+
+
+def test_process_docs_reads_ndjson_like_manifest(project):
+    paths = run_script(project, 'scan_docs.py', '.', '--format', 'ndjson')
+    records = run_script(project, 'audit_document.py', '--format', 'ndjson', stdin=paths)
+    manifest = project / 'manifest.json'
+    manifest.write_text(json.dumps({'documents': list(iter_records(io.StringIO(records)))}), encoding='utf-8')
+    from_stdin = run_script(project, 'process_docs.py', '-', '--dry-run', '--workers', '1', stdin=records)
+    from_manifest = run_script(project, 'process_docs.py', str(manifest), '--dry-run', '--workers', '1')
+    assert from_stdin == from_manifest
+
+
+def test_closed_pipe_exits_quietly(tmp_path):
+    for i in range(3000):
+        write(tmp_path, f'docs/doc_{i:04d}.md', '# Doc\n')
+    process = subprocess.Popen(
+        [sys.executable, str(SCRIPTS_DIR / 'scan_docs.py'), '.', '--format', 'ndjson', '--no-ignore'],
+        cwd=tmp_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    # 相当于 | head -1：读到第一行就关闭管道
+    assert json.loads(process.stdout.readline())['path'].endswith('.md')
+    process.stdout.close()
+    assert process.wait(timeout=60) == 1
+    assert process.stderr.read() == b''
+    process.stderr.close()
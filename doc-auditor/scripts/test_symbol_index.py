@@ -0,0 +1,123 @@
+"""
+符号索引的测试：查询结果与改动之前逐个文件搜索的实现一致，文件增删改时索引失效
+"""
+import os
+import re
+import json
+from conftest import baseline_search, write
+from audit_document import DocumentAuditor
+from changed_since import _definitions
+from code_scan import SKIP_BINARY, SKIP_TOO_LARGE
+from symbol_index import INDEX_VERSION, SymbolIndex
+
+
+CODE = {
+    'app/service.py': 'class Service(Base):\n    def handle(self, request):\n        pass\n\ndef  spaced (x):\n    pass\n',
+    'app/models.py': 'class Model:\n    pass\nclass Mixin(object): pass\nundef_thing = 1\nxdef hidden():\n',
+    'web/render.js': 'function render(props) {}\nconst f = function () {}\nclass Widget extends Base {}\n',
+    'web/types.ts': 'export function typed<T>(x: T) {}\nfunction  call (a) {}\n',
+    'lib/util.go': 'func helper() {}\n// def commented(x):\n',
+    'notes.txt': 'def not_code():\n',
+    'empty.py': '',
+}
+
+
+def candidate_names(root):
+    names = set()
+    for path in root.rglob('*'):
+        if path.is_file():
+            names.update(re.findall(r'\w+', path.read_text(encoding='utf-8')))
+    return sorted(names)
+
+
+def test_lookups_match_baseline_search(project):
+    index = SymbolIndex.build(project, persist=False)
+    for name in candidate_names(project):
+        function_pattern = rf'\bdef\s+{name}\s*\(|\bfunction\s+{name}\s*\('
+        class_pattern = rf'\bclass\s+{name}\s*[:\(]'
+        assert index.has_function(name) == bool(baseline_search(project, function_pattern)), name
+        assert index.has_class(name) == bool(baseline_search(project, class_pattern)), name
+        assert index.find_function(name) == sorted(
+            os.path.relpath(path, project) for path in baseline_search(project, function_pattern)
+        ), name
+
+
+def test_persisted_index_reparses_only_changed_files(project):
+    index = SymbolIndex.build(project)
+    assert index.stats['parsed'] == len([p for p in CODE if not p.endswith('.txt')])
+    assert (project / '.doc-auditor' / 'symbol_index.json').exists()
+
+    index = SymbolIndex.build(project)
+    assert (index.stats['parsed'], index.stats['removed']) == (0, 0)
+    assert index.has_class('Service')
+
+    stat = os.stat(project / 'app/service.py')
+    write(project, 'app/service.py', 'class Renamed(Base):\n    pass\n', mtime_ns=stat.st_mtime_ns + 10 ** 9)
+    os.remove(project / 'web/render.js')
+    write(project, 'app/new.py', 'def added():\n    pass\n')
+    index = SymbolIndex.build(project)
+    assert (index.stats['parsed'], index.stats['removed']) == (2, 1)
+    assert not index.has_class('Service') and index.has_class('Renamed')
+    assert not index.has_function('spaced')
+    assert not index.has_function('render') and index.has_function('added')
+
+
+def test_same_size_edit_with_new_mtime_is_reparsed(project):
+    SymbolIndex.build(project)
+    stat = os.stat(project / 'app/models.py')
+    content = CODE['app/models.py'].replace('Model', 'Other')
+    write(project, 'app/models.py', content, mtime_ns=stat.st_mtime_ns + 10 ** 9)
+    index = SymbolIndex.build(project)
+    assert index.stats['parsed'] == 1
+    assert index.has_class('Other') and not index.has_class('Model')
+
+
+def test_version_mismatch_rebuilds(project):
+    index = SymbolIndex.build(project)
+    data = json.loads(index.index_path.read_text(encoding='utf-8'))
+    assert data['version'] == INDEX_VERSION
+    data['version'] = -1
+    index.index_path.write_text(json.dumps(data), encoding='utf-8')
+    assert SymbolIndex.build(project).stats['reused'] == 0
+
+
+def test_update_files_reports_changed_symbols_and_routes(project):
+    index = SymbolIndex.build(project, persist=False)
+    write(project, 'app/service.py', "class Service(Base):\n    pass\n\n@app.get('/health')\ndef health():\n    pass\n")
+    os.remove(project / 'app/models.py')
+    changed, changed_routes = index.update_files(['app/service.py', 'app/models.py', 'notes.txt'])
+    assert changed == {'handle', 'spaced', 'health', 'Model', 'Mixin'}
+    assert changed_routes == {('GET', '/health')}
+    assert index.has_route('GET', '/health')
+    assert not index.has_class('Model')
+    assert index.files == SymbolIndex.build(project, persist=False).files
+
+
+def test_binary_and_large_files_are_skipped(project):
+    write(project, 'bundle.min.js', 'function bundled() {}\n' + 'x' * 200)
+    write(project, 'blob.py', b'def in_binary():\0\n')
+    index = SymbolIndex.build(project, persist=False, max_file_size=100)
+    assert not index.has_function('bundled') and not index.has_function('in_binary')
+    assert {(item['path'], item['reason']) for item in index.skipped_files()} == {
+        ('bundle.min.js', SKIP_TOO_LARGE), ('blob.py', SKIP_BINARY)
+    }
+
+    # 上限提高后，之前因为太大而跳过的文件会被重新解析
+    index.max_file_size = 10 ** 6
+    index.refresh()
+    assert index.has_function('bundled')
+
+
+def test_non_ascii_identifiers(tmp_path):
+    write(tmp_path, 'src/calc.py', 'def 计算(x):\n    return x\n\nclass Café:\n    pass\n')
+    write(tmp_path, 'src/latin1.py', 'def legacy():\n    pass\n'.encode('utf-8') + b'# \xe9\n')
+    doc = write(tmp_path, 'docs/guide.md', '# Guide\n\n```python\ndef 计算(x):\n    pass\nclass Café:\n    pass\n```\n')
+    index = SymbolIndex.build(tmp_path, persist=False)
+    assert index.has_function('计算') and index.has_class('Café')
+    assert index.has_function('计算') == bool(baseline_search(tmp_path, r'\bdef\s+计算\s*\('))
+    # 不是 UTF-8 的文件与原实现一样不提取符号
+    assert not index.has_function('legacy') and not baseline_search(tmp_path, r'\bdef\s+legacy\s*\(')
+    assert _definitions('def 计算(x):\n'.encode('utf-8'))[0] == {'计算'}
+
+    result = DocumentAuditor(tmp_path, symbol_index=index).audit_document(doc)
+    assert result['status'] == 'current', result['issues']
@@ -0,0 +1,152 @@
+"""
+监视模式的增量审计测试
+"""
+import os
+import shutil
+from types import SimpleNamespace
+from conftest import write
+from watch_docs import DocWatcher, _EventCollector
+
+
+def issue_types(watcher, doc_path):
+    return [issue['type'] for issue in watcher.documents[doc_path].get('issues', [])]
+
+
+def start_watcher(tmp_path):
+    watcher = DocWatcher(tmp_path, tmp_path / '.doc-auditor' / 'manifest.json')
+    watcher.start()
+    return watcher
+
+
+def test_route_only_change_reaudits_endpoint_docs(tmp_path):
+    write(tmp_path, 'app.py', "@app.get('/users')\ndef list_users():\n    pass\n")
+    api_doc = str(write(tmp_path, 'docs/api.md', '# API\n\n调用 POST /nothing/here 创建记录。\n'))
+    other_doc = str(write(tmp_path, 'docs/other.md', '# Other\n\n与路由无关。\n'))
+    watcher = start_watcher(tmp_path)
+    assert 'missing_endpoint' in issue_types(watcher, api_doc)
+
+    # 只新增路由，函数/类不变
+    write(tmp_path, 'app.py', "@app.get('/users')\n@app.post('/nothing/here')\ndef list_users():\n    pass\n")
+    impacted = watcher.apply_changes(set(), set(), {'app.py'})
+    assert impacted == [api_doc]
+    assert 'missing_endpoint' not in issue_types(watcher, api_doc)
+
+    # 删除路由后重新出现 missing_endpoint
+    write(tmp_path, 'app.py', "@app.get('/users')\ndef list_users():\n    pass\n")
+    impacted = watcher.apply_changes(set(), set(), {'app.py'})
+    assert impacted == [api_doc]
+    assert 'missing_endpoint' in issue_types(watcher, api_doc)
+    assert other_doc not in impacted
+
+
+def test_route_change_matches_parameter_templates(tmp_path):
+    write(tmp_path, 'app.py', "@app.get('/health')\ndef health():\n    pass\n")
+    doc = str(write(tmp_path, 'README.md', '# API\n\nGET /users/{id} 返回用户。\n'))
+    watcher = start_watcher(tmp_path)
+    assert 'missing_endpoint' in issue_types(watcher, doc)
+
+    write(tmp_path, 'routes.py', "@bp.route('/users/<int:user_id>')\ndef show():\n    pass\n")
+    impacted = watcher.apply_changes({'routes.py'}, set(), set())
+    assert impacted == [doc]
+    assert 'missing_endpoint' not in issue_types(watcher, doc)
+
+
+def test_first_route_reaudits_all_endpoint_docs(tmp_path):
+    # 代码库中没有路由时不检查端点，出现第一个路由后引用端点的文档都要重新审计
+    write(tmp_path, 'main.py', 'def main():\n    pass\n')
+    doc = str(write(tmp_path, 'docs/api.md', '# API\n\nDELETE /items/{id} 删除条目。\n'))
+    watcher = start_watcher(tmp_path)
+    assert 'missing_endpoint' not in issue_types(watcher, doc)
+
+    write(tmp_path, 'app.py', "@app.get('/health')\ndef health():\n    pass\n")
+    impacted = watcher.apply_changes({'app.py'}, set(), set())
+    assert impacted == [doc]
+    assert 'missing_endpoint' in issue_types(watcher, doc)
+
+    os.remove(tmp_path / 'app.py')
+    impacted = watcher.apply_changes(set(), {'app.py'}, set())
+    assert impacted == [doc]
+    assert 'missing_endpoint' not in issue_types(watcher, doc)
+
+
+def polling_watcher(tmp_path, **kwargs):
+    watcher = DocWatcher(tmp_path, tmp_path / '.doc-auditor' / 'manifest.json', use_events=False, **kwargs)
+    watcher.start()
+    # 启动时写入 .doc-auditor/ 会改变根目录的 mtime
+    watcher.poll()
+    read = []
+    original = watcher.read_dir
+    watcher.read_dir = lambda rel_dir: read.append(rel_dir) or original(rel_dir)
+    return watcher, read
+
+
+def test_poll_rereads_only_changed_directories(tmp_path):
+    write(tmp_path, 'src/app.py', 'def main():\n    pass\n')
+    write(tmp_path, 'src/notes.txt', 'a')
+    write(tmp_path, 'lib/util.py', 'def util():\n    pass\n')
+    write(tmp_path, 'README.md', '# Readme\n')
+    watcher, read = polling_watcher(tmp_path)
+    assert watcher.poll() == (set(), set(), set())
+    assert read == []
+
+    # 内容修改不改变目录 mtime，只 stat 代码和文档文件即可发现
+    write(tmp_path, 'src/app.py', 'def main():\n    return 1\n')
+    write(tmp_path, 'src/notes.txt', 'changed')
+    assert watcher.poll() == (set(), set(), {'src/app.py'})
+    assert read == []
+
+    write(tmp_path, 'lib/extra.py', '')
+    os.remove(tmp_path / 'src/notes.txt')
+    assert watcher.poll() == ({'lib/extra.py'}, {'src/notes.txt'}, set())
+    assert sorted(read) == ['lib', 'src']
+
+
+def test_poll_tracks_new_and_removed_directories(tmp_path):
+    write(tmp_path, 'old/pkg/a.py', '')
+    write(tmp_path, 'old/b.md', '# B\n')
+    watcher, _ = polling_watcher(tmp_path)
+
+    write(tmp_path, 'new/deep/c.py', '')
+    write(tmp_path, 'node_modules/dep/index.js', '')
+    assert watcher.poll() == ({'new/deep/c.py'}, set(), set())
+
+    shutil.rmtree(tmp_path / 'old')
+    assert watcher.poll() == (set(), {'old/pkg/a.py', 'old/b.md'}, set())
+    assert 'old/pkg' not in watcher.tree
+
+    # 子目录已经删除后再修改新目录中的文件
+    write(tmp_path, 'new/deep/c.py', 'x = 1\n')
+    assert watcher.poll() == (set(), set(), {'new/deep/c.py'})
+
+
+def test_full_scan_catches_missed_directory_changes(tmp_path):
+    write(tmp_path, 'src/app.py', '')
+    watcher, _ = polling_watcher(tmp_path, full_scan_interval=3600)
+    src_mtime = os.stat(tmp_path / 'src').st_mtime_ns
+
+    # 模拟 mtime 精度不足：目录 mtime 在新增文件后没有变化
+    write(tmp_path, 'src/late.py', '')
+    os.utime(tmp_path / 'src', ns=(src_mtime, src_mtime))
+    assert watcher.poll() == (set(), set(), set())
+
+    watcher.full_scan_interval = 0
+    assert watcher.poll() == ({'src/late.py'}, set(), set())
+
+
+def test_events_limit_poll_to_reported_paths(tmp_path):
+    write(tmp_path, 'src/app.py', '')
+    write(tmp_path, 'lib/util.py', '')
+    watcher, read = polling_watcher(tmp_path)
+    watcher.events = _EventCollector()
+
+    write(tmp_path, 'src/app.py', 'def main():\n    pass\n')
+    write(tmp_path, 'lib/util.py', 'def util():\n    pass\n')
+    write(tmp_path, 'src/new/mod.py', '')
+    for event_type, path in [('modified', 'src/app.py'), ('opened', 'lib/util.py'),
+                             ('created', 'src/new'), ('modified', '.doc-auditor/manifest.json')]:
+        watcher.events.dispatch(SimpleNamespace(event_type=event_type, src_path=str(tmp_path / path)))
+
+    # lib/util.py 只有 opened 事件，不检查
+    assert watcher.poll() == ({'src/new/mod.py'}, set(), {'src/app.py'})
+    assert sorted(read) == ['src', 'src/new']
+    assert watcher.poll() == (set(), set(), set())
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+监视模式：代码变化时只重新审计受影响的文档
+维护 代码路径/符号/API 端点 -> 引用它的文档 的反向映射，监听（或轮询）文件变化并合并短时间内的连续修改，
+只重新审计受影响的文档，并原地更新磁盘上的审计清单
+"""
+import os
+import sys
+import json
+import time
+import threading
+import argparse
+from pathlib import Path
+from audit_document import DocumentAuditor
+from audit_project import build_manifest
+from scan_docs import find_markdown_files, DEFAULT_EXCLUDE_DIRS
+from symbol_index import SymbolIndex, INDEX_DIR, CODE_EXTENSIONS
+from path_snapshot import PathSnapshot
+from reference_graph import ReferenceGraph
+
+try:
+    from watchdog.observers import Observer
+except ImportError:  # 未安装 watchdog 时退回轮询
+    Observer = None
+
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_FULL_SCAN_INTERVAL = 60.0
+# 内容会影响审计结果的文件；其他文件只关心是否存在
+WATCHED_EXTENSIONS = CODE_EXTENSIONS + ('.md',)
+
+
+class _EventCollector:
+    """watchdog 事件处理器：只记录发生变化的绝对路径，由 DocWatcher.poll 统一处理"""
+
+    IGNORED_EVENTS = {'opened', 'closed_no_write'}
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.paths = set()
+
+    def dispatch(self, event):
+        if event.event_type in self.IGNORED_EVENTS:
+            return
+        with self.lock:
+            for path in (event.src_path, getattr(event, 'dest_path', '')):
+                if path:
+                    self.paths.add(os.fsdecode(path))
+
+    def drain(self):
+        with self.lock:
+            paths, self.paths = self.paths, set()
+        return paths
+
+
+class DocWatcher:
+    def __init__(self, project_root, manifest_path, exclude_dirs=None,
+                 interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE,
+                 full_scan_interval=DEFAULT_FULL_SCAN_INTERVAL, use_events=True):
+        self.project_root = Path(project_root)
+        self.root = os.path.abspath(project_root)
+        self.manifest_path = Path(manifest_path)
+        self.exclude_dirs = set(exclude_dirs if exclude_dirs is not None else DEFAULT_EXCLUDE_DIRS)
+        self.exclude_dirs.add(INDEX_DIR)
+        self.interval = interval
+        self.debounce = debounce
+        self.full_scan_interval = full_scan_interval
+        self.use_events = use_events and Observer is not None
+
+        self.tree = {}           # 相对目录 -> (mtime_ns, 文件名集合, 子目录名集合)
+        self.stats = {}          # WATCHED_EXTENSIONS 文件的相对路径 -> (mtime_ns, size)
+        self.last_full_scan = 0.0
+        self.events = None       # 使用 watchdog 时的 _EventCollector
+        self.observer = None
+        self.documents = {}      # 文档路径 -> 审计结果记录
+
+        self.graph = None        # 文档引用图（路径/符号 -> 文档）
+        self.path_snapshot = None
+        self.symbol_index = None
+        self.auditor = None
+
+    @staticmethod
+    def _join(rel_dir, name):
+        return rel_dir + '/' + name if rel_dir else name
+
+    def read_dir(self, rel_dir):
+        """读取一个目录，返回 (mtime_ns, 文件名集合, 子目录名集合)，目录不存在时返回 None"""
+        dir_path = self._doc_path(rel_dir)
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            return None
+        names, subdirs = set(), set()
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in self.exclude_dirs:
+                        subdirs.add(entry.name)
+                    continue
+            except OSError:
+                continue
+            names.add(entry.name)
+        return mtime_ns, names, subdirs
+
+    def _drop_dir(self, rel_dir):
+        """目录消失：移除整棵子树，返回其中的文件"""
+        removed = set()
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            entry = self.tree.pop(current, None)
+            if entry is None:
+                continue
+            removed |= {self._join(current, name) for name in entry[1]}
+            stack.extend(self._join(current, name) for name in entry[2])
+        return removed
+
+    def rescan_dirs(self, rel_dirs):
+        """
+        重新读取给定目录的文件列表（新出现的子目录整棵读取），
+        返回 (新增文件, 删除文件) 的相对路径集合
+        """
+        added, removed = set(), set()
+        stack = list(rel_dirs)
+        while stack:
+            rel_dir = stack.pop()
+            entry = self.read_dir(rel_dir)
+            if entry is None:
+                removed |= self._drop_dir(rel_dir)
+                continue
+            _, old_names, old_subdirs = self.tree.get(rel_dir, (None, set(), set()))
+            _, names, subdirs = self.tree[rel_dir] = entry
+            added |= {self._join(rel_dir, name) for name in names - old_names}
+            removed |= {self._join(rel_dir, name) for name in old_names - names}
+            for name in old_subdirs - subdirs:
+                removed |= self._drop_dir(self._join(rel_dir, name))
+            for name in subdirs:
+                child = self._join(rel_dir, name)
+                if child not in self.tree:
+                    stack.append(child)
+
+        for rel_path in removed:
+            self.stats.pop(rel_path, None)
+        for rel_path in added:
+            self._stat(rel_path)
+        return added, removed
+
+    def _stat(self, rel_path):
+        """刷新 WATCHED_EXTENSIONS 文件的 (mtime_ns, size)，返回是否发生变化"""
+        if not rel_path.endswith(WATCHED_EXTENSIONS):
+            return False
+        try:
+            st = os.stat(self._doc_path(rel_path))
+        except OSError:
+            return self.stats.pop(rel_path, None) is not None
+        stat = (st.st_mtime_ns, st.st_size)
+        old, self.stats[rel_path] = self.stats.get(rel_path), stat
+        return old != stat
+
+    def start(self):
+        """首次全量审计并建立反向映射"""
+        self.tree, self.stats = {}, {}
+        self.rescan_dirs([''])
+        self.last_full_scan = time.monotonic()
+        if self.use_events:
+            self.events = _EventCollector()
+            self.observer = Observer()
+            self.observer.schedule(self.events, self.root, recursive=True)
+            self.observer.start()
+        self.path_snapshot = PathSnapshot.build(self.project_root)
+        self.symbol_index = SymbolIndex.build(self.project_root, snapshot=self.path_snapshot)
+        self.auditor = DocumentAuditor(
+            self.project_root, symbol_index=self.symbol_index, path_snapshot=self.path_snapshot
+        )
+
+        doc_paths = find_markdown_files(self.root, self.exclude_dirs)
+        self.graph = ReferenceGraph.build(self.project_root, doc_paths)
+        self.audit_docs(doc_paths)
+        self.save_manifest()
+        return len(doc_paths)
+
+    def _doc_path(self, rel_path):
+        return os.path.join(self.root, rel_path)
+
+    def audit_docs(self, doc_paths):
+        for doc_path in doc_paths:
+            if not os.path.exists(doc_path):
+                self.documents.pop(doc_path, None)
+                continue
+            self.documents[doc_path] = {'path': doc_path, **self.auditor.audit_document(doc_path)}
+
+    def changed_dirs(self):
+        """mtime 变化（或已消失）的已知目录：目录中有文件新增、删除或重命名"""
+        changed = []
+        for rel_dir, (mtime_ns, _, _) in self.tree.items():
+            try:
+                if os.stat(self._doc_path(rel_dir)).st_mtime_ns != mtime_ns:
+                    changed.append(rel_dir)
+            except OSError:
+                changed.append(rel_dir)
+        return changed
+
+    def poll(self):
+        """
+        与上次记录比较，返回 (新增, 删除, 修改) 的相对路径集合
+        使用 watchdog 时只检查事件涉及的路径；轮询时只重新读取 mtime 变化的目录，
+        并只 stat 内容会影响审计的文件；每隔 full_scan_interval 秒重新读取所有目录，
+        兜住 mtime 精度不足等漏掉的变化
+        """
+        full_scan = time.monotonic() - self.last_full_scan >= self.full_scan_interval
+        if full_scan:
+            self.last_full_scan = time.monotonic()
+            dirs, candidates = list(self.tree), None
+        elif self.events is not None:
+            dirs, candidates = set(), set()
+            for path in self.events.drain():
+                rel_path = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if rel_path == '.' or rel_path.startswith('../') or \
+                        any(part in self.exclude_dirs for part in rel_path.split('/')):
+                    continue
+                # 事件路径可能是文件也可能是目录：重新读取其所在目录，已知目录本身也重新读取
+                dirs.add(rel_path.rpartition('/')[0])
+                if rel_path in self.tree:
+                    dirs.add(rel_path)
+                candidates.add(rel_path)
+        else:
+            dirs, candidates = self.changed_dirs(), None
+
+        added, removed = self.rescan_dirs(dirs)
+        if candidates is None:
+            candidates = set(self.stats)
+        modified = set()
+        for rel_path in candidates - added - removed:
+            if rel_path in self.stats and self._stat(rel_path):
+                if rel_path in self.stats:
+                    modified.add(rel_path)
+                else:
+                    # 文件消失但所在目录的 mtime 没有变化
+                    removed.add(rel_path)
+                    parent, _, name = rel_path.rpartition('/')
+                    if parent in self.tree:
+                        self.tree[parent][1].discard(name)
+        return added, removed, modified
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def wait_for_changes(self):
+        """阻塞直到有文件变化，并在变化停止 debounce 秒后返回合并的变化"""
+        added, removed, modified = set(), set(), set()
+        while not (added or removed or modified):
+            time.sleep(self.interval)
+            added, removed, modified = (set(s) for s in self.poll())
+
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < self.debounce:
+            time.sleep(min(self.interval, self.debounce))
+            new_added, new_removed, new_modified = self.poll()
+            if new_added or new_removed or new_modified:
+                quiet_since = time.monotonic()
+                # 先新增后删除的文件视为没有出现过，先删除后新增的视为修改
+                added = (added | new_added) - new_removed
+                modified = (modified | new_modified | (removed & new_added)) - new_removed
+                removed = (removed | new_removed) - new_added
+        return added, removed, modified
+
+    def apply_changes(self, added, removed, modified):
+        """更新快照和符号索引，重新审计受影响的文档，返回被重新审计的文档"""
+        for rel_path in added:
+            self.path_snapshot.add_file(rel_path)
+        for rel_path in removed:
+            self.path_snapshot.remove_file(rel_path)
+
+        had_routes = bool(len(self.symbol_index.routes))
+        changed_symbols, changed_routes = self.symbol_index.update_files(added | removed | modified)
+        self.symbol_index.save()
+
+        impacted = set()
+        # 文件出现或消失会影响路径引用，内容修改只影响符号和路由
+        for rel_path in added | removed:
+            impacted |= self.graph.docs_for_path(rel_path)
+        for name in changed_symbols:
+            impacted |= self.graph.docs_for_symbol(name)
+        if had_routes != bool(len(self.symbol_index.routes)):
+            # 代码库中没有路由时不检查端点，路由从无到有或全部消失会影响所有引用端点的文档
+            impacted |= self.graph.docs_with_routes()
+        else:
+            impacted |= self.graph.docs_for_routes(changed_routes)
+
+        changed_docs = {p for p in added | removed | modified if p.endswith('.md')}
+        new_docs = set()
+        if changed_docs & added:
+            # 新增文档需要重新套用排除目录和忽略规则
+            known = {self.graph.relative(p) for p in find_markdown_files(self.root, self.exclude_dirs)}
+            new_docs = changed_docs & added & known
+        changed_docs = {p for p in changed_docs if p in self.graph.docs or p in new_docs}
+        for rel_path in changed_docs:
+            self.graph.update(rel_path)
+        impacted |= changed_docs
+        self.graph.save()
+
+        impacted = sorted(self._doc_path(p) for p in impacted)
+        self.audit_docs(impacted)
+        if impacted:
+            self.save_manifest()
+        return impacted
+
+    def save_manifest(self):
+        """原子替换磁盘上的清单"""
+        manifest = build_manifest([self.documents[p] for p in sorted(self.documents)])
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + '.tmp')
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        return manifest
+
+    def run(self):
+        while True:
+            added, removed, modified = self.wait_for_changes()
+            previous = {p: record.get('action', 'keep') for p, record in self.documents.items()}
+            start = time.perf_counter()
+            impacted = self.apply_changes(added, removed, modified)
+            elapsed = time.perf_counter() - start
+            changed = len(added) + len(removed) + len(modified)
+            print(f"🔄 {changed} 个文件变化，重新审计 {len(impacted)} 个文档（{elapsed:.2f}s）")
+            # 只列出操作发生变化的文档
+            for doc_path in impacted:
+                record = self.documents.get(doc_path)
+                action = record.get('action', 'keep') if record else 'removed'
+                if previous.get(doc_path) != action:
+                    print(f"  {os.path.relpath(doc_path, self.root)}: {previous.get(doc_path, 'new')} -> {action}")
+            sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='监视代码变化，只重新审计受影响的文档')
+    parser.add_argument('directory', help='项目根目录', default='.', nargs='?')
+    parser.add_argument('--output', '-o', help='审计清单路径（默认: <项目根目录>/.doc-auditor/manifest.json）')
+    parser.add_argument('--exclude', '-e', help='要排除的目录（逗号分隔）', default='')
+    parser.add_argument('--interval', help=f'轮询间隔（秒，默认: {DEFAULT_INTERVAL}）',
+                        type=float, default=DEFAULT_INTERVAL)
+    parser.add_argument('--debounce', help=f'变化停止多久后开始审计（秒，默认: {DEFAULT_DEBOUNCE}）',
+                        type=float, default=DEFAULT_DEBOUNCE)
+    parser.add_argument('--full-scan-interval',
+                        help=f'每隔多久重新读取所有目录，兜住漏掉的变化（秒，默认: {DEFAULT_FULL_SCAN_INTERVAL}）',
+                        type=float, default=DEFAULT_FULL_SCAN_INTERVAL)
+    parser.add_argument('--poll', action='store_true', help='不使用 watchdog 文件系统事件，只轮询')
+
+    args = parser.parse_args()
+
+    exclude_dirs = list(DEFAULT_EXCLUDE_DIRS)
+    if args.exclude:
+        exclude_dirs.extend([d.strip() for d in args.exclude.split(',')])
+    manifest_path = args.output or os.path.join(args.directory, INDEX_DIR, 'manifest.json')
+
+    watcher = DocWatcher(args.directory, manifest_path, exclude_dirs, args.interval, args.debounce,
+                         args.full_scan_interval, use_events=not args.poll)
+    count = watcher.start()
+    print(f"✅ 已审计 {count} 个文档，清单: {manifest_path}")
+    mode = '文件系统事件' if watcher.observer is not None else f'轮询，间隔 {args.interval}s'
+    print(f"👀 正在监视文件变化（{mode}，Ctrl+C 退出）")
+    sys.stdout.flush()
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\n已停止监视")
+    finally:
+        watcher.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -7,11 +7,17 @@ to clean, readable markdown format with configurable detail levels.
 
 Usage:
     python export-conversation.py <jsonl-file> [output-file] [mode]
+    python export-conversation.py <jsonl-file> <output-file> [mode] --incremental | --follow
+    python export-conversation.py --bulk <projects-dir> [--output-dir DIR] [--mode MODE] [--workers N]
 
 Arguments:
     jsonl-file: Path to conversation .jsonl file
     output-file: Optional output path (default: conversation-export_YYYYMMDD.md)
     mode: Export mode - minimal, standard, or detailed (default: minimal)
+    --bulk: Export every session under a projects directory (e.g. ~/.claude/projects)
+            in parallel and write an index.md listing them
+    --incremental: Only append the messages added since the last export of the same output
+    --follow: Keep the output up to date while the session grows
 
 Modes:
     minimal: User and assistant messages only
@@ -19,38 +25,144 @@ Modes:
     detailed: Everything in standard + tool outputs and code diffs
 """
 
+import argparse
+import bisect
+import hashlib
 import json
+import os
+import re
 import sys
+import shutil
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+# A faster JSON decoder is used when one is installed; the stdlib is the fallback
+try:
+    import orjson
+    fast_loads = orjson.loads
+except ImportError:
+    try:
+        import msgspec
+        fast_loads = msgspec.json.Decoder().decode
+    except ImportError:
+        fast_loads = None
 
-def parse_jsonl(filepath):
-    """Parse JSONL conversation file and extract relevant messages."""
-    messages = []
 
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue
+# Output is written through a large buffer instead of being built in memory
+WRITE_BUFFER_SIZE = 1024 * 1024
 
-                try:
-                    obj = json.loads(line)
+# Sessions are read through a large buffer too: lines with big tool payloads are common
+READ_BUFFER_SIZE = 1024 * 1024
 
-                    # Extract user and assistant messages
-                    if obj.get('type') in ['user', 'assistant']:
-                        messages.append(obj)
+# A "type" key with the type of an exported record. A line without one can't be
+# an exported record and is skipped without being decoded
+EXPORTED_TYPE_PATTERN = re.compile(rb'"type"\s*:\s*"(?:user|assistant|file-history-snapshot)"')
+EXPORTED_TYPES = ('user', 'assistant', 'file-history-snapshot')
 
-                    # In detailed mode, also include file-history-snapshot
-                    if obj.get('type') == 'file-history-snapshot':
-                        # Only include if we're tracking tool results
-                        messages.append(obj)
+# A "uuid" key and its value, to spot the lines that may hold a message being looked up
+UUID_VALUE_PATTERN = re.compile(rb'"uuid"\s*:\s*"([^"\\]*)"')
+# Ids and uuids that appear verbatim in a JSONL line, so they can be searched for before decoding
+PLAIN_ID_PATTERN = re.compile(r'[\w.:-]+', re.ASCII)
 
-                except json.JSONDecodeError as e:
-                    print(f"Warning: Failed to parse line {line_num}: {e}", file=sys.stderr)
-                    continue
+# Markers for messages that don't just follow the one before them in the tree
+TREE_MARKERS = {
+    'branch': "*🔀 Alternative branch*\n",
+    'sidechain': "*🧵 Sidechain*\n",
+}
+
+# Parent uuids are first looked up among this many of the last messages with a uuid
+RECENT_UUIDS = 1024
+# How far before a message its parent is looked for among the records that aren't exported
+READ_BACK_SIZE = 64 * 1024
+
+# Version of the incremental export state (.<output-name>.state.json)
+STATE_VERSION = 4
+# Bytes at the start of a session hashed to tell an appended session from a rewritten one
+HEAD_HASH_SIZE = 64 * 1024
+
+
+def new_state(mode=None):
+    """Reader and renderer state of an export, persisted between incremental runs."""
+    return {
+        'mode': mode,
+        'offset': 0,    # bytes of the session consumed so far (always ends on a line boundary)
+        'lines': 0,     # lines consumed so far, for warning line numbers
+        'messages': 0,
+        'first_timestamp': None,
+        'last_timestamp': None,
+    }
+
+
+def read_messages(f, state):
+    """
+    Yield (offset, message) for the relevant messages in a binary JSONL file
+    object, from its current position; offset is where the message's line starts.
+
+    state['offset'] and state['lines'] advance past every consumed line. An
+    unterminated last line that doesn't parse is left unconsumed, since the
+    session may still be writing it.
+    """
+    search = EXPORTED_TYPE_PATTERN.search
+    for raw in f:
+        line = raw.strip()
+        obj = None
+        # An unterminated line may be incomplete, so it is never skipped unparsed
+        if line and (search(line) or not raw.endswith(b'\n')):
+            try:
+                obj = decode_line(line)
+            except ValueError as e:
+                if not raw.endswith(b'\n'):
+                    return
+                print(f"Warning: Failed to parse line {state['lines'] + 1}: {e}", file=sys.stderr)
+        offset = state['offset']
+        state['lines'] += 1
+        state['offset'] += len(raw)
+        if obj is None:
+            continue
+
+        # Extract user and assistant messages
+        if obj.get('type') in ['user', 'assistant']:
+            yield offset, obj
+
+        # In detailed mode, also include file-history-snapshot
+        if obj.get('type') == 'file-history-snapshot':
+            # Only include if we're tracking tool results
+            yield offset, obj
+
+
+def decode_line(line):
+    """Decode one JSONL line, with the fast decoder when there is one."""
+    if fast_loads is not None:
+        try:
+            return fast_loads(line)
+        except Exception:
+            # Fast decoders are stricter (e.g. integers over 64 bits, lone
+            # surrogates); let the stdlib decide, and report its error
+            pass
+    return json.loads(line)
+
+
+def iter_messages(filepath, state=None, with_offsets=False):
+    """
+    Stream relevant messages from a JSONL conversation file, one at a time.
+
+    With a state dict, reading starts at state['offset'] and the state keeps
+    track of how far the file has been consumed. With with_offsets, (offset,
+    message) pairs are yielded instead, for reading messages back by offset.
+    """
+    if state is None:
+        state = new_state()
+    try:
+        with open(filepath, 'rb', buffering=READ_BUFFER_SIZE) as f:
+            f.seek(state['offset'])
+            if with_offsets:
+                yield from read_messages(f, state)
+            else:
+                for _, msg in read_messages(f, state):
+                    yield msg
 
     except FileNotFoundError:
         print(f"Error: File not found: {filepath}", file=sys.stderr)
@@ -59,7 +171,10 @@ def parse_jsonl(filepath):
         print(f"Error: Failed to read file: {e}", file=sys.stderr)
         sys.exit(1)
 
-    return messages
+
+def parse_jsonl(filepath):
+    """Parse JSONL conversation file and extract relevant messages."""
+    return list(iter_messages(filepath))
 
 
 def extract_text_content(content_array):
@@ -103,6 +218,373 @@ def extract_tool_calls(content_array):
     return tool_calls
 
 
+class ConversationTree:
+    """
+    Conversation tree of a session, indexed in one pass and walked in another.
+
+    Almost every message hangs under the last message with a uuid before it
+    in the file, so only the messages that don't are recorded, with their
+    parent: roots, edited or retried messages, and the message a
+    conversation resumes with after a sidechain. A parent uuid is looked up
+    among the last RECENT_UUIDS messages and the records right before the
+    message; the rare ones found in neither are looked up in the whole
+    session once it has been indexed (see resolve). Tool calls are tracked
+    only until their result turns up. Memory grows with the number of
+    branches and unanswered tool calls, not with the length of the session.
+
+    Messages are identified by a key that grows in file order: the byte
+    offset of their line when exporting from the session file, the list
+    position in to_markdown. Uuids are taken to be unique, and a parent has
+    to come before its children: a parentUuid that doesn't name an earlier
+    message is treated like one naming a record that isn't exported.
+    """
+
+    def __init__(self, unexported_before=None):
+        # unexported_before(key, uuid): whether a record right before message key
+        # has that uuid and isn't exported
+        self.unexported_before = unexported_before
+        self.links = {}           # key -> parent key (None for a root), for messages not under the one before
+        self.sidechain_roots = set()
+        self.last_with_uuid = None
+        self.last_uuid = None
+        self.recent = OrderedDict()   # uuid -> key, for the last RECENT_UUIDS messages with a uuid
+        self.unresolved = []      # (key, parentUuid, fallback parent key) to look up in the whole session
+        self.pending_calls = {}   # tool_use id -> key of the named call still waiting for its result
+        self.superseded_calls = set()   # (key, id) of calls followed by another call with their id
+        self.unpaired_results = set()   # (key, id) of results with no call waiting for them
+        self.anchor = None        # see walk
+
+    def add(self, key, msg):
+        """Index a message (keys must grow); returns the key of its parent, None for a root."""
+        uuid = msg.get('uuid')
+        parent_uuid = msg.get('parentUuid')
+        # Records without a uuid and messages whose parent isn't exported (a
+        # system or progress record) stay where they are in the file: under
+        # the last message before them that has a uuid. Records without a
+        # uuid can't be anyone's parent, so they are always leaves
+        fallback = self.last_with_uuid
+        if not uuid:
+            parent = fallback
+        elif parent_uuid is None:
+            parent = None
+        elif parent_uuid == self.last_uuid:
+            parent = fallback
+        elif parent_uuid in self.recent:
+            parent = self.recent[parent_uuid]
+        else:
+            parent = fallback
+            if self.unexported_before is None or not self.unexported_before(key, parent_uuid):
+                self.unresolved.append((key, parent_uuid, fallback))
+
+        if parent is None or parent != fallback:
+            self.links[key] = parent
+            if parent is None and msg.get('isSidechain'):
+                self.sidechain_roots.add(key)
+        if uuid:
+            self.last_with_uuid = key
+            self.last_uuid = uuid
+            self.recent[uuid] = key
+            self.recent.move_to_end(uuid)
+            if len(self.recent) > RECENT_UUIDS:
+                self.recent.popitem(last=False)
+
+        content = msg.get('message', {}).get('content')
+        if isinstance(content, list):
+            for item in content:
+                if not isinstance(item, dict):
+                    continue
+                if item.get('type') == 'tool_use' and item.get('name'):
+                    call_id = item.get('id', '')
+                    if call_id in self.pending_calls:
+                        self.superseded_calls.add((self.pending_calls[call_id], call_id))
+                    self.pending_calls[call_id] = key
+                elif item.get('type') == 'tool_result':
+                    call_id = item.get('tool_use_id', '')
+                    if self.pending_calls.pop(call_id, None) is None:
+                        self.unpaired_results.add((key, call_id))
+        return parent
+
+    def resolve(self, find_uuids):
+        """
+        Look up the parents that weren't found while indexing; find_uuids(uuids)
+        returns {uuid: key of the first message with it} for those that exist.
+        """
+        if not self.unresolved:
+            return
+        found = find_uuids({parent_uuid for _, parent_uuid, _ in self.unresolved})
+        for key, parent_uuid, fallback in self.unresolved:
+            parent = found.get(parent_uuid)
+            if parent is not None and parent < key and parent != fallback:
+                self.links[key] = parent
+        self.unresolved = []
+
+    def parent(self, key, fallback):
+        """Parent of an indexed message, given the last message with a uuid before it."""
+        return self.links[key] if key in self.links else fallback
+
+    def answered(self, key, call_id):
+        """Whether the named call in message key has a result after it (in it at the earliest)."""
+        return self.pending_calls.get(call_id) != key and (key, call_id) not in self.superseded_calls
+
+    def walk(self, records, end):
+        """
+        Yield (key, msg, marker) depth-first, roots and siblings in file order.
+
+        records(start, stop) yields (key, msg) for the messages with
+        start <= key < stop, in file order; end is the stop of the last
+        message. Each stretch of messages that hang under the one before is
+        read in one go, then the branches off it, deepest first.
+
+        marker is 'branch' for a message that isn't its parent's first child
+        with a uuid (an edited or retried message), 'sidechain' for the root of
+        a sidechain, otherwise None.
+
+        Afterwards anchor is the message that later messages can be appended
+        under: the last rendered message with a uuid, as long as everything
+        rendered after it is a record without a uuid directly under it; None
+        when there is no such message.
+        """
+        starts = sorted(self.links)
+        roots = []
+        children = {}
+        for key in starts:
+            parent = self.links[key]
+            if parent is None:
+                roots.append(key)
+            else:
+                children.setdefault(parent, []).append(key)
+
+        self.anchor = None
+        stack = [(key, 'sidechain' if key in self.sidechain_roots else None) for key in reversed(roots)]
+        while stack:
+            start, marker = stack.pop()
+            index = bisect.bisect_right(starts, start)
+            stop = starts[index] if index < len(starts) else end
+            last_with_uuid = None
+            branch_points = []
+            for key, msg in records(start, stop):
+                yield key, msg, marker if key == start else None
+                uuid = msg.get('uuid')
+                if uuid:
+                    last_with_uuid = key
+                    self.anchor = key
+                    if key in children:
+                        branch_points.append(key)
+                elif self.anchor != last_with_uuid:
+                    self.anchor = None
+
+            # Push the shallowest branches first, so the deepest come off the stack first
+            for key in branch_points:
+                # The message after key in the stretch is its first child with a uuid
+                has_first_child = key != last_with_uuid
+                stack.extend(reversed([
+                    (child, 'branch' if has_first_child or i else None)
+                    for i, child in enumerate(children[key])
+                ]))
+
+
+class ToolResults:
+    """
+    The tool results of one message for render_message: whether a result is
+    rendered under its call instead, and the results of the message's calls,
+    looked up with find_results(key, msg, call_ids) -> {call id: content}.
+    """
+
+    def __init__(self, tree, key, msg, find_results):
+        self.tree = tree
+        self.key = key
+        self.msg = msg
+        self.find_results = find_results
+        self.results = None
+
+    def paired(self, tool_use_id):
+        """Whether the result is rendered under its call rather than in its own message."""
+        return (self.key, tool_use_id) not in self.tree.unpaired_results
+
+    def get(self, tool_use_id):
+        if self.results is None:
+            # The results of all the message's calls are looked up in one go
+            call_ids = {
+                call['id'] for call in extract_tool_calls(self.msg.get('message', {}).get('content', []))
+                if call.get('name') and self.tree.answered(self.key, call['id'])
+            }
+            self.results = self.find_results(self.key, self.msg, call_ids) if call_ids else {}
+        return self.results.get(tool_use_id)
+
+
+def first_results(messages, call_ids):
+    """{call id: content} of the first tool_result for each of call_ids in (key, msg) pairs, in order."""
+    results = {}
+    for _, msg in messages:
+        for call in extract_tool_calls(msg.get('message', {}).get('content', [])):
+            if call.get('type') == 'tool_result' and call['tool_use_id'] in call_ids \
+                    and call['tool_use_id'] not in results:
+                results[call['tool_use_id']] = call['content']
+        if len(results) == len(call_ids):
+            break
+    return results
+
+
+class MessageList:
+    """A list of messages as the session for ConversationTree.walk and ToolResults; keys are list positions."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.end = len(messages)
+
+    def records(self, start, stop):
+        for key in range(start, stop):
+            yield key, self.messages[key]
+
+    def find_uuids(self, uuids):
+        found = {}
+        for key, msg in enumerate(self.messages):
+            if msg.get('uuid') in uuids:
+                found.setdefault(msg['uuid'], key)
+        return found
+
+    def find_results(self, key, msg, call_ids):
+        return first_results(self.records(key, self.end), call_ids)
+
+
+class SessionFile:
+    """
+    An indexed session file read back for ConversationTree.walk and
+    ToolResults. Only the first end bytes are read: the session may keep
+    growing after it was indexed.
+    """
+
+    def __init__(self, path, end=None):
+        self.path = path
+        self.end = end
+        # Opened on first use: one handle reads the messages in order, the
+        # other looks up lines around them
+        self._reader = None
+        self._seeker = None
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = open(self.path, 'rb', buffering=READ_BUFFER_SIZE)
+        return self._reader
+
+    @property
+    def seeker(self):
+        if self._seeker is None:
+            self._seeker = open(self.path, 'rb')
+        return self._seeker
+
+    def close(self):
+        for f in (self._reader, self._seeker):
+            if f is not None:
+                f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def lines(self, f, start, stop):
+        """Yield (offset, line) for the lines between offsets start and stop."""
+        f.seek(start)
+        offset = start
+        for raw in f:
+            if offset >= stop:
+                return
+            yield offset, raw
+            offset += len(raw)
+
+    def decode_record(self, line):
+        """The exported record on a line, or None; parse errors were reported when indexing."""
+        try:
+            obj = decode_line(line.strip())
+        except ValueError:
+            return None
+        return obj if isinstance(obj, dict) and obj.get('type') in EXPORTED_TYPES else None
+
+    def records(self, start, stop):
+        search = EXPORTED_TYPE_PATTERN.search
+        for offset, raw in self.lines(self.reader, start, stop):
+            if search(raw):
+                msg = self.decode_record(raw)
+                if msg is not None:
+                    yield offset, msg
+
+    def unexported_before(self, offset, uuid):
+        """
+        Whether uuid belongs to a record that isn't exported on one of the
+        lines in the READ_BACK_SIZE bytes before the line at offset.
+        """
+        start = max(0, offset - READ_BACK_SIZE)
+        self.seeker.seek(start)
+        chunk = self.seeker.read(offset - start)
+        # Lines are looked at from the last one back: only those with the uuid
+        # as the value of a "uuid" key, unless it can't be spotted that way
+        needle = uuid.encode() if isinstance(uuid, str) and PLAIN_ID_PATTERN.fullmatch(uuid) else None
+        line_end = len(chunk) - 1   # the newline ending the line before
+        while line_end >= 0:
+            if needle is not None:
+                position = chunk.rfind(needle, 0, line_end)
+                if position < 0:
+                    break
+                line_end = chunk.find(b'\n', position)
+            line_start = chunk.rfind(b'\n', 0, line_end) + 1
+            if line_start == 0 and start:
+                # The first line may be cut off
+                break
+            line = chunk[line_start:line_end]
+            if needle is None or needle in UUID_VALUE_PATTERN.findall(line):
+                if needle is not None and not EXPORTED_TYPE_PATTERN.search(line):
+                    # Not an exported record, nor a copy of one: no need to decode it
+                    return True
+                try:
+                    obj = decode_line(line.strip())
+                except ValueError:
+                    obj = None
+                if isinstance(obj, dict) and obj.get('uuid') == uuid:
+                    return obj.get('type') not in EXPORTED_TYPES
+            line_end = line_start - 1
+        return False
+
+    def find_uuids(self, uuids):
+        # Only lines with one of the uuids as the value of a "uuid" key are
+        # decoded, unless a uuid can't be spotted that way
+        plain = all(PLAIN_ID_PATTERN.fullmatch(uuid) for uuid in uuids if isinstance(uuid, str))
+        wanted = {uuid.encode() for uuid in uuids if isinstance(uuid, str)}
+        search = EXPORTED_TYPE_PATTERN.search
+        found = {}
+        for offset, raw in self.lines(self.seeker, 0, self.end):
+            if not search(raw) or (plain and wanted.isdisjoint(UUID_VALUE_PATTERN.findall(raw))):
+                continue
+            msg = self.decode_record(raw)
+            if msg is not None and msg.get('uuid') in uuids:
+                found.setdefault(msg['uuid'], offset)
+        return found
+
+    def find_results(self, key, msg, call_ids):
+        # Results are looked up in the calling message first, then in the
+        # lines after it that mention one of the ids
+        results = first_results([(key, msg)], call_ids)
+        plain = all(PLAIN_ID_PATTERN.fullmatch(call_id) for call_id in call_ids)
+        wanted = [call_id.encode() for call_id in call_ids - results.keys()]
+        search = EXPORTED_TYPE_PATTERN.search
+        lines = self.lines(self.seeker, key, self.end)
+        next(lines, None)
+        for offset, raw in lines:
+            if not wanted:
+                break
+            if not search(raw) or (plain and not any(call_id in raw for call_id in wanted)):
+                continue
+            line_msg = self.decode_record(raw)
+            if line_msg is None:
+                continue
+            for call_id, content in first_results([(offset, line_msg)], call_ids - results.keys()).items():
+                results[call_id] = content
+                wanted.remove(call_id.encode())
+        return results
+
+
 def format_timestamp(timestamp_str):
     """Format ISO timestamp to readable format."""
     try:
@@ -155,134 +637,635 @@ def format_code_diff(content):
     return '\n'.join(formatted_lines)
 
 
-def to_markdown(messages, mode='minimal'):
-    """Convert messages to markdown format."""
+def render_header(mode, message_count, generated=None):
+    """Render the export header as a list of markdown chunks."""
+    if generated is None:
+        generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return [
+        "# Conversation Export\n",
+        f"**Generated**: {generated}",
+        f"**Mode**: {mode}",
+        f"**Messages**: {message_count}",
+        "\n---\n",
+    ]
+
+
+def render_message(msg, mode='minimal', tool_results=None):
+    """
+    Render one message as a list of markdown chunks (empty if it is skipped).
+
+    With tool_results (a ToolResults), each tool call is followed by its result
+    in detailed mode, and results rendered that way are left out of the
+    message that carries them.
+    """
     output = []
 
-    # Header
-    output.append("# Conversation Export\n")
-    output.append(f"**Generated**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    output.append(f"**Mode**: {mode}")
-    output.append(f"**Messages**: {len(messages)}")
-    output.append("\n---\n")
-
-    for msg in messages:
-        msg_type = msg.get('type', '')
-        timestamp = format_timestamp(msg.get('timestamp', ''))
-
-        # Handle file-history-snapshot differently
-        if msg_type == 'file-history-snapshot':
-            if mode == 'detailed':
-                output.append(f"## 📁 File Change - {timestamp}\n")
-                # Could include diff details here
-                output.append("*File history snapshot recorded*\n")
-            continue
+    msg_type = msg.get('type', '')
+    timestamp = format_timestamp(msg.get('timestamp', ''))
 
-        # Regular user/assistant messages
-        message = msg.get('message', {})
-        role = message.get('role', 'unknown').title()
-        content_array = message.get('content', [])
+    # Handle file-history-snapshot differently
+    if msg_type == 'file-history-snapshot':
+        if mode == 'detailed':
+            output.append(f"## 📁 File Change - {timestamp}\n")
+            # Could include diff details here
+            output.append("*File history snapshot recorded*\n")
+        return output
 
-        # Extract main text content
-        text_content = extract_text_content(content_array)
+    # Regular user/assistant messages
+    message = msg.get('message', {})
+    role = message.get('role', 'unknown').title()
+    content_array = message.get('content', [])
 
-        # Skip messages with no text content
-        if not text_content or not text_content.strip():
-            continue
+    # Extract main text content
+    text_content = extract_text_content(content_array)
+    has_text = bool(text_content and text_content.strip())
 
-        # Section header
-        emoji = "👤" if role.lower() == 'user' else "🤖"
-        output.append(f"## {emoji} {role} - {timestamp}\n")
+    # Tool calls (standard and detailed modes)
+    tool_calls = []
+    if mode in ['standard', 'detailed']:
+        for call in extract_tool_calls(content_array):
+            if call.get('type') == 'tool_result':
+                # Results are only shown in detailed mode, under their call when it has one
+                if mode != 'detailed' or not call.get('content'):
+                    continue
+                if tool_results is not None and tool_results.paired(call['tool_use_id']):
+                    continue
+            elif not call.get('name'):
+                continue
+            tool_calls.append(call)
 
-        # Main content
+    # Skip messages with neither text content nor tool calls to show
+    if not has_text and not tool_calls:
+        return output
+
+    # Section header
+    emoji = "👤" if role.lower() == 'user' else "🤖"
+    output.append(f"## {emoji} {role} - {timestamp}\n")
+
+    # Main content
+    if has_text:
         output.append(f"{text_content}\n")
 
-        # Tool calls (standard and detailed modes)
-        if mode in ['standard', 'detailed']:
-            tool_calls = extract_tool_calls(content_array)
-
-            if tool_calls:
-                output.append("**Tool Calls**:\n")
-
-                for call in tool_calls:
-                    if call.get('type') == 'tool_result':
-                        # Tool result
-                        result_content = call.get('content', '')
-                        if result_content and mode == 'detailed':
-                            output.append(f"- **Result**:\n```\n{result_content}\n```\n")
-                    else:
-                        # Tool use
-                        name = call.get('name', '')
-                        tool_input = call.get('input', {})
-
-                        if name:
-                            output.append(f"- **{name}**")
-                            input_str = format_tool_input(tool_input)
-                            if input_str:
-                                output.append(f"\n    - {input_str}")
-                            output.append("\n")
+    if tool_calls:
+        output.append("**Tool Calls**:\n")
 
+        for call in tool_calls:
+            if call.get('type') == 'tool_result':
+                # Tool result without a call in this conversation
+                output.append(f"- **Result**:\n```\n{call['content']}\n```\n")
+            else:
+                # Tool use
+                output.append(f"- **{call['name']}**")
+                input_str = format_tool_input(call.get('input', {}))
+                if input_str:
+                    output.append(f"\n    - {input_str}")
                 output.append("\n")
 
-        output.append("---\n")
+                if mode == 'detailed' and tool_results is not None:
+                    result_content = tool_results.get(call['id'])
+                    if result_content:
+                        output.append(f"    - **Result**:\n```\n{result_content}\n```\n")
+
+        output.append("\n")
 
+    output.append("---\n")
+
+    return output
+
+
+def render_node(msg, marker, mode='minimal', tool_results=None):
+    """Render a message at its place in the conversation tree (see ConversationTree.walk)."""
+    output = render_message(msg, mode, tool_results)
+    if output and marker:
+        output.insert(0, TREE_MARKERS[marker])
+    return output
+
+
+def to_markdown(messages, mode='minimal'):
+    """Convert messages to markdown format, in conversation tree order."""
+    session = MessageList(messages)
+    tree = ConversationTree()
+    for i, msg in enumerate(messages):
+        tree.add(i, msg)
+    tree.resolve(session.find_uuids)
+
+    output = render_header(mode, len(messages))
+    for i, msg, marker in tree.walk(session.records, session.end):
+        output.extend(render_node(msg, marker, mode, ToolResults(tree, i, msg, session.find_results)))
     return '\n'.join(output)
 
 
+def count_message(state, msg):
+    """Count a message and its timestamp in state."""
+    state['messages'] += 1
+    timestamp = msg.get('timestamp')
+    if timestamp:
+        if state['first_timestamp'] is None or timestamp < state['first_timestamp']:
+            state['first_timestamp'] = timestamp
+        if state['last_timestamp'] is None or timestamp > state['last_timestamp']:
+            state['last_timestamp'] = timestamp
+
+
+def tree_state(tree, anchor):
+    """What an incremental run needs to know about the tree of the exported messages."""
+    return {
+        'anchor': anchor,            # see ConversationTree.walk
+        'last_with_uuid': tree.last_with_uuid,
+        'last_uuid': tree.last_uuid,
+        'pending_calls': tree.pending_calls,
+    }
+
+
+def export_conversation(input_file, output_file, mode='minimal'):
+    """
+    Stream a conversation file to markdown.
+
+    The first pass indexes the conversation tree (see ConversationTree), the
+    second reads the messages back in tree order and renders them, so memory
+    is bounded by the branches and unanswered tool calls of the conversation
+    rather than its messages.
+
+    Returns the export state: the message count, the first and last message
+    timestamps (None when no message carries one) and what an incremental
+    run needs to append to the output later.
+    """
+    output_file = Path(output_file)
+    body_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+    state = new_state(mode)
+    state['generated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    try:
+        # newline='' keeps the body byte-for-byte until it is copied into the output
+        with open(body_file, 'w', encoding='utf-8', newline='', buffering=WRITE_BUFFER_SIZE) as body, \
+                SessionFile(input_file) as session:
+            tree = ConversationTree(session.unexported_before)
+            for offset, msg in iter_messages(input_file, state, with_offsets=True):
+                count_message(state, msg)
+                tree.add(offset, msg)
+            session.end = state['offset']
+            tree.resolve(session.find_uuids)
+
+            for offset, msg, marker in tree.walk(session.records, session.end):
+                tool_results = ToolResults(tree, offset, msg, session.find_results)
+                for chunk in render_node(msg, marker, mode, tool_results):
+                    body.write('\n')
+                    body.write(chunk)
+
+        with open(output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as out, \
+                open(body_file, 'r', encoding='utf-8', newline='') as body:
+            out.write('\n'.join(render_header(mode, state['messages'], state['generated'])))
+            state['header_length'] = out.tell()
+            shutil.copyfileobj(body, out, WRITE_BUFFER_SIZE)
+            state['output_size'] = out.tell()
+    finally:
+        try:
+            body_file.unlink()
+        except OSError:
+            pass
+
+    state.update(tree_state(tree, tree.anchor))
+    return state
+
+
+def state_path(output_file):
+    """Incremental state lives next to the output: .<output-name>.state.json"""
+    output_file = Path(output_file)
+    return output_file.with_name(f".{output_file.name}.state.json")
+
+
+def load_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(path, state):
+    """
+    Write the state atomically, unless it is unchanged (a --follow tick that
+    found no complete new line); an export without state just starts over
+    next time.
+    """
+    data = json.dumps(state, ensure_ascii=False, separators=(',', ':'))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == data:
+                return
+    except OSError:
+        pass
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Failed to save export state: {e}", file=sys.stderr)
+
+
+def session_identity(input_file, offset):
+    """
+    Identify the session file behind an offset: device, inode and a hash of its
+    first bytes, so a replaced or rewritten session isn't appended to.
+    """
+    stat = os.stat(input_file)
+    with open(input_file, 'rb') as f:
+        head = f.read(min(offset, HEAD_HASH_SIZE))
+    return {
+        'device': stat.st_dev,
+        'inode': stat.st_ino,
+        'head_size': len(head),
+        'head_hash': hashlib.sha1(head).hexdigest(),
+    }
+
+
+def can_append(state, input_file, output_file, mode):
+    """Whether output_file is exactly what state says it is, for an unchanged prefix of the session."""
+    if state is None or state.get('mode') != mode or state.get('input') != str(Path(input_file).resolve()):
+        return False
+    try:
+        if os.path.getsize(output_file) != state['output_size']:
+            return False
+        if os.path.getsize(input_file) < state['offset']:
+            return False
+        return session_identity(input_file, state['head_size']) == {
+            key: state[key] for key in ('device', 'inode', 'head_size', 'head_hash')
+        }
+    except OSError:
+        return False
+
+
+def append_conversation(input_file, output_file, state):
+    """
+    Append the messages after state['offset'] to output_file and update its header.
+
+    Returns False without touching the output when the new messages don't
+    just continue the conversation where the output ends, e.g. a branch off
+    an earlier message or, in detailed mode, the result of a call that is
+    already rendered; a full export is needed then.
+    """
+    mode = state['mode']
+    previous_count = state['messages']
+
+    start = state['offset']
+    with SessionFile(input_file) as session:
+        # Seed the tree with where the output ends: the last message with a
+        # uuid and the calls still waiting for their results
+        tree = ConversationTree(session.unexported_before)
+        tree.last_with_uuid, tree.last_uuid = state['last_with_uuid'], state['last_uuid']
+        tree.pending_calls = dict(state['pending_calls'])
+        new_messages = []
+        for offset, msg in iter_messages(input_file, state, with_offsets=True):
+            count_message(state, msg)
+            fallback = tree.last_with_uuid
+            tree.add(offset, msg)
+            new_messages.append((offset, fallback, msg.get('uuid')))
+        session.end = state['offset']
+        # A parent uuid from further back may name an earlier message: look it up
+        tree.resolve(session.find_uuids)
+
+        anchor = state['anchor']
+        for offset, fallback, uuid in new_messages:
+            parent = tree.parent(offset, fallback)
+            if parent is not None and parent != anchor:
+                return False
+            if uuid:
+                anchor = offset
+            elif parent != anchor:
+                anchor = None
+
+        if mode == 'detailed' and any(tree.answered(key, call_id) for call_id, key in state['pending_calls'].items()):
+            return False
+
+        with open(output_file, 'a', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as out:
+            for offset, msg in session.records(start, session.end):
+                marker = 'sidechain' if offset in tree.sidechain_roots else None
+                tool_results = ToolResults(tree, offset, msg, session.find_results)
+                for chunk in render_node(msg, marker, mode, tool_results):
+                    out.write('\n')
+                    out.write(chunk)
+
+    if state['messages'] != previous_count:
+        header = '\n'.join(render_header(mode, state['messages'], state['generated']))
+        if len(str(state['messages'])) == len(str(previous_count)):
+            # Only the count changed and it has as many digits: overwrite the header in place
+            with open(output_file, 'r+', encoding='utf-8') as out:
+                out.write(header)
+        else:
+            output_file = Path(output_file)
+            tmp_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as out, \
+                    open(output_file, 'rb') as old:
+                old.seek(state['header_length'])
+                out.write(header)
+                state['header_length'] = out.tell()
+                out.flush()
+                shutil.copyfileobj(old, out.buffer, WRITE_BUFFER_SIZE)
+            os.replace(tmp_file, output_file)
+
+    state.update(tree_state(tree, anchor))
+    state['output_size'] = os.path.getsize(output_file)
+    return True
+
+
+def export_incremental(input_file, output_file, mode='minimal'):
+    """
+    Bring output_file up to date with a growing session.
+
+    Only the lines after the offset saved by the previous run are parsed and
+    their messages appended; the header keeps its original Generated time. A
+    full export is done instead when there is no usable state (first run,
+    different mode, or a session or output that changed other than by
+    growing) or when the new messages can't simply be appended.
+
+    Returns (state, new_messages); new_messages is None after a full export.
+    """
+    path = state_path(output_file)
+    state = load_state(path)
+    new_messages = None
+    if can_append(state, input_file, output_file, mode):
+        previous_count = state['messages']
+        if os.path.getsize(input_file) <= state['offset'] or append_conversation(input_file, output_file, state):
+            new_messages = state['messages'] - previous_count
+    if new_messages is None:
+        state = export_conversation(input_file, output_file, mode)
+
+    state['version'] = STATE_VERSION
+    state['input'] = str(Path(input_file).resolve())
+    state.update(session_identity(input_file, state['offset']))
+    save_state(path, state)
+    return state, new_messages
+
+
+def follow_conversation(input_file, output_file, mode='minimal', interval=1.0):
+    """
+    Keep output_file up to date while the session grows, until interrupted.
+
+    Between updates only the session's stat() is polled, so an idle session
+    costs next to no CPU.
+    """
+    last_signature = None
+    try:
+        while True:
+            try:
+                stat = os.stat(input_file)
+                signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                signature = last_signature
+
+            if signature != last_signature:
+                state, new_messages = export_incremental(input_file, output_file, mode)
+                last_signature = signature
+                now = datetime.now().strftime('%H:%M:%S')
+                if new_messages is None:
+                    print(f"[{now}] Exported {state['messages']} messages")
+                elif new_messages:
+                    print(f"[{now}] +{new_messages} messages ({state['messages']} total)")
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def find_sessions(projects_dir):
+    """Find every session .jsonl file under a projects directory, sorted by path."""
+    return sorted(path for path in Path(projects_dir).rglob('*.jsonl') if path.is_file())
+
+
+def export_session(job):
+    """
+    Export one session in a bulk run (runs in a worker process).
+
+    Never raises: failures are reported in the returned entry so one broken
+    session doesn't abort the whole run.
+    """
+    input_file, output_file, mode, incremental = job
+    entry = {'session': input_file, 'output': output_file}
+    try:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        if incremental:
+            entry.update(export_incremental(input_file, output_file, mode)[0])
+        else:
+            entry.update(export_conversation(input_file, output_file, mode))
+    except (Exception, SystemExit) as e:
+        entry['error'] = str(e) or type(e).__name__
+    return entry
+
+
+def format_time_span(first_timestamp, last_timestamp):
+    """Format the span between two ISO timestamps for the index."""
+    if not first_timestamp:
+        return '-'
+    span = f"{format_timestamp(first_timestamp)} → {format_timestamp(last_timestamp)}"
+    try:
+        start = datetime.fromisoformat(first_timestamp.replace('Z', '+00:00'))
+        end = datetime.fromisoformat(last_timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return span
+    minutes = int((end - start).total_seconds() // 60)
+    duration = f"{minutes // 60}h {minutes % 60}m" if minutes >= 60 else f"{minutes}m"
+    return f"{span} ({duration})"
+
+
+def write_index(index_file, entries, mode):
+    """Write index.md listing each exported session with its message count and time span."""
+    exported = [entry for entry in entries if 'error' not in entry]
+    total_messages = sum(entry['messages'] for entry in exported)
+
+    lines = [
+        "# Conversation Index",
+        "",
+        f"**Generated**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"**Mode**: {mode}",
+        f"**Sessions**: {len(exported)}",
+        f"**Messages**: {total_messages}",
+        "",
+        "| Session | Messages | Time Span |",
+        "|---------|----------|-----------|",
+    ]
+    for entry in exported:
+        link = entry['output'].relative_to(index_file.parent).as_posix()
+        lines.append(
+            f"| [{link[:-len('.md')]}]({link}) | {entry['messages']} "
+            f"| {format_time_span(entry['first_timestamp'], entry['last_timestamp'])} |"
+        )
+
+    failed = [entry for entry in entries if 'error' in entry]
+    if failed:
+        lines.extend(["", "## Failed Sessions", ""])
+        for entry in failed:
+            lines.append(f"- `{entry['session']}`: {entry['error']}")
+
+    with open(index_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def bulk_export(projects_dir, output_dir, mode='minimal', workers=None, incremental=False):
+    """
+    Export every session under projects_dir into output_dir across a process pool.
+
+    Each session is written to output_dir/<project>/<session>.md, mirroring the
+    projects tree, and output_dir/index.md lists them all. With incremental,
+    sessions exported before only get their new messages appended. Returns the
+    entries in path order.
+    """
+    projects_dir = Path(projects_dir)
+    output_dir = Path(output_dir)
+    sessions = find_sessions(projects_dir)
+    jobs = [
+        (session, output_dir / session.relative_to(projects_dir).with_suffix('.md'), mode, incremental)
+        for session in sessions
+    ]
+    # Largest sessions first, so one big session doesn't start last and leave the other workers idle
+    jobs.sort(key=lambda job: job[0].stat().st_size, reverse=True)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    entries = []
+    if jobs:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+        if workers == 1:
+            entries = [export_session(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                entries = list(executor.map(export_session, jobs))
+    entries.sort(key=lambda entry: entry['session'])
+
+    write_index(output_dir / 'index.md', entries, mode)
+    return entries
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export Claude Code conversation history to markdown.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""Modes:
+  minimal   - User and assistant messages only (default)
+  standard  - Everything in minimal + tool calls
+  detailed  - Everything in standard + tool outputs and diffs
+
+Examples:
+  python export-conversation.py session.jsonl
+  python export-conversation.py session.jsonl output.md
+  python export-conversation.py session.jsonl output.md standard
+  python export-conversation.py session.jsonl live.md --follow
+  python export-conversation.py --bulk ~/.claude/projects --output-dir exports --mode standard""",
+    )
+    parser.add_argument('input_file', nargs='?', help="Path to conversation .jsonl file")
+    parser.add_argument('output_file', nargs='?',
+                        help="Output path (default: conversation-export_YYYYMMDD.md)")
+    parser.add_argument('positional_mode', nargs='?', metavar='mode',
+                        help="Export mode: minimal, standard, or detailed (default: minimal)")
+    parser.add_argument('--mode', help="Export mode (same as the positional mode)")
+    parser.add_argument('--bulk', metavar='PROJECTS_DIR',
+                        help="Export every session under a projects directory (e.g. ~/.claude/projects)")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="Output directory for --bulk (default: conversation-exports_YYYYMMDD)")
+    parser.add_argument('--workers', type=int,
+                        help="Worker processes for --bulk (default: number of CPUs)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only append messages added since the last export to the same output")
+    parser.add_argument('--follow', action='store_true',
+                        help="Keep exporting new messages as the session grows (implies --incremental)")
+    parser.add_argument('--interval', type=float, default=1.0, metavar='SECONDS',
+                        help="How often --follow checks the session for changes (default: 1)")
+    return parser, parser.parse_args(argv)
+
+
 def main():
     """Main entry point."""
-    if len(sys.argv) < 2:
-        print("Usage: python export-conversation.py <jsonl-file> [output-file] [mode]")
-        print("\nModes:")
-        print("  minimal   - User and assistant messages only (default)")
-        print("  standard  - Everything in minimal + tool calls")
-        print("  detailed  - Everything in standard + tool outputs and diffs")
-        print("\nExamples:")
-        print("  python export-conversation.py session.jsonl")
-        print("  python export-conversation.py session.jsonl output.md")
-        print("  python export-conversation.py session.jsonl output.md standard")
-        sys.exit(1)
-
-    # Parse arguments
-    input_file = Path(sys.argv[1])
+    parser, args = parse_args()
 
-    # Output file
-    if len(sys.argv) > 2:
-        output_file = Path(sys.argv[2])
-    else:
-        output_file = Path(f"conversation-export_{datetime.now().strftime('%Y%m%d')}.md")
+    if not args.input_file and not args.bulk:
+        parser.print_help()
+        sys.exit(1)
 
-    # Mode
-    mode = sys.argv[3] if len(sys.argv) > 3 else 'minimal'
+    mode = args.mode or args.positional_mode or 'minimal'
 
     # Validate mode
     if mode not in ['minimal', 'standard', 'detailed']:
         print(f"Error: Invalid mode '{mode}'. Use: minimal, standard, or detailed", file=sys.stderr)
         sys.exit(1)
 
-    # Parse conversation
-    print(f"Reading conversation from: {input_file}")
-    messages = parse_jsonl(input_file)
-    print(f"Found {len(messages)} messages")
+    if args.bulk:
+        if args.input_file:
+            print("Error: --bulk does not take an input file; use --output-dir and --mode", file=sys.stderr)
+            sys.exit(1)
+        if args.follow:
+            print("Error: --follow exports a single session and can't be used with --bulk", file=sys.stderr)
+            sys.exit(1)
+        if not Path(args.bulk).is_dir():
+            print(f"Error: Projects directory not found: {args.bulk}", file=sys.stderr)
+            sys.exit(1)
 
-    if not messages:
-        print("Warning: No messages found in conversation", file=sys.stderr)
-        # Still create the file
+        output_dir = Path(args.output_dir or f"conversation-exports_{datetime.now().strftime('%Y%m%d')}")
+        print(f"Exporting sessions from: {args.bulk}")
+        print(f"Generating markdown in {mode} mode...")
+
+        try:
+            entries = bulk_export(args.bulk, output_dir, mode, args.workers, args.incremental)
+        except OSError as e:
+            print(f"Error: Failed to write output: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        failed = [entry for entry in entries if 'error' in entry]
+        for entry in failed:
+            print(f"Error: Failed to export {entry['session']}: {entry['error']}", file=sys.stderr)
+
+        exported = len(entries) - len(failed)
+        print(f"\n✅ Exported {exported} sessions to: {output_dir}")
+        print(f"📝 {sum(entry.get('messages', 0) for entry in entries)} messages exported")
+        print(f"📇 Index: {output_dir / 'index.md'}")
+        print(f"📊 Mode: {mode}")
+        if failed:
+            sys.exit(1)
+        return
+
+    input_file = Path(args.input_file)
+
+    # Output file
+    if args.output_file:
+        output_file = Path(args.output_file)
+    else:
+        output_file = Path(f"conversation-export_{datetime.now().strftime('%Y%m%d')}.md")
 
-    # Generate markdown
+    # Parse conversation and generate markdown in a single streaming pass
+    print(f"Reading conversation from: {input_file}")
     print(f"Generating markdown in {mode} mode...")
-    markdown = to_markdown(messages, mode)
 
-    # Write output
-    try:
-        output_file.write_text(markdown, encoding='utf-8')
+    if args.follow:
+        print(f"Following {input_file} (Ctrl+C to stop)...")
+        try:
+            follow_conversation(input_file, output_file, mode, args.interval)
+        except OSError as e:
+            print(f"Error: Failed to write output file: {e}", file=sys.stderr)
+            sys.exit(1)
         print(f"\n✅ Exported to: {output_file}")
-        print(f"📝 {len(messages)} messages exported")
-        print(f"📊 Mode: {mode}")
-    except Exception as e:
+        return
+
+    try:
+        if args.incremental:
+            state, new_messages = export_incremental(input_file, output_file, mode)
+            if new_messages is not None:
+                print(f"Appended {new_messages} new messages")
+        else:
+            state = export_conversation(input_file, output_file, mode)
+        message_count = state['messages']
+    except OSError as e:
         print(f"Error: Failed to write output file: {e}", file=sys.stderr)
         sys.exit(1)
 
+    print(f"Found {message_count} messages")
+    if not message_count:
+        print("Warning: No messages found in conversation", file=sys.stderr)
+        # Still create the file
+
+    print(f"\n✅ Exported to: {output_file}")
+    print(f"📝 {message_count} messages exported")
+    print(f"📊 Mode: {mode}")
+
 
 if __name__ == '__main__':
     main()
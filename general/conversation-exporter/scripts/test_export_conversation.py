@@ -0,0 +1,398 @@
+"""
+Tests for export-conversation.py: the conversation tree against a reference
+built from every uuid, streaming against in-memory export and against the
+exporter before streaming, the bounded tree index, and incremental export
+against a full one.
+"""
+import importlib.util
+import json
+import random
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent / 'export-conversation.py'
+spec = importlib.util.spec_from_file_location('export_conversation', SCRIPT)
+exporter = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(exporter)
+
+MODES = ['minimal', 'standard', 'detailed']
+
+
+def text(value):
+    return [{'type': 'text', 'text': value}]
+
+
+def random_session(seed, n=300):
+    """Records with branches, sidechains, missing parents and parents that aren't exported."""
+    rng = random.Random(seed)
+    records, uuids, pending = [], [], []
+    last_any = None
+    for i in range(n):
+        uuid = f'u{i}'
+        kind = rng.random()
+        if kind < 0.08:
+            records.append({'type': 'progress', 'uuid': uuid, 'parentUuid': last_any, 'data': {'n': i}})
+            last_any = uuid
+            continue
+        if kind < 0.12:
+            records.append({'type': 'file-history-snapshot', 'messageId': uuid, 'snapshot': {}})
+            continue
+        choice = rng.random()
+        if not uuids or choice < 0.03:
+            parent = None
+        elif choice < 0.1:
+            parent = rng.choice(uuids)
+        elif choice < 0.13:
+            parent = 'missing'
+        elif choice < 0.3:
+            parent = last_any
+        else:
+            parent = uuids[-1]
+        content = text(f'text {i}') if rng.random() < 0.7 else []
+        if rng.random() < 0.3:
+            content.append({'type': 'tool_use', 'id': f't{i}', 'name': 'Read', 'input': {'p': i}})
+            pending.append(f't{i}')
+        if pending and rng.random() < 0.4:
+            call_id = pending.pop(rng.randrange(len(pending))) if rng.random() < 0.9 else f'x{i}'
+            content.append({'type': 'tool_result', 'tool_use_id': call_id, 'content': text(f'result {i}')})
+        record = {
+            'type': rng.choice(['user', 'assistant']), 'uuid': uuid, 'parentUuid': parent,
+            'timestamp': f'2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z',
+            'message': {'role': 'user', 'content': content},
+        }
+        if rng.random() < 0.05:
+            record['isSidechain'] = True
+        records.append(record)
+        uuids.append(uuid)
+        last_any = uuid
+    return records
+
+
+def write_session(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    return path
+
+
+def exported(records):
+    return [record for record in records if record['type'] in exporter.EXPORTED_TYPES]
+
+
+def reference_order(messages):
+    """
+    Tree order from an index of every uuid: [(position, marker)]. Parents
+    that aren't an earlier exported message fall back to the last message
+    with a uuid before the child, as do records without a uuid.
+    """
+    positions = {}
+    children = {}
+    roots = []
+    last_with_uuid = None
+    for i, msg in enumerate(messages):
+        uuid, parent_uuid = msg.get('uuid'), msg.get('parentUuid')
+        if uuid and parent_uuid is None:
+            parent = None
+        else:
+            parent = positions.get(parent_uuid, last_with_uuid) if uuid else last_with_uuid
+        if parent is None:
+            roots.append(i)
+        else:
+            children.setdefault(parent, []).append(i)
+        if uuid:
+            positions.setdefault(uuid, i)
+            last_with_uuid = i
+
+    order = []
+
+    def visit(i, marker):
+        order.append((i, marker))
+        first_with_uuid = True
+        for child in children.get(i, []):
+            if messages[child].get('uuid'):
+                visit(child, None if first_with_uuid else 'branch')
+                first_with_uuid = False
+            else:
+                visit(child, None)
+
+    for i in roots:
+        visit(i, 'sidechain' if messages[i].get('isSidechain') else None)
+    return order
+
+
+def tree_order(messages):
+    session = exporter.MessageList(messages)
+    tree = exporter.ConversationTree()
+    for i, msg in enumerate(messages):
+        tree.add(i, msg)
+    tree.resolve(session.find_uuids)
+    return [(i, marker) for i, _, marker in tree.walk(session.records, session.end)]
+
+
+def without_generated(text):
+    return re.sub(r'\*\*Generated\*\*: .*', '', text)
+
+
+def export_text(path, output, mode):
+    exporter.export_conversation(path, output, mode)
+    return without_generated(output.read_text(encoding='utf-8'))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_tree_order_matches_reference(seed):
+    messages = exported(random_session(seed))
+    assert tree_order(messages) == reference_order(messages)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_far_parents_are_resolved_after_indexing(seed, monkeypatch):
+    messages = exported(random_session(seed))
+    monkeypatch.setattr(exporter, 'RECENT_UUIDS', 1)
+    assert tree_order(messages) == reference_order(messages)
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('seed', range(5))
+def test_export_matches_in_memory_export(seed, mode, tmp_path, monkeypatch):
+    records = random_session(seed)
+    path = write_session(tmp_path / 'session.jsonl', records)
+    expected = without_generated(exporter.to_markdown(exported(records), mode))
+    assert export_text(path, tmp_path / 'out.md', mode) == expected
+    # Parents looked up in the whole session and right before the message give the same tree
+    monkeypatch.setattr(exporter, 'RECENT_UUIDS', 1)
+    monkeypatch.setattr(exporter, 'READ_BACK_SIZE', 64)
+    assert export_text(path, tmp_path / 'out.md', mode) == expected
+
+
+def message(kind, uuid, parent, content, **extra):
+    return {'type': kind, 'uuid': uuid, 'parentUuid': parent, 'message': {'role': kind, 'content': content}, **extra}
+
+
+def test_tool_results_render_under_their_calls(tmp_path):
+    records = [
+        message('user', 'a', None, text('Read it')),
+        message('assistant', 'b', 'a', [{'type': 'tool_use', 'id': 't1', 'name': 'Read', 'input': {}}]),
+        {'type': 'progress', 'uuid': 'p', 'parentUuid': 'b'},
+        message('user', 'c', 'p', [{'type': 'tool_result', 'tool_use_id': 't1', 'content': text('FIRST')}]),
+        message('user', 'd', 'c', [{'type': 'tool_result', 'tool_use_id': 't1', 'content': text('AGAIN')},
+                                   {'type': 'tool_result', 'tool_use_id': 'nowhere', 'content': text('ORPHAN')}]),
+    ]
+    path = write_session(tmp_path / 'session.jsonl', records)
+    output = export_text(path, tmp_path / 'out.md', 'detailed')
+    # The first result is rendered under the call; a repeated or orphaned one stays in its message
+    assert output.index('**Read**') < output.index('FIRST') < output.index('AGAIN') < output.index('ORPHAN')
+    assert output.count('FIRST') == 1
+
+
+def test_unexported_before(tmp_path, monkeypatch):
+    records = [
+        message('user', 'a', None, text('hello')),
+        {'type': 'system', 'uuid': 's', 'parentUuid': 'a', 'content': 'x' * 200},
+        message('assistant', 'b', 's', text('hi')),
+    ]
+    path = write_session(tmp_path / 'session.jsonl', records)
+    offset = sum(len(line) for line in path.read_bytes().splitlines(keepends=True)[:2])
+    with exporter.SessionFile(path) as session:
+        assert session.unexported_before(offset, 's')
+        assert not session.unexported_before(offset, 'a')
+        assert not session.unexported_before(offset, 'missing')
+        monkeypatch.setattr(exporter, 'READ_BACK_SIZE', 100)
+        # Out of reach: left for resolve
+        assert not session.unexported_before(offset, 's')
+
+
+def test_tree_index_stays_small_on_a_long_session():
+    tree = exporter.ConversationTree(lambda key, uuid: uuid.startswith('p'))
+    parent = None
+    for i in range(5000):
+        tree.add(3 * i, message('assistant', f'c{i}', parent, [{'type': 'tool_use', 'id': f't{i}', 'name': 'Bash', 'input': {}}]))
+        tree.add(3 * i + 1, message('user', f'r{i}', f'c{i}', [{'type': 'tool_result', 'tool_use_id': f't{i}', 'content': 'ok'}]))
+        # The next call hangs under a progress record that isn't exported
+        parent = f'p{i}'
+    assert tree.links == {0: None}
+    assert tree.pending_calls == {}
+    assert tree.unresolved == []
+    assert len(tree.recent) <= exporter.RECENT_UUIDS
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('seed', range(3))
+def test_incremental_export_matches_full_export(seed, mode, tmp_path):
+    lines = [json.dumps(record) + '\n' for record in random_session(seed, 120)]
+    path = tmp_path / 'session.jsonl'
+    path.write_text('', encoding='utf-8')
+    appended = 0
+    for start in range(0, len(lines), 5):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.writelines(lines[start:start + 5])
+        _, new_messages = exporter.export_incremental(path, tmp_path / 'inc.md', mode)
+        appended += new_messages is not None
+        incremental = without_generated((tmp_path / 'inc.md').read_text(encoding='utf-8'))
+        assert incremental == export_text(path, tmp_path / 'full.md', mode)
+    assert appended
+
+
+def test_incremental_state_is_small(tmp_path):
+    lines = [json.dumps(message('user' if i % 2 else 'assistant', f'u{i}', f'u{i - 1}' if i else None, text(f'text {i}'))) + '\n'
+             for i in range(2000)]
+    path = tmp_path / 'session.jsonl'
+    path.write_text(''.join(lines[:1000]), encoding='utf-8')
+    exporter.export_incremental(path, tmp_path / 'out.md')
+    size = exporter.state_path(tmp_path / 'out.md').stat().st_size
+    path.write_text(''.join(lines), encoding='utf-8')
+    _, new_messages = exporter.export_incremental(path, tmp_path / 'out.md')
+    assert new_messages == 1000
+    assert exporter.state_path(tmp_path / 'out.md').stat().st_size <= size + 16
+
+
+def test_unchanged_session_does_not_rewrite_state(tmp_path):
+    path = write_session(tmp_path / 'session.jsonl', [message('user', 'a', None, text('hello'))])
+    exporter.export_incremental(path, tmp_path / 'out.md')
+    state_file = exporter.state_path(tmp_path / 'out.md')
+    before = state_file.stat()
+    # A half-written line: nothing new to export
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "user", "uuid"')
+    _, new_messages = exporter.export_incremental(path, tmp_path / 'out.md')
+    assert new_messages == 0
+    assert state_file.stat().st_ino == before.st_ino
+    assert state_file.stat().st_mtime_ns == before.st_mtime_ns
+    assert '\n' not in state_file.read_text(encoding='utf-8')
+
+
+def baseline_parse_jsonl(filepath):
+    """parse_jsonl before streaming: the whole file decoded into a list."""
+    messages = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Warning: Failed to parse line {line_num}: {e}", file=sys.stderr)
+                continue
+            if obj.get('type') in ['user', 'assistant', 'file-history-snapshot']:
+                messages.append(obj)
+    return messages
+
+
+def baseline_to_markdown(messages, mode='minimal'):
+    """to_markdown before streaming: messages in file order (the helpers it calls are unchanged)."""
+    output = ["# Conversation Export\n", "**Generated**: now", f"**Mode**: {mode}",
+              f"**Messages**: {len(messages)}", "\n---\n"]
+    for msg in messages:
+        timestamp = exporter.format_timestamp(msg.get('timestamp', ''))
+        if msg.get('type') == 'file-history-snapshot':
+            if mode == 'detailed':
+                output.append(f"## 📁 File Change - {timestamp}\n")
+                output.append("*File history snapshot recorded*\n")
+            continue
+        message = msg.get('message', {})
+        role = message.get('role', 'unknown').title()
+        content_array = message.get('content', [])
+        text_content = exporter.extract_text_content(content_array)
+        if not text_content or not text_content.strip():
+            continue
+        output.append(f"## {'👤' if role.lower() == 'user' else '🤖'} {role} - {timestamp}\n")
+        output.append(f"{text_content}\n")
+        if mode in ['standard', 'detailed']:
+            tool_calls = exporter.extract_tool_calls(content_array)
+            if tool_calls:
+                output.append("**Tool Calls**:\n")
+                for call in tool_calls:
+                    if call.get('type') == 'tool_result':
+                        if call.get('content') and mode == 'detailed':
+                            output.append(f"- **Result**:\n```\n{call['content']}\n```\n")
+                    elif call.get('name'):
+                        output.append(f"- **{call['name']}**")
+                        input_str = exporter.format_tool_input(call.get('input', {}))
+                        if input_str:
+                            output.append(f"\n    - {input_str}")
+                        output.append("\n")
+                output.append("\n")
+        output.append("---\n")
+    return '\n'.join(output)
+
+
+def linear_session_lines(seed, n=200):
+    """
+    A session without branches or tool results, where the old file-order export
+    and the tree-order export agree: messages chained through progress records,
+    snapshots, other record types and broken lines in between.
+    """
+    rng = random.Random(seed)
+    lines = []
+    parent = None
+    for i in range(n):
+        kind = rng.random()
+        if kind < 0.1:
+            lines.append(json.dumps({'type': 'progress', 'uuid': f'p{i}', 'parentUuid': parent, 'data': 'x' * rng.randrange(300)}))
+            parent = f'p{i}'
+            continue
+        if kind < 0.15:
+            lines.append(json.dumps({'type': 'file-history-snapshot', 'messageId': f's{i}', 'snapshot': {}}))
+            continue
+        if kind < 0.18:
+            lines.append(rng.choice(['', '   ', '{"type": "user", "uuid": ', 'not json', '{"type": "system"']))
+            continue
+        content = text(rng.choice([f'text {i}', f'多字节 {i} ✓', 'line one\nline two', '   ']))
+        if content[0]['text'].strip() and rng.random() < 0.4:
+            content.append({'type': 'tool_use', 'id': f't{i}', 'name': rng.choice(['Read', 'Bash']),
+                            'input': {'path': 'a' * rng.randrange(150), 'args': [1, 2], 'opts': {'k': 1}, 'internal': 1, 'n': i}})
+        record = {'type': rng.choice(['user', 'assistant']), 'uuid': f'u{i}', 'parentUuid': parent,
+                  'message': {'role': rng.choice(['user', 'assistant']), 'content': content}}
+        if rng.random() < 0.9:
+            record['timestamp'] = f'2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z'
+        lines.append(json.dumps(record, ensure_ascii=rng.random() < 0.5))
+        parent = f'u{i}'
+    return lines
+
+
+def write_lines(path, lines, ending='\n'):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(''.join(line + ending for line in lines))
+    return path
+
+
+@pytest.mark.parametrize('ending', ['\n', '\r\n'])
+@pytest.mark.parametrize('seed', range(5))
+def test_streaming_parse_matches_baseline(seed, ending, tmp_path, capsys):
+    lines = linear_session_lines(seed)
+    lines.insert(3, '{"type": "assistant", "message": ')
+    path = write_lines(tmp_path / 'session.jsonl', lines, ending)
+    expected = baseline_parse_jsonl(path)
+    expected_warnings = capsys.readouterr().err
+    assert exporter.parse_jsonl(path) == expected
+    assert list(exporter.iter_messages(path)) == expected
+    # Broken lines of exported types are reported with the same line numbers
+    warnings = capsys.readouterr().err.splitlines()
+    assert 'Warning: Failed to parse line 4: ' in '\n'.join(warnings)
+    assert set(warnings) <= set(expected_warnings.splitlines())
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('seed', range(5))
+def test_streaming_export_matches_baseline(seed, mode, tmp_path):
+    path = write_lines(tmp_path / 'session.jsonl', linear_session_lines(seed))
+    expected = without_generated(baseline_to_markdown(baseline_parse_jsonl(path), mode))
+    assert export_text(path, tmp_path / 'out.md', mode) == expected
+
+
+def test_partial_last_line(tmp_path, capsys):
+    complete = [json.dumps(message('user', 'a', None, text('hello')))]
+    last = json.dumps(message('assistant', 'b', 'a', text('hi')))
+    # A complete record without its newline is read; a half-written one is left without a warning
+    path = tmp_path / 'session.jsonl'
+    path.write_text(complete[0] + '\n' + last, encoding='utf-8')
+    assert exporter.parse_jsonl(path) == baseline_parse_jsonl(path)
+    path.write_text(complete[0] + '\n' + last[:20], encoding='utf-8')
+    capsys.readouterr()
+    state = exporter.new_state()
+    assert [msg['uuid'] for msg in exporter.iter_messages(path, state)] == ['a']
+    assert state['offset'] == len(complete[0]) + 1
+    assert capsys.readouterr().err == ''